@@ -39,6 +39,16 @@ app.register_blueprint(suggestions_bp, url_prefix='/api/suggestions')
 app.register_blueprint(ingredients_bp, url_prefix='/api/ingredients')
 app.register_blueprint(recipes_bp, url_prefix='/api/recipes')
 
+# Services are built in the background by create_app(), not at import, so
+# importing this module (tests, tools, or a scoring shard re-importing the
+# main script) loads no models.
+from services.warmup import shared_warmup
+
+def create_app():
+    """Start the background warm-up and return the app (e.g. gunicorn 'app:create_app()')"""
+    shared_warmup()
+    return app
+
 @app.route('/')
 def index():
     """API root endpoint"""
@@ -48,6 +58,8 @@ def index():
         'status': 'running',
         'endpoints': {
             'health': '/health',
+            'liveness': '/health/live',
+            'readiness': '/health/ready',
             'suggestions': '/api/suggestions',
         }
     })
@@ -55,11 +67,38 @@ def index():
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({
+    from services.model_registry import shared_registry
+    warmup = shared_warmup()
+    out = {
         'status': 'healthy',
         'database': 'connected',
-        'ml_service': 'active'
-    })
+        'ml_service': 'active' if warmup.ready else 'warming_up',
+        'ready': warmup.ready,
+        'models': shared_registry().metrics()
+    }
+    recipe_service = warmup.ready_service('recipe_intelligence')
+    if recipe_service is not None:
+        out['recipe_cache'] = recipe_service.cache_stats()
+        out['recipe_cascade'] = recipe_service.cascade_stats()
+        out['recipe_inference'] = recipe_service.inference_stats()
+    return jsonify(out)
+
+@app.route('/health/live')
+def liveness():
+    """Liveness probe: the process is up and serving HTTP"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready')
+def readiness():
+    """Readiness probe: 200 once every service and model is warm, 503 before"""
+    status = shared_warmup().status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/admin/models')
+def loaded_models():
+    """Models loaded in this worker, with load time and approximate memory"""
+    from services.model_registry import shared_registry
+    return jsonify(shared_registry().stats())
 
 # Legacy Compatibility Aliases for SmartPantryApi
 @app.route('/api/get-recipes', methods=['POST', 'OPTIONS'])
@@ -145,9 +184,12 @@ if __name__ == '__main__':
     print("API Documentation: http://localhost:5000/")
     print("\nAvailable endpoints:")
     print("  GET  /health")
+    print("  GET  /health/live")
+    print("  GET  /health/ready")
+    print("  GET  /admin/models")
     print("  POST /api/user/sync")
     print("  GET  /api/analytics")
     print("  GET  /api/suggestions")
     print("\n" + "=" * 60)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -1,20 +1,36 @@
 import base64
 import os
 import tempfile
+from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
-from services.category_classifier import CategoryClassifier
 from services.feedback_store import FeedbackStore
+from services.model_registry import shared_registry
+from services.recipe_filters import RecipeFilters
 from services.recipe_intelligence import RecipeIntelligence
 from services.user_history_store import UserHistoryStore
 from services.voice_pipeline import VoicePipeline
+from services.warmup import shared_warmup
 
 
-app = FastAPI(title="SmartPantry API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build services and load models in the background; /health/ready reports
+    # 503 until they are warm, while /health/live answers from the start.
+    warmup = shared_warmup()
+    yield
+    recipe_intelligence = warmup.ready_service("recipe_intelligence")
+    if recipe_intelligence is not None:
+        recipe_intelligence.stop_catalog_watcher()
+    warmup.shutdown()
+
+
+app = FastAPI(title="SmartPantry API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,8 +46,16 @@ class VoiceToIngredientsResponse(BaseModel):
     categories: Dict[str, str]
 
 
+class RecipeFiltersRequest(BaseModel):
+    max_prep_time_mins: Optional[int] = Field(default=None, ge=0)
+    min_rating: Optional[float] = Field(default=None, ge=0, le=5)
+    exclude: List[str] = Field(default_factory=list)
+    diets: List[str] = Field(default_factory=list)
+
+
 class GetRecipesRequest(BaseModel):
     ingredients: List[str] = Field(default_factory=list)
+    filters: Optional[RecipeFiltersRequest] = None
 
 
 class RecipeResult(BaseModel):
@@ -45,6 +69,16 @@ class GetRecipesResponse(BaseModel):
     top_5: List[RecipeResult]
 
 
+class GetRecipesBatchRequest(BaseModel):
+    pantries: List[List[str]] = Field(default_factory=list)
+    k: int = Field(default=5, ge=0, le=100)
+    filters: Optional[RecipeFiltersRequest] = None
+
+
+class GetRecipesBatchResponse(BaseModel):
+    results: List[List[RecipeResult]]
+
+
 class RecommendMoreRequest(BaseModel):
     ingredients: List[str] = Field(default_factory=list)
     missing: List[str] = Field(default_factory=list)
@@ -67,22 +101,47 @@ class FeedbackResponse(BaseModel):
     status: str
 
 
+class ReloadCatalogRequest(BaseModel):
+    background: bool = False
+
+
+class ReloadCatalogResponse(BaseModel):
+    status: str
+    catalog: Dict[str, Any]
+
+
 def _ensure_services() -> Dict[str, Any]:
-    if not hasattr(app.state, "services"):
-        category_classifier = CategoryClassifier()
-        app.state.services = {
-            "category_classifier": category_classifier,
-            "voice_pipeline": VoicePipeline(category_classifier=category_classifier),
-            "recipe_intelligence": RecipeIntelligence(),
-            "feedback_store": FeedbackStore(),
-            "user_history_store": UserHistoryStore(),
-        }
-    return app.state.services
+    # Services from the startup warm-up (started here if the lifespan hook did not
+    # run); looking one up waits until that service is built.
+    return shared_warmup().services()
+
+
+def _parse_filters(filters: Optional[RecipeFiltersRequest]) -> Optional[RecipeFilters]:
+    return RecipeFilters.from_dict(filters.model_dump()) if filters is not None else None
 
 
 @app.get("/health")
-def health() -> Dict[str, str]:
-    return {"status": "healthy"}
+def health() -> Dict[str, Any]:
+    warmup = shared_warmup()
+    out: Dict[str, Any] = {"status": "healthy", "ready": warmup.ready, "models": shared_registry().metrics()}
+    recipe_intelligence = warmup.ready_service("recipe_intelligence")
+    if recipe_intelligence is not None:
+        out["recipe_cache"] = recipe_intelligence.cache_stats()
+        out["recipe_cascade"] = recipe_intelligence.cascade_stats()
+        out["recipe_inference"] = recipe_intelligence.inference_stats()
+    return out
+
+
+@app.get("/health/live")
+def liveness() -> Dict[str, Any]:
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def readiness() -> JSONResponse:
+    # Per-service build state and timings, plus per-model load times.
+    status = shared_warmup().status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 
 @app.post("/api/voice-to-ingredients", response_model=VoiceToIngredientsResponse)
@@ -135,10 +194,24 @@ async def voice_to_ingredients(
 def get_recipes(req: GetRecipesRequest) -> GetRecipesResponse:
     services = _ensure_services()
     recipe_intelligence: RecipeIntelligence = services["recipe_intelligence"]
-    top_5 = recipe_intelligence.get_top_recipes(req.ingredients, k=5)
+    try:
+        top_5 = recipe_intelligence.get_top_recipes(req.ingredients, k=5, filters=_parse_filters(req.filters))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return GetRecipesResponse(top_5=[RecipeResult(**r) for r in top_5])
 
 
+@app.post("/api/get-recipes/batch", response_model=GetRecipesBatchResponse)
+def get_recipes_batch(req: GetRecipesBatchRequest) -> GetRecipesBatchResponse:
+    services = _ensure_services()
+    recipe_intelligence: RecipeIntelligence = services["recipe_intelligence"]
+    try:
+        results = recipe_intelligence.get_top_recipes_batch(req.pantries, k=req.k, filters=_parse_filters(req.filters))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return GetRecipesBatchResponse(results=[[RecipeResult(**r) for r in rows] for rows in results])
+
+
 @app.post("/api/recommend-more", response_model=RecommendMoreResponse)
 def recommend_more(req: RecommendMoreRequest) -> RecommendMoreResponse:
     services = _ensure_services()
@@ -168,3 +241,17 @@ def feedback(req: FeedbackRequest) -> FeedbackResponse:
     )
     return FeedbackResponse(status="ok")
 
+
+@app.post("/admin/reload-catalog", response_model=ReloadCatalogResponse)
+def reload_catalog(req: ReloadCatalogRequest) -> ReloadCatalogResponse:
+    services = _ensure_services()
+    recipe_intelligence: RecipeIntelligence = services["recipe_intelligence"]
+    generation = recipe_intelligence.reload_catalog(background=req.background)
+    status = "scheduled" if generation is None else "ok"
+    return ReloadCatalogResponse(status=status, catalog=recipe_intelligence.catalog_info())
+
+
+@app.get("/admin/models")
+def loaded_models() -> Dict[str, Any]:
+    # Every model loaded in this worker: load time, approximate memory, hits.
+    return shared_registry().stats()
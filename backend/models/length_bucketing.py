@@ -0,0 +1,65 @@
+import random
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import torch
+from torch.utils.data import Sampler
+
+
+def length_buckets(lengths: Sequence[int], batch_size: int, shuffle: bool = False, pool_batches: int = 50, seed: Optional[int] = None) -> List[List[int]]:
+    """
+    Index batches of similar length, so each batch pads only to its own maximum.
+
+    Without shuffling, indices are sorted by length and cut into batches. With
+    shuffling, indices are shuffled, split into pools of ``pool_batches``
+    batches, sorted by length within each pool, and the resulting batches are
+    shuffled -- batches stay near-uniform in length but vary across epochs.
+    """
+    batch_size = max(int(batch_size), 1)
+    order = list(range(len(lengths)))
+    if not shuffle:
+        order.sort(key=lambda i: lengths[i])
+        return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    rng = random.Random(seed)
+    rng.shuffle(order)
+    pool = batch_size * max(int(pool_batches), 1)
+    batches = []
+    for start in range(0, len(order), pool):
+        chunk = sorted(order[start:start + pool], key=lambda i: lengths[i])
+        batches.extend(chunk[i:i + batch_size] for i in range(0, len(chunk), batch_size))
+    rng.shuffle(batches)
+    return batches
+
+
+class LengthBucketSampler(Sampler):
+    """Batch sampler over ``length_buckets``; pass as ``DataLoader(batch_sampler=...)``."""
+
+    def __init__(self, lengths: Sequence[int], batch_size: int, shuffle: bool = True, pool_batches: int = 50, seed: Optional[int] = None) -> None:
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_batches = pool_batches
+        self.seed = seed
+        self.epoch = 0
+
+    def __iter__(self) -> Iterator[List[int]]:
+        seed = None if self.seed is None else self.seed + self.epoch
+        self.epoch += 1
+        return iter(length_buckets(self.lengths, self.batch_size, self.shuffle, self.pool_batches, seed))
+
+    def __len__(self) -> int:
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+
+def pad_index_sets(index_sets: Sequence[Sequence[int]], padding_idx: int = 0) -> torch.Tensor:
+    """(batch, longest set) LongTensor, padded with ``padding_idx``."""
+    width = max([len(s) for s in index_sets] + [1])
+    x = torch.full((len(index_sets), width), padding_idx, dtype=torch.long)
+    for row, idx in enumerate(index_sets):
+        if len(idx):
+            x[row, :len(idx)] = torch.as_tensor(idx, dtype=torch.long)
+    return x
+
+
+def collate_index_sets(batch: Sequence[Tuple[torch.Tensor, int]]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """DataLoader collate_fn for (indices, length) items: (padded batch, lengths)."""
+    return pad_index_sets([indices.tolist() for indices, _ in batch]), torch.tensor([length for _, length in batch], dtype=torch.long)
@@ -2,6 +2,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import math
+from typing import Optional
 
 class MAB(nn.Module):
     """Multihead Attention Block"""
@@ -17,17 +18,26 @@ class MAB(nn.Module):
             self.ln1 = nn.LayerNorm(dim_V)
         self.fc_o = nn.Linear(dim_V, dim_V)
 
-    def forward(self, Q, K):
+    def forward(self, Q, K, key_padding_mask: Optional[torch.Tensor] = None):
+        # key_padding_mask: (batch, num_keys), True where K is padding.
         Q = self.fc_q(Q)
         K, V = self.fc_k(K), self.fc_v(K)
 
-        dim_split = self.dim_V // self.num_heads
-        Q_ = torch.cat(Q.split(dim_split, 2), 0)
-        K_ = torch.cat(K.split(dim_split, 2), 0)
-        V_ = torch.cat(V.split(dim_split, 2), 0)
+        batch, dim_split = Q.size(0), self.dim_V // self.num_heads
+        Q_ = Q.view(batch, Q.size(1), self.num_heads, dim_split).transpose(1, 2)
+        K_ = K.view(batch, K.size(1), self.num_heads, dim_split).transpose(1, 2)
+        V_ = V.view(batch, V.size(1), self.num_heads, dim_split).transpose(1, 2)
 
-        A = torch.softmax(Q_.bmm(K_.transpose(1, 2)) / math.sqrt(self.dim_V), 2)
-        O = torch.cat((Q_ + A.bmm(V_)).split(Q.size(0), 0), 2)
+        attn_mask: Optional[torch.Tensor] = None
+        if key_padding_mask is not None:
+            # A set with no real keys attends to all of them rather than to none (NaN).
+            attend = ~key_padding_mask | key_padding_mask.all(dim=1, keepdim=True)
+            attn_mask = attend[:, None, None, :]
+        # Scores are scaled by sqrt(dim_V), not sqrt(dim_split); torch 2.0 has no
+        # `scale` argument, so Q is pre-scaled to cancel SDPA's own 1/sqrt(dim_split).
+        Q_scaled = Q_ * math.sqrt(dim_split / self.dim_V)
+        A_V = F.scaled_dot_product_attention(Q_scaled, K_, V_, attn_mask=attn_mask)
+        O = (Q_ + A_V).transpose(1, 2).reshape(batch, Q.size(1), self.dim_V)
         O = O if getattr(self, 'ln0', None) is None else self.ln0(O)
         O = O + F.relu(self.fc_o(O))
         O = O if getattr(self, 'ln1', None) is None else self.ln1(O)
@@ -39,8 +49,8 @@ class SAB(nn.Module):
         super(SAB, self).__init__()
         self.mab = MAB(dim_in, dim_in, dim_out, num_heads, ln=ln)
 
-    def forward(self, X):
-        return self.mab(X, X)
+    def forward(self, X, mask: Optional[torch.Tensor] = None):
+        return self.mab(X, X, mask)
 
 class ISAB(nn.Module):
     """Induced Set Attention Block"""
@@ -51,8 +61,9 @@ class ISAB(nn.Module):
         self.mab0 = MAB(dim_out, dim_in, dim_out, num_heads, ln=ln)
         self.mab1 = MAB(dim_in, dim_out, dim_out, num_heads, ln=ln)
 
-    def forward(self, X):
-        H = self.mab0(self.I.repeat(X.size(0), 1, 1), X)
+    def forward(self, X, mask: Optional[torch.Tensor] = None):
+        # Padded rows of X still get outputs; the next block masks them as keys.
+        H = self.mab0(self.I.repeat(X.size(0), 1, 1), X, mask)
         return self.mab1(X, H)
 
 class PMA(nn.Module):
@@ -63,13 +74,14 @@ class PMA(nn.Module):
         nn.init.xavier_uniform_(self.S)
         self.mab = MAB(dim, dim, dim, num_heads, ln=ln)
 
-    def forward(self, X):
-        return self.mab(self.S.repeat(X.size(0), 1, 1), X)
+    def forward(self, X, mask: Optional[torch.Tensor] = None):
+        return self.mab(self.S.repeat(X.size(0), 1, 1), X, mask)
 
 class SetTransformer(nn.Module):
     """
     Set Transformer for Recipe Representation.
-    Input: Set of Ingredient Embeddings (Batch, Num_Ingredients, Dim_In)
+    Input: Set of Ingredient Embeddings (Batch, Num_Ingredients, Dim_In),
+           optional padding mask (Batch, Num_Ingredients), True = padding
     Output: Recipe Embedding (Batch, Dim_Out) or decoded features
     """
     def __init__(self, dim_input=100, num_outputs=1, dim_output=128,
@@ -84,8 +96,30 @@ class SetTransformer(nn.Module):
             nn.Linear(dim_hidden, dim_output)
         )
 
-    def forward(self, X):
-        return self.dec(self.enc(X)).squeeze(1)
+    def forward(self, X, mask: Optional[torch.Tensor] = None):
+        for block in self.enc:
+            X = block(X, mask)
+        return self.dec[1](self.dec[0](X, mask)).squeeze(1)
+
+class SetTransformerWithEmbedding(nn.Module):
+    """Wraps SetTransformer with an embedding layer for ingredient indices."""
+    def __init__(self, vocab_size, embed_dim, hidden_dim, output_dim, num_heads, num_inds):
+        super(SetTransformerWithEmbedding, self).__init__()
+        self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
+        self.set_transformer = SetTransformer(
+            dim_input=embed_dim,
+            num_outputs=1,
+            dim_output=output_dim,
+            num_inds=num_inds,
+            dim_hidden=hidden_dim,
+            num_heads=num_heads,
+            ln=True
+        )
+
+    def forward(self, x):
+        # x: (batch, seq_len) -> (batch, seq_len, embed_dim) -> (batch, output_dim)
+        # Index 0 is padding and is masked out of attention.
+        return self.set_transformer(self.embedding(x), x == 0)
 
 if __name__ == "__main__":
     # Sanity check
@@ -1,15 +1,13 @@
 from flask import Blueprint, request, jsonify
-from services.voice_pipeline import VoicePipeline
-from services.category_classifier import CategoryClassifier
-from services.recipe_intelligence import RecipeIntelligence
+from services.warmup import ServiceProxy
 
 ingredients_bp = Blueprint('ingredients', __name__)
 
-# Initialize services (Lazy load to speed up start if models not present)
-# In production, these should be initialized globally or via a factory
-classifier = CategoryClassifier()
-voice_pipeline = VoicePipeline(classifier)
-recipe_service = RecipeIntelligence()
+# Services are built once per process by the background warm-up
+# (services/warmup.py); handlers wait for them if it is still running
+classifier = ServiceProxy("category_classifier")
+voice_pipeline = ServiceProxy("voice_pipeline")
+recipe_service = ServiceProxy("recipe_intelligence")
 
 @ingredients_bp.route('/extract', methods=['POST'])
 def extract_ingredients():
@@ -57,10 +55,7 @@ def search_ingredients():
             return jsonify({'results': []})
 
         # Get unique ingredients from both recipes and the expanded dataset
-        all_ings = set()
-        for recipe in recipe_service._recipes:
-            for ing in recipe.ingredients:
-                all_ings.add(ing.lower())
+        all_ings = set(recipe_service.known_ingredients())
         
         # Add items from the larger grocery dataset
         all_ings.update([item.lower() for item in classifier.get_known_items()])
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
-from services.recipe_intelligence import RecipeIntelligence
+from services.recipe_filters import RecipeFilters
+from services.warmup import ServiceProxy
 
 recipes_bp = Blueprint('recipes', __name__)
-recipe_service = RecipeIntelligence()
+# Built by the background warm-up (services/warmup.py), shared by every blueprint
+recipe_service = ServiceProxy("recipe_intelligence")
 
 @recipes_bp.route('/recommend', methods=['POST'])
 def recommend_recipes():
@@ -11,19 +13,28 @@ def recommend_recipes():
     Request Body:
         {
             "ingredients": ["milk", "eggs", "flour"],
-            "limit": 5
+            "limit": 5,
+            "cursor": "<next_cursor from the previous page>",  (optional)
+            "filters": {                                       (optional)
+                "max_prep_time_mins": 20,
+                "min_rating": 4.0,
+                "exclude": ["peanuts", "dairy"],
+                "diets": ["vegetarian"]
+            }
         }
     """
     try:
         data = request.json
         ingredients = data.get('ingredients', [])
         limit = data.get('limit', 5)
+        cursor = data.get('cursor')
+        filters = RecipeFilters.from_dict(data.get('filters'))
         
         # If no ingredients, provide popular recipes as fallback
         if not ingredients:
-            recommendations = recipe_service.get_top_recipes(['milk', 'eggs'], k=limit)
+            recommendations, next_cursor = recipe_service.get_recipe_page(['milk', 'eggs'], limit=limit, cursor=cursor, filters=filters)
         else:
-            recommendations = recipe_service.get_top_recipes(ingredients, k=limit)
+            recommendations, next_cursor = recipe_service.get_recipe_page(ingredients, limit=limit, cursor=cursor, filters=filters)
             
         # Analyze missing ingredients for the top match to provide "Smart Suggestions"
         extras = {}
@@ -38,7 +49,17 @@ def recommend_recipes():
             'top_5': recommendations,  # Alias for SmartPantryApi
             'smart_suggestions': extras,
             'substitutes': extras.get('substitutes', {}), # Alias for SmartPantryApi
-            'extra_suggestions': extras.get('extra_suggestions', []) # Alias for SmartPantryApi
+            'extra_suggestions': extras.get('extra_suggestions', []), # Alias for SmartPantryApi
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        # Malformed or expired cursor, invalid filters
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@recipes_bp.route('/filters', methods=['GET'])
+def recipe_filters():
+    """Diet tags and allergen groups accepted by the "filters" object of /recommend."""
+    return jsonify(recipe_service.filter_options())
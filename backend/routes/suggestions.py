@@ -9,12 +9,11 @@ Provides smart grocery suggestions based on:
 """
 
 from flask import Blueprint, jsonify, request
-from services.recipe_intelligence import RecipeIntelligence
-from services.category_classifier import CategoryClassifier
+from services.warmup import ServiceProxy
 
 suggestions_bp = Blueprint('suggestions', __name__)
-recipe_service = RecipeIntelligence()
-category_service = CategoryClassifier()
+recipe_service = ServiceProxy("recipe_intelligence")
+category_service = ServiceProxy("category_classifier")
 
 @suggestions_bp.route('/', methods=['GET'])
 def get_suggestions():
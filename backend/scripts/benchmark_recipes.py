@@ -0,0 +1,441 @@
+"""
+Recipe Intelligence Latency Benchmark for SmartCart AI
+
+Generates synthetic recipe catalogs (1k to 1M recipes by default) following
+the recipes_sample.json schema -- name, ingredients, rating, prep_time_mins,
+steps -- with Zipf-distributed ingredient popularity, then drives
+get_top_recipes and recommend_more with skewed pantry queries.
+
+Every catalog size runs in its own subprocess so peak RSS is measured per
+size. Results (p50/p95/p99/mean latency, throughput, startup time, peak RSS)
+are written as JSON; pass --compare with an earlier result file to print
+per-operation deltas.
+
+--inference-modes compares the opt-in model inference modes (int8 dynamic
+quantization, TorchScript, both) against eager fp32 for the Set Transformer
+and the autoencoder: forward-pass latency at batch size 1 and 32, and the
+accuracy delta (embedding cosine similarity, top-5 completion overlap).
+
+Synthetic catalogs are written in the columnar format of ingest_foodcom.py
+and reused from --work-dir across runs with the same size and seed.
+
+Usage:
+    python backend/scripts/benchmark_recipes.py [--sizes 1000,10000,100000,1000000] [--queries 1000]
+        [--out bench.json] [--compare previous.json]
+    python backend/scripts/benchmark_recipes.py --sizes "" --inference-modes eager,int8,torchscript,int8-torchscript
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.recipe_catalog import RecipeCatalog, norm_ingredient
+
+SAMPLE_PATH = os.path.join(backend_dir, "data", "recipes_sample.json")
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+OPERATIONS = ("get_top_recipes", "recommend_more")
+ZIPF_EXPONENT = 1.07
+
+
+# === Synthetic data ===
+def ingredient_popularity(n_recipes):
+    """Ingredient names by descending popularity and their sampling probabilities.
+
+    The sample catalog's real ingredients take the most popular ranks; the
+    vocabulary grows with sqrt(n) like Food.com (~15k ingredients at 230k recipes).
+    """
+    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+        sample = json.load(f)
+    counts = {}
+    for r in sample:
+        for x in r.get("ingredients", []):
+            n = norm_ingredient(str(x))
+            counts[n] = counts.get(n, 0) + 1
+    names = sorted(counts, key=lambda n: (-counts[n], n))
+    n_synthetic = int(30 * np.sqrt(n_recipes))
+    names += [f"ingredient {i:07d}" for i in range(n_synthetic)]
+    weights = 1.0 / np.arange(1, len(names) + 1) ** ZIPF_EXPONENT
+    return names, weights / weights.sum()
+
+
+def generate_catalog(n_recipes, seed):
+    """Vectorized synthetic catalog with the columns of recipes_sample.json."""
+    rng = np.random.default_rng(seed)
+    names, popularity = ingredient_popularity(n_recipes)
+
+    # Ingredient IDs must follow lexical order, as in RecipeCatalogBuilder.
+    order = sorted(range(len(names)), key=names.__getitem__)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+
+    sizes = np.clip(3 + rng.poisson(6, size=n_recipes), 1, 30)
+    rows = np.repeat(np.arange(n_recipes, dtype=np.int64), sizes)
+    ids = rank[rng.choice(len(names), size=len(rows), p=popularity)]
+    # Sorted, de-duplicated (recipe, ingredient) pairs.
+    keys = np.unique(rows * len(names) + ids)
+    rows, ids = keys // len(names), keys % len(names)
+    offsets = np.zeros(n_recipes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_recipes), out=offsets[1:])
+
+    recipe_names = [f"Synthetic Recipe {i}" for i in range(n_recipes)]
+    name_offsets = np.zeros(n_recipes + 1, dtype=np.int64)
+    np.cumsum([len(n) for n in recipe_names], out=name_offsets[1:])
+
+    ratings = np.round(np.clip(rng.normal(4.4, 0.3, size=n_recipes), 1.0, 5.0), 1)
+    prep_times = np.clip(rng.lognormal(np.log(25), 0.7, size=n_recipes), 1, 600).astype(np.int32)
+    step_counts = (1 + rng.poisson(8, size=n_recipes)).astype(np.int32)
+    simplicity = 1.0 / (1.0 + np.log1p(step_counts))
+
+    return RecipeCatalog(
+        ingredient_names=[names[i] for i in order],
+        name_blob="".join(recipe_names).encode("utf-8"),
+        name_offsets=name_offsets,
+        offsets=offsets,
+        ingredient_ids=ids.astype(np.int32),
+        ratings=ratings,
+        prep_times=prep_times,
+        step_counts=step_counts,
+        simplicity=simplicity,
+    )
+
+
+def generate_queries(n_recipes, n_queries, seed):
+    """Skewed pantries: popular staples dominate, with some casing noise and unknown items."""
+    rng = np.random.default_rng(seed + 1)
+    names, popularity = ingredient_popularity(n_recipes)
+    queries = []
+    for i in range(n_queries):
+        size = int(np.clip(3 + rng.poisson(5), 1, 25))
+        pantry = [names[j] for j in dict.fromkeys(rng.choice(len(names), size=size, p=popularity).tolist())]
+        if rng.random() < 0.2:
+            pantry = [p.title() for p in pantry]
+        if rng.random() < 0.1:
+            pantry.append(f"mystery item {i}")
+        have = set(pantry)
+        missing = [names[j] for j in rng.choice(len(names), size=4, p=popularity).tolist() if names[j] not in have]
+        queries.append((pantry, missing[: int(rng.integers(1, 5))]))
+    return queries
+
+
+def ensure_catalog(work_dir, n_recipes, seed):
+    path = os.path.join(work_dir, f"catalog-n{n_recipes}-s{seed}")
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        return path, 0.0
+    t0 = time.perf_counter()
+    generate_catalog(n_recipes, seed).save(path)
+    return path, time.perf_counter() - t0
+
+
+# === Measurement (child process) ===
+def peak_rss_mb(who="self"):
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0
+    return usage.ru_maxrss / scale
+
+
+def summarize(latencies, wall_seconds):
+    lat = np.asarray(latencies) * 1000.0
+    return {
+        "queries": len(lat),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "mean_ms": float(lat.mean()),
+        "max_ms": float(lat.max()),
+        "throughput_qps": len(lat) / wall_seconds if wall_seconds > 0 else None,
+    }
+
+
+def run_operation(call, queries, warmup, threads, max_seconds):
+    # Warmup gets a quarter of the budget so very slow configurations still finish.
+    warmup_deadline = time.perf_counter() + max_seconds / 4
+    for q in queries[:warmup]:
+        call(q)
+        if time.perf_counter() > warmup_deadline:
+            break
+
+    def timed(q):
+        t0 = time.perf_counter()
+        call(q)
+        return time.perf_counter() - t0
+
+    latencies = []
+    timed_queries = queries[warmup:]
+    deadline = time.perf_counter() + max_seconds
+    start = time.perf_counter()
+    batch = max(threads, 1)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for i in range(0, len(timed_queries), batch):
+            latencies.extend(pool.map(timed, timed_queries[i:i + batch]))
+            if time.perf_counter() > deadline:
+                break
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_child(args):
+    # Environment is prepared by the parent; import after it is set.
+    import contextlib
+    import io
+    from services.recipe_intelligence import RecipeIntelligence
+
+    queries = generate_queries(args.child_size, args.queries + args.warmup, args.seed)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ri = RecipeIntelligence()
+    startup = time.perf_counter() - t0
+    info = ri.catalog_info()
+    result = {
+        "recipes": info["recipes"],
+        "ingredients": info["ingredients"],
+        "startup_s": startup,
+        "rss_after_startup_mb": peak_rss_mb(),
+        "operations": {},
+    }
+    calls = {
+        "get_top_recipes": lambda q: ri.get_top_recipes(q[0], k=args.k),
+        "recommend_more": lambda q: ri.recommend_more(q[0], q[1]),
+    }
+    for op in args.operations.split(","):
+        result["operations"][op] = run_operation(calls[op], queries, args.warmup, args.threads, args.max_seconds)
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["peak_rss_children_mb"] = peak_rss_mb("children")
+    result["cache"] = ri.cache_stats()
+    print(json.dumps(result))
+
+
+def random_index_sets(vocab_size, n_sets, seed, max_len=20):
+    rng = np.random.default_rng(seed)
+    return [rng.choice(np.arange(1, vocab_size), size=int(rng.integers(1, max_len + 1)), replace=False) for _ in range(n_sets)]
+
+
+def time_forward(fn, batches, max_seconds):
+    import torch
+
+    with torch.no_grad():
+        for x in batches[:3]:
+            fn(x)
+        latencies = []
+        deadline = time.perf_counter() + max_seconds
+        for x in batches:
+            t0 = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - t0)
+            if time.perf_counter() > deadline:
+                break
+    lat = np.asarray(latencies) * 1000.0
+    return {"p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)), "mean_ms": float(lat.mean())}
+
+
+def benchmark_inference_modes(modes, n_sets, seed, max_seconds):
+    # All modes are built from the same loaded eager models, so accuracy deltas
+    # measure quantization / compilation only.
+    import contextlib
+    import io
+    import torch
+    from models.length_bucketing import pad_index_sets
+    from services.recipe_intelligence import RecipeIntelligence
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ri = RecipeIntelligence()
+    models = {}
+    for name, model in ri.inference_models("eager").items():
+        sets = random_index_sets(model.vocab_size, n_sets, seed)
+        models[name] = (
+            0 if name == "set_transformer" else 1,
+            [pad_index_sets([s]) for s in sets],
+            [pad_index_sets(sets[i:i + 32]) for i in range(0, len(sets), 32)],
+        )
+
+    results, reference = {}, {}
+    for mode in modes:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            prepared = ri.inference_models(mode)
+        load_s = time.perf_counter() - t0
+        for name, (slot, singles, batches) in models.items():
+            fn = prepared[name].runner
+            call = (lambda x, fn=fn: fn(x)) if name == "set_transformer" else (lambda x, fn=fn: fn(x, x == 0)[0])
+            with torch.no_grad():
+                outputs = torch.cat([call(x) for x in batches])
+            entry = {
+                "applied": prepared[name].mode,
+                "load_s": load_s,
+                "batch_1": time_forward(call, singles, max_seconds),
+                "batch_32": time_forward(call, batches, max_seconds),
+            }
+            if name not in reference:
+                reference[name] = outputs
+            base = reference[name]
+            if slot == 0:
+                cos = torch.nn.functional.cosine_similarity(outputs, base, dim=1)
+                entry["cosine_vs_eager"] = {"mean": float(cos.mean()), "min": float(cos.min())}
+            else:
+                top, top_base = outputs.topk(5, dim=1).indices, base.topk(5, dim=1).indices
+                overlap = [len(set(a) & set(b)) / 5.0 for a, b in zip(top.tolist(), top_base.tolist())]
+                entry["top5_overlap_vs_eager"] = float(np.mean(overlap))
+            results.setdefault(name, {})[mode] = entry
+    return results
+
+
+def print_inference_modes(results):
+    print(f"\n  {'model':<16} {'mode (applied)':<30} {'b1 p50 ms':>10} {'b32 p50 ms':>11} {'vs eager':>9} {'accuracy':>9}")
+    for name, by_mode in results.items():
+        eager = by_mode.get("eager")
+        for mode, entry in by_mode.items():
+            speedup = f"{eager['batch_32']['p50_ms'] / entry['batch_32']['p50_ms']:>8.2f}x" if eager else "      n/a"
+            accuracy = entry["cosine_vs_eager"]["min"] if "cosine_vs_eager" in entry else entry["top5_overlap_vs_eager"]
+            label = mode if entry["applied"] == mode else f"{mode} ({entry['applied']})"
+            print(f"  {name:<16} {label:<30} {entry['batch_1']['p50_ms']:>10.3f} {entry['batch_32']['p50_ms']:>11.3f} "
+                  f"{speedup} {accuracy:>9.4f}")
+    print("  (accuracy: min embedding cosine vs eager for set_transformer, mean top-5 overlap for autoencoder)")
+
+
+# === Orchestration (parent process) ===
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def print_table(results):
+    print(f"\n  {'recipes':>9} {'operation':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>9} {'peak MB':>9}")
+    for run in results:
+        for op, stats in run["operations"].items():
+            print(f"  {run['recipes']:>9} {op:<16} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+                  f"{stats['throughput_qps']:>9.1f} {run['peak_rss_mb'] or 0:>9.1f}")
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {run["recipes"]: run for run in json.load(f).get("results", [])}
+    print(f"\nChange vs {baseline_path} (negative latency = faster):")
+    print(f"  {'recipes':>9} {'operation':<16} {'p50':>8} {'p95':>8} {'p99':>8} {'qps':>8} {'peak MB':>8}")
+
+    def delta(new, old):
+        return f"{100.0 * (new - old) / old:+7.1f}%" if old else "     n/a"
+
+    for run in results:
+        base = baseline.get(run["recipes"])
+        if base is None:
+            continue
+        for op, stats in run["operations"].items():
+            old = base["operations"].get(op)
+            if old is None:
+                continue
+            print(f"  {run['recipes']:>9} {op:<16} {delta(stats['p50_ms'], old['p50_ms'])} {delta(stats['p95_ms'], old['p95_ms'])} "
+                  f"{delta(stats['p99_ms'], old['p99_ms'])} {delta(stats['throughput_qps'], old['throughput_qps'])} "
+                  f"{delta(run['peak_rss_mb'] or 0, base.get('peak_rss_mb') or 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RecipeIntelligence across catalog sizes")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=1000, help="Timed queries per operation")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent request threads")
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="Time budget per operation and size")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled (off by default)")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "smartpantry-bench"),
+                        help="Where synthetic catalogs are written and reused")
+    parser.add_argument("--out", default=None, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="Earlier JSON report to diff against")
+    parser.add_argument("--inference-modes", default=None,
+                        help="Comma-separated model inference modes to compare against eager fp32 (e.g. eager,int8,torchscript,int8-torchscript)")
+    parser.add_argument("--child-size", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_size is not None:
+        run_child(args)
+        return
+
+    print("=" * 60)
+    print("Recipe Intelligence Benchmark")
+    print("=" * 60)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        catalog_path, build_s = ensure_catalog(args.work_dir, size, args.seed)
+        print(f"\n{size} recipes: catalog at {catalog_path}" + (f" (generated in {build_s:.1f}s)" if build_s else " (reused)"))
+
+        env = dict(os.environ)
+        env["SMARTPANTRY_CATALOG_DIR"] = catalog_path
+        env["SMARTPANTRY_CATALOG_POLL_SECS"] = "0"
+        if not args.cache:
+            env["SMARTPANTRY_RESULT_CACHE_SIZE"] = "0"
+        cmd = [sys.executable, os.path.abspath(__file__), "--child-size", str(size)]
+        for flag in ("queries", "warmup", "k", "threads", "max_seconds", "operations", "seed"):
+            cmd += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"[ERROR] Benchmark for {size} recipes failed:\n{proc.stderr[-2000:]}")
+            continue
+        run = json.loads(proc.stdout.strip().splitlines()[-1])
+        run["catalog_build_s"] = build_s
+        results.append(run)
+        for op, stats in run["operations"].items():
+            print(f"  {op:<16} p50 {stats['p50_ms']:.3f}ms  p99 {stats['p99_ms']:.3f}ms  {stats['throughput_qps']:.1f} q/s")
+
+    inference = None
+    if args.inference_modes:
+        modes = [m.strip() for m in args.inference_modes.split(",") if m.strip()]
+        if "eager" in modes:
+            modes.remove("eager")
+        print(f"\nModel inference modes: eager vs {', '.join(modes)}")
+        inference = benchmark_inference_modes(["eager"] + modes, args.queries, args.seed, args.max_seconds)
+        if not inference:
+            print("[ERROR] No Set Transformer or autoencoder checkpoint loaded")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("child_size", "out", "compare")},
+        "env": {k: v for k, v in os.environ.items() if k.startswith("SMARTPANTRY_")},
+        "results": results,
+    }
+    if inference is not None:
+        report["inference_modes"] = inference
+    if results:
+        print_table(results)
+    if inference:
+        print_inference_modes(inference)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[SUCCESS] Wrote benchmark report to {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
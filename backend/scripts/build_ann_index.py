@@ -0,0 +1,104 @@
+"""
+Approximate Nearest-Neighbour Index Builder for SmartCart AI
+
+Builds an IVF (inverted-file) index over the recipe embeddings produced by
+build_recipe_embeddings.py and reports recall@k against exact search for a
+sweep of nprobe values, so the serving recall/latency trade-off can be picked.
+
+Output:
+    backend/models/checkpoints/recipe_ann_ivf.npz
+
+At serve time the number of probed cells is set with SMARTPANTRY_ANN_NPROBE
+(default 8).
+
+Usage:
+    python backend/scripts/build_ann_index.py [--n-lists 1024] [--k 10] [--queries 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.ann_index import IVFIndex, exact_search
+
+CHECKPOINT_DIR = os.path.join(backend_dir, "models", "checkpoints")
+
+
+def evaluate_recall(index, vectors, queries, k, nprobe_values):
+    """Mean recall@k and mean per-query latency (ms) for every nprobe value."""
+    truth = [set(exact_search(vectors, q, k)[0].tolist()) for q in queries]
+    report = []
+    for nprobe in nprobe_values:
+        hits = 0
+        t0 = time.perf_counter()
+        found = [index.search(q, k, nprobe=nprobe)[0] for q in queries]
+        elapsed = time.perf_counter() - t0
+        for ids, expected in zip(found, truth):
+            hits += len(expected.intersection(ids.tolist()))
+        report.append({
+            "nprobe": nprobe,
+            "recall_at_k": hits / max(sum(len(t) for t in truth), 1),
+            "latency_ms": 1000.0 * elapsed / max(len(queries), 1),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the recipe IVF index")
+    parser.add_argument("--n-lists", type=int, default=None, help="Number of IVF cells (default 4*sqrt(n))")
+    parser.add_argument("--n-iter", type=int, default=20, help="k-means iterations")
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--queries", type=int, default=500, help="Number of evaluation queries")
+    parser.add_argument("--dir", default=CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Recipe ANN (IVF) Index Builder")
+    print("=" * 60)
+
+    emb_path = os.path.join(args.dir, "recipe_embeddings.npy")
+    meta_path = os.path.join(args.dir, "recipe_embeddings.json")
+    if not os.path.exists(emb_path) or not os.path.exists(meta_path):
+        print(f"\n[ERROR] Embeddings not found at {emb_path}")
+        print("Run build_recipe_embeddings.py first.")
+        return
+
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    vectors = np.load(emb_path, mmap_mode="r")
+    print(f"Loaded {vectors.shape[0]} x {vectors.shape[1]} embeddings")
+
+    t0 = time.perf_counter()
+    index = IVFIndex.build(vectors, n_lists=args.n_lists, n_iter=args.n_iter)
+    print(f"Built {index.n_lists} cells in {time.perf_counter() - t0:.1f}s")
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False))
+    queries = np.asarray(vectors[sample], dtype=np.float32)
+
+    nprobe_values = sorted({p for p in (1, 2, 4, 8, 16, 32, 64, 128) if p <= index.n_lists} | {index.n_lists})
+    print(f"\nrecall@{args.k} vs exact search ({len(queries)} queries):")
+    print(f"  {'nprobe':>8} {'recall':>8} {'ms/query':>10}")
+    for row in evaluate_recall(index, vectors, queries, args.k, nprobe_values):
+        print(f"  {row['nprobe']:>8} {row['recall_at_k']:>8.3f} {row['latency_ms']:>10.3f}")
+
+    out_path = os.path.join(args.dir, "recipe_ann_ivf.npz")
+    index.save(
+        out_path,
+        catalog_fingerprint=meta.get("catalog_fingerprint", ""),
+        encoder_version=meta.get("encoder_version") or "",
+    )
+    print(f"\n[SUCCESS] Saved IVF index to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
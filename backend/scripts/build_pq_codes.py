@@ -0,0 +1,110 @@
+"""
+Product-Quantized Recipe Embedding Builder for SmartCart AI
+
+Compresses the float32 recipe embeddings produced by build_recipe_embeddings.py
+into m-byte product-quantization codes and reports recall@k of asymmetric
+distance scoring (with and without exact re-ranking) against exact search.
+
+Output:
+    backend/models/checkpoints/recipe_embeddings_pq.npz
+
+Serving (opt-in):
+    SMARTPANTRY_EMBEDDING_CODEC=pq   score candidates from PQ codes
+    SMARTPANTRY_PQ_RERANK=100        re-rank the best 100 with exact dot products (0 = off)
+
+Usage:
+    python backend/scripts/build_pq_codes.py [--m 16] [--k 10] [--queries 500]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.ann_index import exact_search
+from services.pq_codec import PQScorer, ProductQuantizer
+
+CHECKPOINT_DIR = os.path.join(backend_dir, "models", "checkpoints")
+
+
+def evaluate_recall(pq, codes, vectors, queries, k, rerank_values):
+    """Mean recall@k and per-query latency (ms) for each exact re-rank shortlist size."""
+    truth = [set(exact_search(vectors, q, k)[0].tolist()) for q in queries]
+    report = []
+    for rerank in rerank_values:
+        scorer = PQScorer(pq, codes, vectors=vectors, rerank=rerank)
+        t0 = time.perf_counter()
+        found = [scorer.search(q, k)[0] for q in queries]
+        elapsed = time.perf_counter() - t0
+        hits = sum(len(expected.intersection(ids.tolist())) for ids, expected in zip(found, truth))
+        report.append({
+            "rerank": rerank,
+            "recall_at_k": hits / max(sum(len(t) for t in truth), 1),
+            "latency_ms": 1000.0 * elapsed / max(len(queries), 1),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build PQ codes for the recipe embeddings")
+    parser.add_argument("--m", type=int, default=16, help="Sub-quantizers = bytes per recipe")
+    parser.add_argument("--ks", type=int, default=256, help="Centroids per sub-quantizer (<= 256)")
+    parser.add_argument("--n-iter", type=int, default=20, help="k-means iterations")
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--queries", type=int, default=500, help="Number of evaluation queries")
+    parser.add_argument("--dir", default=CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Recipe Embedding PQ Codec Builder")
+    print("=" * 60)
+
+    emb_path = os.path.join(args.dir, "recipe_embeddings.npy")
+    meta_path = os.path.join(args.dir, "recipe_embeddings.json")
+    if not os.path.exists(emb_path) or not os.path.exists(meta_path):
+        print(f"\n[ERROR] Embeddings not found at {emb_path}")
+        print("Run build_recipe_embeddings.py first.")
+        return
+
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    vectors = np.load(emb_path, mmap_mode="r")
+    n, dim = vectors.shape
+    print(f"Loaded {n} x {dim} embeddings")
+
+    t0 = time.perf_counter()
+    pq = ProductQuantizer.train(vectors, m=args.m, ks=args.ks, n_iter=args.n_iter)
+    codes = pq.encode(vectors)
+    print(f"Trained and encoded in {time.perf_counter() - t0:.1f}s")
+    print(f"  {dim * 4} -> {codes.shape[1]} bytes per recipe ({dim * 4 / codes.shape[1]:.0f}x smaller)")
+    print(f"  {n * dim * 4 / 2**20:.1f} MiB float32 -> {codes.nbytes / 2**20:.1f} MiB codes")
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(n, size=min(args.queries, n), replace=False))
+    queries = np.asarray(vectors[sample], dtype=np.float32)
+
+    print(f"\nrecall@{args.k} vs exact search ({len(queries)} queries):")
+    print(f"  {'rerank':>8} {'recall':>8} {'ms/query':>10}")
+    for row in evaluate_recall(pq, codes, vectors, queries, args.k, [0, 2 * args.k, 10 * args.k]):
+        print(f"  {row['rerank']:>8} {row['recall_at_k']:>8.3f} {row['latency_ms']:>10.3f}")
+
+    out_path = os.path.join(args.dir, "recipe_embeddings_pq.npz")
+    pq.save(
+        out_path,
+        codes,
+        catalog_fingerprint=meta.get("catalog_fingerprint", ""),
+        encoder_version=meta.get("encoder_version") or "",
+    )
+    print(f"\n[SUCCESS] Saved PQ codes to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Recipe Embedding Index Builder for SmartCart AI
+
+Encodes every recipe in the loaded catalog with the trained Set Transformer
+(SetTransformerWithEmbedding) and writes the L2-normalized float32 embeddings
+next to the checkpoints:
+
+    backend/models/checkpoints/recipe_embeddings.npy   (memory-mapped at serve time)
+    backend/models/checkpoints/recipe_embeddings.json  (row count, dim, catalog fingerprint)
+
+RecipeIntelligence.get_similar_recipes then answers a query with one
+matrix-vector product against the memory-mapped file.
+
+Usage:
+    python backend/scripts/build_recipe_embeddings.py [--batch-size 256]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.recipe_intelligence import RecipeIntelligence
+
+CHECKPOINT_DIR = os.path.join(backend_dir, "models", "checkpoints")
+
+
+def build_embeddings(ri, out_dir, batch_size=256):
+    emb_path = os.path.join(out_dir, "recipe_embeddings.npy")
+    meta_path = os.path.join(out_dir, "recipe_embeddings.json")
+    tmp_path = emb_path + ".tmp.npy"
+
+    out = None
+    written = 0
+    for start, block in ri.iter_recipe_embeddings(batch_size=batch_size):
+        if out is None:
+            total = ri.recipe_embeddings_meta(block.shape[1])["count"]
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(total, block.shape[1]))
+        out[start:start + len(block)] = block
+        written += len(block)
+        if (start // batch_size) % 100 == 0:
+            print(f"  Encoded {written}/{out.shape[0]} recipes")
+
+    if out is None:
+        return None
+    out.flush()
+    dim = out.shape[1]
+    del out
+    os.replace(tmp_path, emb_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(ri.recipe_embeddings_meta(dim), f)
+    return emb_path, written, dim
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the recipe embedding index")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--out-dir", default=CHECKPOINT_DIR)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Recipe Embedding Index Builder")
+    print("=" * 60)
+
+    ri = RecipeIntelligence()
+    t0 = time.perf_counter()
+    result = build_embeddings(ri, args.out_dir, batch_size=args.batch_size)
+    if result is None:
+        print("\n[ERROR] No trained SetTransformerWithEmbedding checkpoint could be loaded.")
+        print("Run train_set_transformer.py first.")
+        return
+
+    emb_path, count, dim = result
+    print(f"\n[SUCCESS] Wrote {count} x {dim} embeddings to {emb_path} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+ONNX Export for the SmartCart AI Voice Pipelines
+
+Exports the Whisper (ASR), T5 (text normalization) and DistilBERT (NER)
+models used by VoicePipeline to ONNX, optionally with int8 weights, so a
+server started with SMARTPANTRY_PIPELINE_BACKEND=onnx loads them without
+exporting on its first request. With --benchmark, times each ONNX Runtime
+pipeline against the torch one on a sample input.
+
+Models are read from SMARTPANTRY_WHISPER_MODEL / SMARTPANTRY_T5_MODEL /
+SMARTPANTRY_NER_MODEL, as in the server. Requires optimum[onnxruntime]
+(pip install -r backend/requirements-onnx.txt).
+
+Output:
+    backend/models/checkpoints/onnx/  (override with SMARTPANTRY_ONNX_DIR)
+
+Usage:
+    python backend/scripts/export_onnx_pipelines.py [--quantize] [--benchmark] [--threads 4]
+"""
+
+import argparse
+import numbers
+import os
+import statistics
+import sys
+import time
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.model_registry import ModelRegistry
+from services.onnx_pipelines import default_onnx_dir, export_onnx_model
+
+SAMPLE_TEXT = "two cups of basmati rice, chicken breast and a bunch of fresh coriander"
+
+PIPELINES = [
+    # (kind, task, model env var, default model)
+    ("asr", "automatic-speech-recognition", "SMARTPANTRY_WHISPER_MODEL", "openai/whisper-tiny"),
+    ("text2text", "text2text-generation", "SMARTPANTRY_T5_MODEL", "t5-small"),
+    ("ner", "token-classification", "SMARTPANTRY_NER_MODEL", "elastic/distilbert-base-uncased-finetuned-conll03-english"),
+]
+
+
+def sample_input(kind):
+    if kind == "asr":
+        import numpy as np
+
+        # Three seconds of quiet noise at Whisper's sampling rate
+        rng = np.random.default_rng(0)
+        return {"raw": (rng.standard_normal(16000 * 3) * 0.01).astype(np.float32), "sampling_rate": 16000}
+    if kind == "text2text":
+        return f"summarize: {SAMPLE_TEXT}"
+    return SAMPLE_TEXT
+
+
+def time_pipeline(pipe, inputs, repeats):
+    # The ASR pipeline pops keys from a dict input, so each call gets a copy.
+    fresh = lambda: dict(inputs) if isinstance(inputs, dict) else inputs
+    pipe(fresh())  # warm-up
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = pipe(fresh())
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), out
+
+
+def same_output(a, b, tol=1e-4):
+    # Equal structure and text; scores may differ by float rounding between runtimes.
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_output(a[k], b[k], tol) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same_output(x, y, tol) for x, y in zip(a, b))
+    if isinstance(a, numbers.Real) and not isinstance(a, (bool, int)):
+        return isinstance(b, numbers.Real) and abs(float(a) - float(b)) <= tol
+    return a == b
+
+
+def load_pipeline(kind, backend, quantize):
+    os.environ["SMARTPANTRY_PIPELINE_BACKEND"] = backend
+    os.environ["SMARTPANTRY_ONNX_QUANTIZE"] = "1" if quantize else "0"
+    registry = ModelRegistry(memory_budget_mb=0)
+    return getattr(registry, f"get_{kind}_pipeline")()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the voice pipeline models to ONNX")
+    parser.add_argument("--quantize", action="store_true", help="Export with dynamic int8 weights")
+    parser.add_argument("--only", default="asr,text2text,ner", help="Comma-separated subset of asr,text2text,ner")
+    parser.add_argument("--benchmark", action="store_true", help="Compare ONNX Runtime and torch latency")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads for --benchmark (0 = default)")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ONNX Export (Voice Pipelines)")
+    print("=" * 60)
+    print(f"\nOutput: {default_onnx_dir()}  int8: {args.quantize}")
+
+    selected = {k.strip() for k in args.only.split(",") if k.strip()}
+    failed = 0
+    for kind, task, env_var, default_model in PIPELINES:
+        if kind not in selected:
+            continue
+        model_name = os.environ.get(env_var, default_model)
+        t0 = time.perf_counter()
+        try:
+            path = export_onnx_model(task, model_name, quantize=args.quantize)
+        except Exception as e:
+            print(f"\n[ERROR] {kind}: could not export {model_name}: {e}")
+            failed += 1
+            continue
+        size_mb = sum(p.stat().st_size for p in path.glob("*.onnx")) / 1e6
+        print(f"\n{kind}: {model_name} -> {path.name} ({size_mb:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+
+    if args.benchmark:
+        os.environ["SMARTPANTRY_ONNX_THREADS"] = str(args.threads)
+        print(f"\n{'pipeline':<12}{'torch ms':>12}{'onnx ms':>12}{'speedup':>10}  same output")
+        for kind, _, _, _ in PIPELINES:
+            if kind not in selected:
+                continue
+            torch_pipe = load_pipeline(kind, "torch", False)
+            onnx_pipe = load_pipeline(kind, "onnx", args.quantize)
+            if torch_pipe is None or onnx_pipe is None:
+                print(f"{kind:<12}  (pipeline unavailable)")
+                continue
+            inputs = sample_input(kind)
+            torch_ms, torch_out = time_pipeline(torch_pipe, inputs, args.repeats)
+            onnx_ms, onnx_out = time_pipeline(onnx_pipe, inputs, args.repeats)
+            print(f"{kind:<12}{torch_ms:>12.1f}{onnx_ms:>12.1f}{torch_ms / onnx_ms:>9.2f}x  {same_output(torch_out, onnx_out)}")
+
+    if failed:
+        print(f"\n[ERROR] {failed} export(s) failed")
+        sys.exit(1)
+    print("\n[SUCCESS] ONNX export complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Food.com Catalog Ingest for SmartCart AI
+
+Streams RAW_recipes.csv (and, optionally, RAW_interactions.csv for ratings)
+row by row into a binary columnar recipe catalog: recipe names, CSR ingredient
+ID arrays with offsets, ratings, prep times, step counts, tags and the
+inverted ingredient -> recipe index, one .npy file per column.
+
+RecipeIntelligence memory-maps this catalog at startup instead of parsing
+JSON, so cold start is a few file opens and every worker process shares the
+same pages through the OS cache.
+
+Output:
+    $SMARTPANTRY_CATALOG_DIR, default backend/data/catalog/ (the directory
+    RecipeIntelligence loads; --out writes elsewhere)
+
+Usage:
+    python backend/scripts/ingest_foodcom.py [--recipes RAW_recipes.csv] [--interactions RAW_interactions.csv]
+"""
+
+import argparse
+import ast
+import csv
+import os
+import re
+import sys
+import time
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.recipe_catalog import RecipeCatalog, RecipeCatalogBuilder, default_catalog_dir
+
+RAW_DIR = os.path.join(backend_dir, "data", "raw")
+INT32_MAX = 2 ** 31 - 1
+
+# Quoted items of a Python list literal such as "['salt', \"baker's chocolate\"]".
+_QUOTED = re.compile(r"'([^'\\]*)'|\"([^\"\\]*)\"")
+
+
+def parse_list_literal(text):
+    """Parses the string-list columns (ingredients, steps, tags) without ast for the common case."""
+    if "\\" in text:
+        try:
+            value = ast.literal_eval(text)
+            return [str(x) for x in value] if isinstance(value, list) else []
+        except (ValueError, SyntaxError):
+            return []
+    return [a or b for a, b in _QUOTED.findall(text)]
+
+
+def load_mean_ratings(csv_path, progress_every):
+    """Mean non-zero rating per recipe id (Food.com uses 0 for reviews without a rating)."""
+    sums, counts = {}, {}
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rid_col, rating_col = header.index("recipe_id"), header.index("rating")
+        for n, row in enumerate(reader, start=1):
+            try:
+                rating = float(row[rating_col])
+                if rating <= 0:
+                    continue
+                rid = row[rid_col]
+                sums[rid] = sums.get(rid, 0.0) + rating
+                counts[rid] = counts.get(rid, 0) + 1
+            except (ValueError, IndexError):
+                continue
+            if progress_every and n % progress_every == 0:
+                print(f"  {n} interactions...")
+    return {rid: sums[rid] / counts[rid] for rid in sums}
+
+
+def ingest_recipes(csv_path, ratings, min_ingredients, default_rating, progress_every):
+    """Streams RAW_recipes.csv into a RecipeCatalogBuilder; returns (builder, skipped)."""
+    builder = RecipeCatalogBuilder()
+    skipped = 0
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        col = {name: i for i, name in enumerate(header)}
+        for n, row in enumerate(reader, start=1):
+            try:
+                name = row[col["name"]].strip()
+                ingredients = parse_list_literal(row[col["ingredients"]])
+                if not name or len(ingredients) < min_ingredients:
+                    skipped += 1
+                    continue
+                minutes = min(max(int(float(row[col["minutes"]] or 0)), 0), INT32_MAX)
+                n_steps = int(float(row[col["n_steps"]] or 0)) if "n_steps" in col else len(parse_list_literal(row[col["steps"]]))
+                rating = ratings.get(row[col["id"]], default_rating) if "id" in col else default_rating
+                tags = parse_list_literal(row[col["tags"]]) if "tags" in col else []
+            except (ValueError, IndexError, KeyError):
+                skipped += 1
+                continue
+            builder.add(name, ingredients, rating, minutes, n_steps, tags)
+            if progress_every and n % progress_every == 0:
+                print(f"  {n} recipes...")
+    return builder, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Food.com CSVs into a memory-mapped recipe catalog")
+    parser.add_argument("--recipes", default=os.path.join(RAW_DIR, "RAW_recipes.csv"))
+    parser.add_argument("--interactions", default=os.path.join(RAW_DIR, "RAW_interactions.csv"),
+                        help="Optional; recipes without ratings get --default-rating")
+    parser.add_argument("--out", default=str(default_catalog_dir()),
+                        help="Defaults to $SMARTPANTRY_CATALOG_DIR, else backend/data/catalog")
+    parser.add_argument("--min-ingredients", type=int, default=1)
+    parser.add_argument("--default-rating", type=float, default=4.0)
+    parser.add_argument("--progress-every", type=int, default=50000, help="Rows between progress lines (0 = quiet)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Food.com Catalog Ingest")
+    print("=" * 60)
+
+    if not os.path.exists(args.recipes):
+        print(f"\n[ERROR] Recipes CSV not found at {args.recipes}")
+        print("Download the Food.com dataset and place 'RAW_recipes.csv' in:")
+        print(f"  {RAW_DIR}")
+        return
+
+    # Some Food.com description/steps fields exceed the csv module's default limit.
+    csv.field_size_limit(INT32_MAX)
+
+    ratings = {}
+    if os.path.exists(args.interactions):
+        t0 = time.perf_counter()
+        print(f"\nReading ratings from {args.interactions}...")
+        ratings = load_mean_ratings(args.interactions, args.progress_every)
+        print(f"Rated recipes: {len(ratings)} ({time.perf_counter() - t0:.1f}s)")
+    else:
+        print(f"\nNo interactions file at {args.interactions}; using rating {args.default_rating}")
+
+    t0 = time.perf_counter()
+    print(f"\nStreaming recipes from {args.recipes}...")
+    builder, skipped = ingest_recipes(args.recipes, ratings, args.min_ingredients, args.default_rating, args.progress_every)
+    if len(builder) == 0:
+        print("\n[ERROR] No usable recipes found")
+        return
+    catalog = builder.build()
+    print(f"Parsed {len(catalog)} recipes, {len(catalog.ingredient_names)} ingredients, {len(catalog.tag_names)} tags, skipped {skipped} ({time.perf_counter() - t0:.1f}s)")
+
+    catalog.save(args.out)
+
+    t0 = time.perf_counter()
+    RecipeCatalog.load(args.out)
+    print(f"Memory-mapped load check: {1000.0 * (time.perf_counter() - t0):.1f}ms")
+    print(f"\n[SUCCESS] Saved catalog to {args.out}")
+    print("Rebuild recipe embeddings / ANN / PQ artifacts if you use them; they are tied to the catalog.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Association Rule Miner for SmartCart AI
+
+Runs FP-Growth over the ingredient lists of every recipe in the catalog
+(the ingested columnar catalog when present, else data/recipes_sample.json),
+plus the ingredient baskets recorded in data/user_history.jsonl, and writes
+single-consequent rules with support, confidence and lift to a compact
+columnar table (one .npy file per column plus manifest.json). Only the
+catalog files are read; no models are loaded.
+
+RecipeIntelligence ("frequently bought together" suggestions) and
+RecommendationEngine memory-map this table at startup in place of their
+hand-written rules; a running service picks up a rebuilt table on its next
+catalog poll.
+
+Output:
+    backend/models/checkpoints/association_rules/  (override with SMARTPANTRY_RULES_DIR)
+
+Usage:
+    python backend/scripts/mine_association_rules.py [--min-support 0.002] [--min-confidence 0.3]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+# Add backend to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+from services.association_rules import RuleTable, default_rules_dir, derive_rules, fp_growth
+from services.recipe_catalog import load_catalog, norm_ingredient
+
+HISTORY_PATH = os.path.join(backend_dir, "data", "user_history.jsonl")
+
+
+def load_history_baskets(path):
+    """Ingredient lists found in user history events (payload.items / ingredients / context.ingredients)."""
+    baskets = []
+    if not os.path.exists(path):
+        return baskets
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                payload = json.loads(line).get("payload") or {}
+            except (ValueError, AttributeError):
+                continue
+            if not isinstance(payload, dict):
+                continue
+            context = payload.get("context") if isinstance(payload.get("context"), dict) else {}
+            for items in (payload.get("items"), payload.get("ingredients"), context.get("ingredients")):
+                if isinstance(items, list):
+                    basket = [norm_ingredient(str(x)) for x in items]
+                    basket = [x for x in basket if x]
+                    if len(basket) >= 2:
+                        baskets.append(basket)
+    return baskets
+
+
+def build_transactions(catalog, history_baskets):
+    """Item names and one item-ID list per recipe and per history basket."""
+    items = list(catalog.ingredient_names)
+    ids = {name: i for i, name in enumerate(items)}
+    offsets, flat = catalog.offsets, catalog.ingredient_ids
+    transactions = [flat[offsets[r]:offsets[r + 1]].tolist() for r in range(len(catalog))]
+    for basket in history_baskets:
+        row = []
+        for name in basket:
+            if name not in ids:
+                ids[name] = len(items)
+                items.append(name)
+            row.append(ids[name])
+        transactions.append(row)
+    return items, transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine association rules over recipes and user baskets")
+    parser.add_argument("--min-support", type=float, default=0.002, help="Fraction of transactions an itemset must appear in")
+    parser.add_argument("--min-confidence", type=float, default=0.3)
+    parser.add_argument("--min-lift", type=float, default=1.0, help="Drop rules no better than chance (lift < 1)")
+    parser.add_argument("--max-len", type=int, default=3, help="Largest itemset (antecedent + consequent)")
+    parser.add_argument("--max-per-antecedent", type=int, default=20, help="Keep the most confident N rules per antecedent (0 = all)")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--out", default=str(default_rules_dir()))
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Association Rule Mining (FP-Growth)")
+    print("=" * 60)
+
+    t0 = time.perf_counter()
+    catalog = load_catalog()
+    history = load_history_baskets(args.history)
+    items, transactions = build_transactions(catalog, history)
+    n = len(transactions)
+    if n == 0:
+        print("\n[ERROR] No transactions to mine")
+        return
+    min_count = max(2, math.ceil(args.min_support * n))
+    print(f"\nTransactions: {len(catalog)} recipes + {len(history)} history baskets, {len(items)} items")
+    print(f"Minimum support: {args.min_support} ({min_count} transactions), confidence {args.min_confidence}, lift {args.min_lift}")
+
+    t1 = time.perf_counter()
+    itemsets = fp_growth(transactions, min_count, max_len=args.max_len)
+    print(f"Frequent itemsets: {len(itemsets)} ({time.perf_counter() - t1:.1f}s)")
+
+    t1 = time.perf_counter()
+    rules = derive_rules(itemsets, n, args.min_confidence, min_lift=args.min_lift, max_per_antecedent=args.max_per_antecedent)
+    table = RuleTable.from_rules(items, rules, meta={
+        "source": "fp-growth",
+        "transactions": n,
+        "min_support": args.min_support,
+        "min_confidence": args.min_confidence,
+        "min_lift": args.min_lift,
+        "max_len": args.max_len,
+        "catalog_fingerprint": catalog.fingerprint(),
+    })
+    table.save(args.out)
+    print(f"Rules: {len(table)} ({time.perf_counter() - t1:.1f}s)")
+
+    for rule in range(min(len(table), 5)):
+        antecedent = ", ".join(items[i] for i in table.antecedent(rule))
+        print(f"  {{{antecedent}}} -> {items[int(table.consequents[rule])]}  "
+              f"conf={table.confidence[rule]:.2f} lift={table.lift[rule]:.2f}")
+
+    print(f"\n[SUCCESS] Saved {len(table)} rules to {args.out} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
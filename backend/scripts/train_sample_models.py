@@ -10,7 +10,7 @@ from collections import Counter
 # Add parent directory to path to import models
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.set_transformer import SetTransformer
+from models.set_transformer import SetTransformerWithEmbedding
 from models.autoencoder import RecipeAutoencoder
 
 def train_sample_models():
@@ -68,17 +68,8 @@ def train_sample_models():
 
     # 4. Train Set Transformer (Simplified)
     print("\nTraining Set Transformer...")
-    model_st = SetTransformer(dim_input=128, num_outputs=1, dim_output=128, num_inds=32, dim_hidden=128, num_heads=4, ln=True)
-    # We'll wrap it with embedding for training convenience
-    class STWrapper(nn.Module):
-        def __init__(self, st, v_size, e_dim):
-            super().__init__()
-            self.emb = nn.Embedding(v_size, e_dim, padding_idx=0)
-            self.st = st
-        def forward(self, x):
-            return self.st(self.emb(x))
-
-    wrapper = STWrapper(model_st, vocab_size, 128)
+    # Saved with its ingredient embedding, so RecipeIntelligence can encode recipes with it
+    wrapper = SetTransformerWithEmbedding(vocab_size=vocab_size, embed_dim=128, hidden_dim=128, output_dim=128, num_heads=4, num_inds=32)
     optimizer = optim.Adam(wrapper.parameters(), lr=1e-3)
     criterion = nn.MSELoss() # Simple reconstruction for demo purposes
 
@@ -96,7 +87,7 @@ def train_sample_models():
             print(f"  Epoch {epoch+1}/50, Loss: {total_loss/len(dataloader):.4f}")
 
     st_path = os.path.join(checkpoint_dir, 'set_transformer.pth')
-    torch.save(model_st.state_dict(), st_path)
+    torch.save(wrapper.state_dict(), st_path)
     print(f"Set Transformer saved to {st_path}")
 
     # 5. Train Autoencoder
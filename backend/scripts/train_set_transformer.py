@@ -31,7 +31,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 backend_dir = os.path.dirname(current_dir)
 sys.path.append(backend_dir)
 
-from models.set_transformer import SetTransformer
+from models.length_bucketing import LengthBucketSampler, collate_index_sets
+from models.set_transformer import SetTransformerWithEmbedding
 
 # === Configuration ===
 CONFIG = {
@@ -64,13 +65,13 @@ class RecipeDataset(Dataset):
     def __len__(self):
         return len(self.recipes)
     
+    def lengths(self):
+        return [min(len(r["ingredients"]), self.max_len) for r in self.recipes]
+
     def __getitem__(self, idx):
         ingredients = self.recipes[idx]["ingredients"]
-        # Convert to indices
+        # Convert to indices; collate_index_sets pads each batch to its longest set
         indices = [self.ingredient_to_idx.get(ing, 0) for ing in ingredients[:self.max_len]]
-        # Pad
-        while len(indices) < self.max_len:
-            indices.append(0)  # Padding index
         return torch.tensor(indices, dtype=torch.long), len(ingredients)
 
 def load_foodcom_data(csv_path):
@@ -117,28 +118,6 @@ def build_vocab(recipes, vocab_size=5000):
     print(f"Vocabulary size: {len(ingredient_to_idx)}")
     return ingredient_to_idx
 
-# === Model Wrapper with Embedding ===
-class SetTransformerWithEmbedding(nn.Module):
-    """Wraps SetTransformer with an embedding layer for ingredient indices."""
-    def __init__(self, vocab_size, embed_dim, hidden_dim, output_dim, num_heads, num_inds):
-        super().__init__()
-        self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
-        self.set_transformer = SetTransformer(
-            dim_input=embed_dim,
-            num_outputs=1,
-            dim_output=output_dim,
-            num_inds=num_inds,
-            dim_hidden=hidden_dim,
-            num_heads=num_heads,
-            ln=True
-        )
-    
-    def forward(self, x):
-        # x: (batch, seq_len) -> (batch, seq_len, embed_dim)
-        embedded = self.embedding(x)
-        # (batch, output_dim)
-        return self.set_transformer(embedded)
-
 # === Training Loop ===
 def train_model(model, dataloader, optimizer, device, epochs):
     """
@@ -212,7 +191,9 @@ def main():
     
     # Create dataset and dataloader
     dataset = RecipeDataset(recipes, ingredient_to_idx, CONFIG["max_ingredients"])
-    dataloader = DataLoader(dataset, batch_size=CONFIG["batch_size"], shuffle=True, num_workers=0)
+    # Length-bucketed batches: recipes of similar size share a batch, so little padding
+    sampler = LengthBucketSampler(dataset.lengths(), CONFIG["batch_size"], shuffle=True)
+    dataloader = DataLoader(dataset, batch_sampler=sampler, collate_fn=collate_index_sets, num_workers=0)
     
     # Initialize model
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -0,0 +1,134 @@
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index for inner-product
+    search over L2-normalized embeddings, in plain NumPy.
+
+    A spherical k-means quantizer splits the vectors into ``n_lists`` cells; a
+    query only scans the ``nprobe`` cells whose centroids score highest.
+    ``nprobe`` is the recall/latency knob: 1 is fastest, ``n_lists`` is exact.
+    Vectors are not copied into the index; candidates are scored by gathering
+    from the (usually memory-mapped) embedding matrix the index was built
+    from, or by a caller-supplied scorer such as PQ codes.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray, vectors: Optional[np.ndarray], nprobe: int = 8) -> None:
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.vectors = vectors
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.list_ids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: Optional[int] = None, n_iter: int = 20, max_train: int = 256, seed: int = 0, nprobe: int = 8) -> "IVFIndex":
+        n = len(vectors)
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(n)))
+        n_lists = max(1, min(n_lists, n))
+        rng = np.random.default_rng(seed)
+
+        train_n = min(n, n_lists * max_train)
+        train = np.asarray(vectors[np.sort(rng.choice(n, size=train_n, replace=False))], dtype=np.float32)
+        centroids = train[rng.choice(train_n, size=n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = _assign(train, centroids)
+            sums = _cluster_sums(train, assign, n_lists)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty cells with random training points.
+            sums[empty] = train[rng.choice(train_n, size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        assign = _assign(vectors, centroids)
+        list_ids = np.argsort(assign, kind="stable").astype(np.int64)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=n_lists), out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_ids, vectors, nprobe=nprobe)
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        # Sorted IDs of every vector in the ``nprobe`` best cells.
+        nprobe = max(1, min(nprobe or self.nprobe, self.n_lists))
+        query = np.asarray(query, dtype=np.float32)
+        cells = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        ids = np.concatenate([self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in cells])
+        ids.sort()
+        return ids
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        scorer: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Top-k (ids, scores) by inner product, best first.
+        query = np.asarray(query, dtype=np.float32)
+        ids = self.candidates(query, nprobe)
+        if len(ids) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if scorer is not None:
+            scores = scorer(ids, query)
+        else:
+            scores = np.asarray(self.vectors[ids], dtype=np.float32) @ query
+        return top_k(ids, scores, k)
+
+    def save(self, path: Union[str, Path], **meta: str) -> None:
+        np.savez(
+            path,
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_ids=self.list_ids,
+            **{f"meta_{key}": np.array(value) for key, value in meta.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path], vectors: Optional[np.ndarray], nprobe: int = 8) -> Tuple["IVFIndex", dict]:
+        with np.load(path) as data:
+            meta = {key[len("meta_"):]: str(data[key]) for key in data.files if key.startswith("meta_")}
+            index = cls(data["centroids"], data["list_offsets"], data["list_ids"], vectors, nprobe=nprobe)
+        if vectors is not None and len(index) != len(vectors):
+            raise ValueError(f"IVF index covers {len(index)} vectors, embeddings have {len(vectors)}")
+        return index, meta
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores = np.asarray(vectors @ np.asarray(query, dtype=np.float32), dtype=np.float32)
+    return top_k(np.arange(len(scores), dtype=np.int64), scores, k)
+
+
+def top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    k = min(k, len(ids))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.lexsort((ids[top], -scores[top]))]
+    return ids[top], scores[top]
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+        out[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)).astype(np.float32)
+
+
+def _cluster_sums(x: np.ndarray, assign: np.ndarray, k: int) -> np.ndarray:
+    # Per-cluster vector sums; one bincount per dimension is much faster than np.add.at.
+    return np.stack([np.bincount(assign, weights=x[:, d], minlength=k) for d in range(x.shape[1])], axis=1).astype(np.float32)
@@ -0,0 +1,402 @@
+import json
+import os
+import shutil
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from services.recipe_catalog import _load_array
+
+# Hand-written "frequently bought together" rules: antecedent -> consequents,
+# most closely associated first. Expanded rules for the 400-item dataset.
+# Used when no mined rule table has been built.
+DEFAULT_RULES: Dict[str, List[str]] = {
+    "milk": ["eggs", "bread", "butter", "cereal"],
+    "pasta": ["tomato sauce", "cheese", "garlic", "ground beef", "olive oil"],
+    "chicken breast": ["rice", "onions", "bell peppers", "broccoli", "soy sauce"],
+    "salt": ["pepper", "olive oil", "garlic powder"],
+    "bread": ["butter", "jam", "cheese", "ham", "avocado"],
+    "avocado": ["lemon", "bread", "eggs", "tomatoes", "onions"],
+    "coffee": ["milk", "sugar", "creamer", "biscuits"],
+    "flour": ["sugar", "eggs", "butter", "baking powder", "milk"],
+    "potato": ["onions", "carrots", "cooking oil", "salt"],
+    "yogurt": ["honey", "granola", "berries", "banana"],
+    "lettuce": ["tomatoes", "cucumber", "onions", "olive oil", "vinegar"],
+    "salmon": ["lemon", "asparagus", "olive oil", "garlic"],
+}
+
+# Padding for short suggestion lists.
+POPULAR_ITEMS = ["milk", "eggs", "bread", "bananas", "apples"]
+
+RULES_FORMAT_VERSION = 1
+_RULE_ARRAYS = ("group_offsets", "antecedent_offsets", "antecedent_items", "consequents", "support", "confidence", "lift")
+
+# (antecedent item IDs, consequent item ID, support, confidence, lift)
+MinedRule = Tuple[Tuple[int, ...], int, float, float, float]
+
+
+def default_rules_dir() -> Path:
+    default = Path(__file__).resolve().parents[1] / "models" / "checkpoints" / "association_rules"
+    return Path(os.environ.get("SMARTPANTRY_RULES_DIR", default))
+
+
+def load_rule_table(directory: Optional[Union[str, Path]] = None) -> Optional["RuleTable"]:
+    # The mined table when one has been built, else None.
+    directory = Path(directory) if directory is not None else default_rules_dir()
+    if not (directory / "manifest.json").exists():
+        return None
+    try:
+        return RuleTable.load(directory)
+    except Exception as e:
+        print(f"DEBUG: Association rule table load failed: {e}")
+        return None
+
+
+class RuleTable:
+    """
+    Association rules ``antecedent -> consequent`` as parallel arrays.
+
+    Rules are grouped by trigger item (the lowest item ID of the antecedent)
+    and ordered by descending confidence within a group; ``group_offsets``
+    gives each item's slice. Antecedents are a CSR array of sorted item IDs.
+    ``save`` writes one .npy file per array plus manifest.json with the item
+    names, and ``load`` memory-maps them.
+    """
+
+    def __init__(
+        self,
+        items: List[str],
+        group_offsets: np.ndarray,
+        antecedent_offsets: np.ndarray,
+        antecedent_items: np.ndarray,
+        consequents: np.ndarray,
+        support: np.ndarray,
+        confidence: np.ndarray,
+        lift: np.ndarray,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.items = list(items)
+        self.group_offsets = group_offsets
+        self.antecedent_offsets = antecedent_offsets
+        self.antecedent_items = antecedent_items
+        self.consequents = consequents
+        self.support = support
+        self.confidence = confidence
+        self.lift = lift
+        self.meta = dict(meta or {})
+        self._item_ids = {name: i for i, name in enumerate(self.items)}
+
+    def __len__(self) -> int:
+        return len(self.consequents)
+
+    @classmethod
+    def from_rules(cls, items: List[str], rules: Iterable[MinedRule], meta: Optional[Dict[str, Any]] = None) -> "RuleTable":
+        rules = sorted(rules, key=lambda r: (min(r[0]), -r[3], r[0], r[1]))
+        antecedents = [sorted(r[0]) for r in rules]
+        triggers = np.array([a[0] for a in antecedents], dtype=np.int64)
+        group_offsets = np.searchsorted(triggers, np.arange(len(items) + 1)).astype(np.int64)
+        antecedent_offsets = np.zeros(len(rules) + 1, dtype=np.int64)
+        np.cumsum([len(a) for a in antecedents], out=antecedent_offsets[1:])
+        flat = [i for a in antecedents for i in a]
+        return cls(
+            items=items,
+            group_offsets=group_offsets,
+            antecedent_offsets=antecedent_offsets,
+            antecedent_items=np.array(flat, dtype=np.int32),
+            consequents=np.array([r[1] for r in rules], dtype=np.int32),
+            support=np.array([r[2] for r in rules], dtype=np.float32),
+            confidence=np.array([r[3] for r in rules], dtype=np.float32),
+            lift=np.array([r[4] for r in rules], dtype=np.float32),
+            meta=meta,
+        )
+
+    @classmethod
+    def from_ranked_lists(cls, rules: Dict[str, List[str]]) -> "RuleTable":
+        # Hand-written rules have no statistics; consequents listed best first
+        # get confidence 1, 1/2, 1/3, ...
+        items: List[str] = []
+        ids: Dict[str, int] = {}
+
+        def item_id(name: str) -> int:
+            if name not in ids:
+                ids[name] = len(items)
+                items.append(name)
+            return ids[name]
+
+        mined = [((item_id(key),), item_id(name), 0.0, 1.0 / (pos + 1), 1.0)
+                 for key, names in rules.items() for pos, name in enumerate(names)]
+        return cls.from_rules(items, mined, meta={"source": "default"})
+
+    def item_id(self, name: str) -> Optional[int]:
+        return self._item_ids.get(name)
+
+    def antecedent(self, rule: int) -> np.ndarray:
+        return self.antecedent_items[self.antecedent_offsets[rule]:self.antecedent_offsets[rule + 1]]
+
+    def antecedent_item_ids(self) -> np.ndarray:
+        return np.unique(np.asarray(self.antecedent_items))
+
+    def fire(self, item_ids: Sequence[int]) -> Iterator[int]:
+        """Rules whose whole antecedent is in ``item_ids``, by trigger in the given order, best first."""
+        present = set(item_ids)
+        go, ao = self.group_offsets, self.antecedent_offsets
+        for item in item_ids:
+            if not 0 <= item < len(go) - 1:
+                continue
+            lo, hi = int(go[item]), int(go[item + 1])
+            if lo == hi:
+                continue
+            sizes = np.diff(ao[lo:hi + 1])
+            for rule, size in zip(range(lo, hi), sizes.tolist()):
+                if size == 1 or all(int(a) in present for a in self.antecedent(rule)):
+                    yield rule
+
+    def save(self, directory: Union[str, Path]) -> None:
+        # Same write-then-rename scheme as RecipeCatalog.save.
+        directory = Path(directory)
+        tmp = directory.with_name(directory.name + ".tmp")
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for key in _RULE_ARRAYS:
+            np.save(tmp / f"{key}.npy", np.ascontiguousarray(getattr(self, key)))
+        manifest = {"version": RULES_FORMAT_VERSION, "rules": len(self), "items": self.items, **self.meta}
+        with open(tmp / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        shutil.rmtree(old, ignore_errors=True)
+        if directory.exists():
+            os.replace(directory, old)
+        os.replace(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> "RuleTable":
+        directory = Path(directory)
+        with open(directory / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != RULES_FORMAT_VERSION:
+            raise ValueError(f"Unsupported rule table format version: {manifest.get('version')}")
+        arrays = {key: _load_array(directory / f"{key}.npy", mmap) for key in _RULE_ARRAYS}
+        meta = {k: v for k, v in manifest.items() if k not in ("version", "rules", "items")}
+        table = cls(items=manifest["items"], meta=meta, **arrays)
+        if len(table) != manifest.get("rules"):
+            raise ValueError(f"Rule manifest lists {manifest.get('rules')} rules, arrays hold {len(table)}")
+        return table
+
+
+class RuleIndex:
+    """
+    Rule lookup by free-text ingredient name.
+
+    An ingredient matches a rule item when either name contains the other, as
+    in the original substring scan, but without touching every rule: items
+    occurring inside the ingredient come from one Aho-Corasick pass over the
+    ingredient, and items containing the ingredient from a binary search over
+    the sorted suffixes of all item names. Every rule whose antecedent is
+    covered by the matched items fires; suggestions are merged by summed
+    confidence.
+    """
+
+    def __init__(self, table: RuleTable) -> None:
+        self.table = table
+        # Only items that occur in some antecedent can trigger a rule.
+        self._key_items = [int(i) for i in table.antecedent_item_ids()]
+        self.keys: List[str] = [table.items[i] for i in self._key_items]
+        self._build_automaton()
+        suffixes = sorted((key[i:], key_id) for key_id, key in enumerate(self.keys) for i in range(len(key)))
+        self._suffixes = [s for s, _ in suffixes]
+        self._suffix_keys = [k for _, k in suffixes]
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def match(self, ingredient: str) -> Set[int]:
+        """Item IDs of every antecedent item that contains, or is contained in, ``ingredient``."""
+        text = ingredient.strip().lower()
+        if not text:
+            return set()
+        found = set(self._scan(text))
+        i = bisect_left(self._suffixes, text)
+        while i < len(self._suffixes) and self._suffixes[i].startswith(text):
+            found.add(self._suffix_keys[i])
+            i += 1
+        return {self._key_items[k] for k in found}
+
+    def suggest(self, ingredients: Iterable[str], limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(item, score) pairs suggested for a basket, best first, never an item already in it."""
+        have = {x.strip().lower() for x in ingredients if x and x.strip()}
+        # Sorted iteration keeps equal scores in a reproducible first-seen order.
+        matched: List[int] = []
+        seen: Set[int] = set()
+        for ingredient in sorted(have):
+            for item in sorted(self.match(ingredient)):
+                if item not in seen:
+                    seen.add(item)
+                    matched.append(item)
+
+        table = self.table
+        scores: Dict[str, float] = {}
+        for rule in table.fire(matched):
+            name = table.items[int(table.consequents[rule])]
+            if name not in have:
+                scores[name] = scores.get(name, 0.0) + float(table.confidence[rule])
+        ranked = sorted(scores.items(), key=lambda kv: -kv[1])
+        return ranked[:limit] if limit is not None else ranked
+
+    def _build_automaton(self) -> None:
+        # Aho-Corasick trie over the item names: goto transitions, failure
+        # links, and the keys that end at each state (including those reached
+        # through failure links).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[int]] = [[]]
+        for key_id, key in enumerate(self.keys):
+            state = 0
+            for ch in key:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = self._goto[state][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(key_id)
+
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _scan(self, text: str) -> List[int]:
+        state, found = 0, []
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._out[state]:
+                found.extend(self._out[state])
+        return found
+
+
+class _FPTree:
+    # Prefix tree over transactions in a fixed global item order, as flat
+    # parent / item / count lists, with per-item node lists for prefix paths.
+
+    def __init__(self) -> None:
+        self.parent = [-1]
+        self.item = [-1]
+        self.count = [0]
+        self.children: Dict[Tuple[int, int], int] = {}
+        self.nodes: Dict[int, List[int]] = defaultdict(list)
+        self.item_counts: Dict[int, int] = defaultdict(int)
+
+    def insert(self, items: Sequence[int], count: int) -> None:
+        node = 0
+        for it in items:
+            key = (node, it)
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = len(self.item)
+                self.parent.append(node)
+                self.item.append(it)
+                self.count.append(0)
+                self.nodes[it].append(child)
+            self.count[child] += count
+            self.item_counts[it] += count
+            node = child
+
+    def prefix_paths(self, it: int) -> Iterator[Tuple[List[int], int]]:
+        # (items from the node's parent up to the root, node count)
+        parent, item = self.parent, self.item
+        for node in self.nodes[it]:
+            path = []
+            p = parent[node]
+            while p > 0:
+                path.append(item[p])
+                p = parent[p]
+            yield path, self.count[node]
+
+
+def fp_growth(transactions: Iterable[Sequence[int]], min_count: int, max_len: int = 3) -> Dict[Tuple[int, ...], int]:
+    """Every itemset (sorted item-ID tuple) of at most ``max_len`` items in at least ``min_count`` transactions."""
+    transactions = [sorted(set(t)) for t in transactions]
+    counts: Dict[int, int] = defaultdict(int)
+    for t in transactions:
+        for it in t:
+            counts[it] += 1
+    frequent = {it: c for it, c in counts.items() if c >= min_count}
+    # Most frequent first, so transactions share long prefixes.
+    rank = {it: r for r, it in enumerate(sorted(frequent, key=lambda i: (-frequent[i], i)))}
+    tree = _FPTree()
+    for t in transactions:
+        items = sorted((it for it in t if it in rank), key=rank.__getitem__)
+        if items:
+            tree.insert(items, 1)
+    out: Dict[Tuple[int, ...], int] = {}
+    _mine(tree, (), max(min_count, 1), max(max_len, 1), out)
+    return out
+
+
+def _mine(tree: _FPTree, suffix: Tuple[int, ...], min_count: int, max_len: int, out: Dict[Tuple[int, ...], int]) -> None:
+    for it, support in list(tree.item_counts.items()):
+        if support < min_count:
+            continue
+        itemset = suffix + (it,)
+        out[tuple(sorted(itemset))] = support
+        if len(itemset) >= max_len:
+            continue
+        paths = list(tree.prefix_paths(it))
+        cond_counts: Dict[int, int] = defaultdict(int)
+        for path, c in paths:
+            for p in path:
+                cond_counts[p] += c
+        if len(itemset) + 1 == max_len:
+            # Last level: the conditional item counts are the answer.
+            for p, c in cond_counts.items():
+                if c >= min_count:
+                    out[tuple(sorted(itemset + (p,)))] = c
+            continue
+        cond = _FPTree()
+        for path, c in paths:
+            kept = [p for p in reversed(path) if cond_counts[p] >= min_count]
+            if kept:
+                cond.insert(kept, c)
+        if cond.item_counts:
+            _mine(cond, itemset, min_count, max_len, out)
+
+
+def derive_rules(
+    itemsets: Dict[Tuple[int, ...], int],
+    n_transactions: int,
+    min_confidence: float,
+    min_lift: float = 0.0,
+    max_per_antecedent: int = 0,
+) -> List[MinedRule]:
+    """Single-consequent rules from frequent itemsets, with support, confidence and lift."""
+    by_antecedent: Dict[Tuple[int, ...], List[MinedRule]] = defaultdict(list)
+    for itemset, count in itemsets.items():
+        if len(itemset) < 2:
+            continue
+        for c in itemset:
+            antecedent = tuple(i for i in itemset if i != c)
+            confidence = count / itemsets[antecedent]
+            if confidence < min_confidence:
+                continue
+            lift = confidence * n_transactions / itemsets[(c,)]
+            if lift < min_lift:
+                continue
+            by_antecedent[antecedent].append((antecedent, c, count / n_transactions, confidence, lift))
+    rules: List[MinedRule] = []
+    for group in by_antecedent.values():
+        group.sort(key=lambda r: (-r[3], -r[4], r[1]))
+        rules.extend(group[:max_per_antecedent] if max_per_antecedent > 0 else group)
+    return rules
+
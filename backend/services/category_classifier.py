@@ -2,7 +2,9 @@ import os
 import pickle
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.model_registry import shared_registry
 
 
 @dataclass(frozen=True)
@@ -20,7 +22,10 @@ class CategoryClassifier:
         self._artifacts_dir.mkdir(parents=True, exist_ok=True)
         self._model_path = self._artifacts_dir / "category_classifier.pkl"
         self._vectorizer_path = self._artifacts_dir / "category_vectorizer.pkl"
-        self._load_or_train()
+        # Loaded (or trained) once per process and shared by every classifier instance.
+        loaded = shared_registry().get(f"category_classifier:{self._model_path}", self._load_or_train)
+        if loaded is not None:
+            self._model, self._vectorizer, self._labels = loaded
 
     def predict(self, item_name: str) -> CategoryPrediction:
         item = self._preprocess_text(item_name)
@@ -54,14 +59,14 @@ class CategoryClassifier:
         except Exception:
             return []
 
-    def _load_or_train(self) -> None:
+    def _load_or_train(self) -> Optional[Tuple[Any, Any, Optional[List[str]]]]:
         if self._model_path.exists() and self._vectorizer_path.exists():
             try:
                 with open(self._model_path, "rb") as f:
                     self._model = pickle.load(f)
                 with open(self._vectorizer_path, "rb") as f:
                     self._vectorizer = pickle.load(f)
-                return
+                return self._model, self._vectorizer, self._labels
             except Exception:
                 self._model = None
                 self._vectorizer = None
@@ -72,6 +77,8 @@ class CategoryClassifier:
                 pickle.dump(self._model, f)
             with open(self._vectorizer_path, "wb") as f:
                 pickle.dump(self._vectorizer, f)
+            return self._model, self._vectorizer, self._labels
+        return None
 
     def _train_from_repo_dataset(self) -> None:
         try:
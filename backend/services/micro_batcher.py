@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item inference calls into batched ones.
+
+    Callers submit items and get a Future back. A worker thread takes the
+    first waiting item, keeps collecting until ``max_batch_size`` items are
+    queued or ``max_wait_ms`` has passed, then runs ``fn`` once on the whole
+    list and fans the results back out. ``fn`` must return one result per
+    item, in order; if it raises, every future in the batch gets the error.
+    ``max_batch_size=1`` (or a closed batcher) runs ``fn`` inline instead.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32, max_wait_ms: float = 2.0, name: str = "micro-batcher") -> None:
+        self.fn = fn
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+
+    def submit(self, item: Any) -> Future:
+        if self.max_batch_size > 1 and not self._closed:
+            with self._lock:
+                if not self._closed:
+                    if self._thread is None:
+                        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                        self._thread.start()
+                    future: Future = Future()
+                    self._queue.put((item, future))
+                    return future
+        future = Future()
+        self._execute([(item, future)])
+        return future
+
+    def map(self, items: List[Any]) -> List[Any]:
+        # Submits every item before waiting, so one caller's items share batches.
+        futures = [self.submit(item) for item in items]
+        return [f.result() for f in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size_seen": self._max_seen,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": 1000.0 * self.max_wait,
+            }
+
+    def close(self) -> None:
+        # Queued items are still answered; later submits run inline.
+        with self._lock:
+            self._closed = True
+            if self._thread is not None:
+                self._queue.put(None)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._execute(batch)
+            if stop:
+                return
+
+    def _execute(self, batch: List[Tuple[Any, Future]]) -> None:
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._max_seen = max(self._max_seen, len(batch))
+        try:
+            results = self.fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
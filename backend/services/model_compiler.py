@@ -0,0 +1,151 @@
+import hashlib
+import inspect
+import os
+import warnings
+from pathlib import Path
+from typing import Any, Iterable, Optional, Tuple, Union
+
+import torch
+import torch.nn as nn
+
+# eager: the fp32 nn.Module as loaded. int8: dynamic int8 quantization of the
+# Linear layers (weights stored as int8, activations quantized per call).
+# torchscript: the module compiled to TorchScript. int8-torchscript: both.
+INFERENCE_MODES = ("eager", "int8", "torchscript", "int8-torchscript")
+
+
+def inference_mode_from_env() -> str:
+    mode = os.environ.get("SMARTPANTRY_INFERENCE_MODE", "eager").strip().lower() or "eager"
+    if mode not in INFERENCE_MODES:
+        print(f"DEBUG: Unknown SMARTPANTRY_INFERENCE_MODE={mode!r}, using eager")
+        return "eager"
+    return mode
+
+
+def quantize_linear(model: nn.Module, modules: Optional[Iterable[str]] = None) -> nn.Module:
+    """
+    A copy of ``model`` with dynamic int8 Linear layers. ``modules`` limits the
+    conversion to the named submodules (and the Linears inside them); by
+    default every nn.Linear is converted.
+    """
+    spec: Union[set, Any] = set(modules) if modules is not None else {nn.Linear}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, spec, dtype=torch.qint8)
+
+
+def compile_for_inference(
+    model: nn.Module,
+    name: str,
+    mode: str,
+    example_inputs: Tuple[torch.Tensor, ...],
+    check_inputs: Tuple[torch.Tensor, ...],
+    cache_dir: Optional[Path] = None,
+    quantize_modules: Optional[Iterable[str]] = None,
+    trace: bool = False,
+) -> Tuple[Any, str]:
+    """
+    The callable to run ``model`` with in ``mode``, and the mode actually applied.
+
+    TorchScript artifacts are saved to ``cache_dir`` under a key derived from
+    the weights, the model's source file, the torch version and the mode, and
+    loaded from there on the next start. ``trace=True`` traces with
+    ``example_inputs`` instead of scripting (for modules TorchScript cannot
+    compile). A cached module that does not reproduce the uncompiled one on
+    ``check_inputs`` (shaped differently from ``example_inputs``) is rebuilt;
+    a freshly compiled one that does not is dropped. Any failure falls back
+    to the previous step with a DEBUG line, so the worst case is the eager
+    model.
+    """
+    if mode not in INFERENCE_MODES or mode == "eager":
+        return model, "eager"
+    runner: Any = model
+    applied = "eager"
+    if mode.startswith("int8"):
+        try:
+            runner = quantize_linear(model, quantize_modules)
+            applied = "int8"
+        except Exception as e:
+            print(f"DEBUG: int8 quantization of {name} failed: {e}")
+    if not mode.endswith("torchscript"):
+        return runner, applied
+
+    compiled_mode = "torchscript" if applied == "eager" else "int8-torchscript"
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = Path(cache_dir) / f"{name}-{compiled_mode}-{_cache_key(model, compiled_mode)}.pt"
+    try:
+        with torch.no_grad():
+            expected = _first_output(runner(*check_inputs))
+        if cache_path is not None and cache_path.exists():
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    cached = torch.jit.load(str(cache_path), map_location="cpu")
+                if _reproduces(cached, check_inputs, expected):
+                    print(f"DEBUG: {name} running {compiled_mode} (cached {cache_path.name})")
+                    return cached, compiled_mode
+                print(f"DEBUG: Compiled {name} at {cache_path} is stale, rebuilding")
+            except Exception as e:
+                print(f"DEBUG: Ignoring unreadable compiled {name} at {cache_path}: {e}")
+        with warnings.catch_warnings(), torch.no_grad():
+            warnings.simplefilter("ignore")
+            compiled = torch.jit.trace(runner, example_inputs, check_trace=False) if trace else torch.jit.script(runner)
+        if not _reproduces(compiled, check_inputs, expected):
+            raise RuntimeError("compiled module does not reproduce the original")
+        if cache_path is not None:
+            _save_atomic(compiled, cache_path)
+        print(f"DEBUG: {name} running {compiled_mode}")
+        return compiled, compiled_mode
+    except Exception as e:
+        print(f"DEBUG: TorchScript compile of {name} failed, using {applied}: {e}")
+        return runner, applied
+
+
+def _first_output(out: Any) -> torch.Tensor:
+    return out[0] if isinstance(out, (tuple, list)) else out
+
+
+def _reproduces(compiled: Any, check_inputs: Tuple[torch.Tensor, ...], expected: torch.Tensor) -> bool:
+    compiled.eval()
+    with torch.no_grad():
+        got = _first_output(compiled(*check_inputs))
+    return got.shape == expected.shape and torch.allclose(got, expected, rtol=1e-4, atol=1e-5)
+
+
+def _cache_key(model: nn.Module, mode: str) -> str:
+    # The artifact embeds the weights, so they are part of the key (a few ms
+    # for these models); so are the graph's source file and the torch version.
+    h = hashlib.sha1(f"{mode}|{torch.__version__}|{type(model).__qualname__}".encode("utf-8"))
+    try:
+        path = inspect.getsourcefile(type(model))
+        st = os.stat(path)
+        h.update(f"|{path}:{st.st_mtime_ns}:{st.st_size}".encode("utf-8"))
+    except (OSError, TypeError):
+        pass
+    h.update(state_dict_digest(model).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def state_dict_digest(model: nn.Module) -> str:
+    """Short hash of a module's parameter names and values."""
+    h = hashlib.sha1()
+    for key, tensor in model.state_dict().items():
+        h.update(key.encode("utf-8"))
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def _save_atomic(module: Any, path: Path) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        torch.jit.save(module, str(tmp))
+        os.replace(tmp, path)
+        # Artifacts for an older checkpoint / torch version share the prefix.
+        prefix = path.name.rsplit("-", 1)[0] + "-"
+        for old in path.parent.glob(f"{prefix}*.pt"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"DEBUG: Could not cache compiled model at {path}: {e}")
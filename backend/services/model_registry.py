@@ -1,31 +1,269 @@
 import os
-from functools import lru_cache
-from typing import Any, Optional
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from services.onnx_pipelines import load_onnx_model, load_onnx_pipeline, onnx_quantize_from_env, pipeline_backend_from_env
+
+
+@dataclass
+class ModelEntry:
+    key: str
+    value: Any
+    version: Hashable
+    load_seconds: float
+    loaded_at: float
+    nbytes: int
+    rss_delta_bytes: Optional[int]
+    evictable: bool = False
+    hits: int = 0
+    loads: int = 1
+
+    @property
+    def budget_bytes(self) -> int:
+        # What the entry counts against the memory budget; the RSS delta stands
+        # in when the object's own size cannot be seen.
+        return self.nbytes or max(self.rss_delta_bytes or 0, 0)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "type": type(self.value).__name__ if self.value is not None else None,
+            "available": self.value is not None,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "approx_bytes": self.nbytes,
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "evictable": self.evictable,
+            "hits": self.hits,
+            "loads": self.loads,
+        }
 
 
 class ModelRegistry:
-    def __init__(self) -> None:
+    """
+    Models keyed by name, each loaded once and shared by every service that
+    asks for the same key. ``get`` runs the loader on the first request for a
+    key (concurrent callers wait for that one load) and again only when the
+    caller's ``version`` changes, e.g. a checkpoint's mtime after retraining.
+    A loader that returns None is cached too, so an unavailable model is not
+    retried on every call.
+
+    With a memory budget (``SMARTPANTRY_MODEL_MEMORY_MB``, 0 = unlimited),
+    loading a model that would push the total over it first evicts the least
+    recently used *evictable* entries. Only models that callers re-resolve
+    through ``get`` on every use (the Hugging Face pipelines) are evictable,
+    since dropping a model a service still holds would free nothing; the
+    next ``get`` of an evicted key simply loads it again.
+
+    The Hugging Face pipelines run on the backend named by
+    ``SMARTPANTRY_PIPELINE_BACKEND`` (see ``services.onnx_pipelines``); if the
+    ONNX Runtime one cannot be loaded the torch pipeline is used instead.
+
+    Use ``shared_registry()`` for the process-wide instance.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None) -> None:
         self._disabled = os.environ.get("SMARTPANTRY_DISABLE_MODELS", "").strip().lower() in {"1", "true", "yes"}
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.environ.get("SMARTPANTRY_MODEL_MEMORY_MB", "0"))
+        self._budget_bytes = int(max(memory_budget_mb, 0.0) * 1024 * 1024)
+        self._pipeline_backend = pipeline_backend_from_env()
+        self._onnx_quantize = onnx_quantize_from_env()
+        self._lock = threading.Lock()
+        # Least recently used first.
+        self._entries: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        # Evicted key -> (bytes it took, times it had been loaded)
+        self._evicted: Dict[str, Tuple[int, int]] = {}
+        self._evictions = 0
+        self._reloads = 0
+
+    def get(self, key: str, loader: Callable[[], Any], version: Hashable = None, evictable: bool = False) -> Any:
+        while True:
+            with self._lock:
+                entry = self._hit(key, version)
+                if entry is not None:
+                    return entry.value
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                with self._lock:
+                    entry = self._hit(key, version)
+                    if entry is not None:
+                        return entry.value
+                    if self._key_locks.setdefault(key, key_lock) is not key_lock:
+                        # An eviction pruned this lock while we waited, and a
+                        # later caller may be loading under a new one.
+                        continue
+                    # Make room for what this model took last time, if known.
+                    previous = self._entries.get(key)
+                    expected = previous.budget_bytes if previous is not None else self._evicted.get(key, (0, 0))[0]
+                    self._evict_for(expected, keep=key)
+                rss_before = current_rss_bytes()
+                t0 = time.perf_counter()
+                value = loader()
+                load_seconds = time.perf_counter() - t0
+                rss_after = current_rss_bytes()
+                entry = ModelEntry(
+                    key=key,
+                    value=value,
+                    version=version,
+                    load_seconds=load_seconds,
+                    loaded_at=time.time(),
+                    nbytes=estimate_nbytes(value),
+                    rss_delta_bytes=rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+                    evictable=evictable,
+                    hits=1,
+                )
+                with self._lock:
+                    previous = self._entries.pop(key, None)
+                    if previous is not None:
+                        entry.loads = previous.loads + 1
+                    elif key in self._evicted:
+                        self._reloads += 1
+                        entry.loads = self._evicted.pop(key)[1] + 1
+                    self._entries[key] = entry
+                    self._evict_for(0, keep=key)
+                return value
+
+    def evict(self, key: str) -> bool:
+        """Drops a model regardless of the budget; the next ``get`` reloads it."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._evicted[key] = (entry.budget_bytes, entry.loads)
+            self._evictions += 1
+            self._prune_key_lock(key)
+            return True
+
+    def get_file(self, key: str, path: Path, loader: Callable[[], Any]) -> Any:
+        """``get`` versioned by the file's mtime and size, so a rewritten file is reloaded."""
+        return self.get(f"{key}:{path}", loader, version=file_version(path))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = [entry.info() for entry in self._entries.values()]
+            budgeted = self._budgeted_bytes()
+            evictions, reloads, evicted = self._evictions, self._reloads, sorted(self._evicted)
+        return {
+            "models": sorted(models, key=lambda m: m["key"]),
+            "loaded": sum(1 for m in models if m["available"]),
+            "approx_bytes": sum(m["approx_bytes"] for m in models),
+            "budgeted_bytes": budgeted,
+            "memory_budget_bytes": self._budget_bytes or None,
+            "evictions": evictions,
+            "reloads": reloads,
+            "evicted": evicted,
+            "process_rss_bytes": current_rss_bytes(),
+            "pipeline_backend": self._pipeline_backend,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters for /health; ``stats`` has the per-model detail."""
+        with self._lock:
+            return {
+                "loaded": sum(1 for entry in self._entries.values() if entry.value is not None),
+                "budgeted_bytes": self._budgeted_bytes(),
+                "memory_budget_bytes": self._budget_bytes or None,
+                "evictions": self._evictions,
+                "reloads": self._reloads,
+            }
+
+    def _hit(self, key: str, version: Hashable) -> Optional[ModelEntry]:
+        # Caller holds self._lock.
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            return None
+        entry.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def _budgeted_bytes(self) -> int:
+        return sum(entry.budget_bytes for entry in self._entries.values())
+
+    def _prune_key_lock(self, key: str) -> None:
+        # Caller holds self._lock. Drops an evicted key's load lock so keys that
+        # come and go do not pile up; a lock still held by a load stays.
+        key_lock = self._key_locks.get(key)
+        if key_lock is not None and not key_lock.locked():
+            del self._key_locks[key]
+
+    def _evict_for(self, incoming: int, keep: str) -> None:
+        # Caller holds self._lock. Evicts least recently used evictable entries
+        # until `incoming` more bytes fit; a single model larger than the whole
+        # budget is still kept.
+        if not self._budget_bytes:
+            return
+        total = self._budgeted_bytes() + incoming
+        for key in list(self._entries):
+            if total <= self._budget_bytes:
+                break
+            entry = self._entries[key]
+            if key == keep or not entry.evictable:
+                continue
+            del self._entries[key]
+            self._evicted[key] = (entry.budget_bytes, entry.loads)
+            self._evictions += 1
+            self._prune_key_lock(key)
+            total -= entry.budget_bytes
+            print(f"DEBUG: Evicted model {key} ({entry.budget_bytes / 1e6:.1f} MB) to stay within the model memory budget")
 
-    @lru_cache(maxsize=1)
     def get_asr_pipeline(self) -> Optional[Any]:
         if self._disabled:
             return None
+        model_name = os.environ.get("SMARTPANTRY_WHISPER_MODEL", "openai/whisper-tiny")
+        return self._get_pipeline("asr", model_name, self._load_asr_pipeline, self._load_onnx_asr_pipeline)
+
+    def get_text2text_pipeline(self) -> Optional[Any]:
+        if self._disabled:
+            return None
+        model_name = os.environ.get("SMARTPANTRY_T5_MODEL", "t5-small")
+        return self._get_pipeline("text2text", model_name, self._load_text2text_pipeline, self._load_onnx_text2text_pipeline)
+
+    def get_ner_pipeline(self) -> Optional[Any]:
+        if self._disabled:
+            return None
+        model_name = os.environ.get("SMARTPANTRY_NER_MODEL", "elastic/distilbert-base-uncased-finetuned-conll03-english")
+        return self._get_pipeline("ner", model_name, self._load_ner_pipeline, self._load_onnx_ner_pipeline)
+
+    def _get_pipeline(
+        self,
+        kind: str,
+        model_name: str,
+        torch_loader: Callable[[str], Optional[Any]],
+        onnx_loader: Callable[[str, bool], Any],
+    ) -> Optional[Any]:
+        if self._pipeline_backend != "onnx":
+            return self.get(f"hf:{kind}:{model_name}", lambda: torch_loader(model_name), evictable=True)
+
+        def load() -> Optional[Any]:
+            try:
+                return onnx_loader(model_name, self._onnx_quantize)
+            except Exception as e:
+                print(f"DEBUG: ONNX Runtime {kind} pipeline for {model_name} unavailable, using torch: {e}")
+                return torch_loader(model_name)
+
+        variant = "onnx-int8" if self._onnx_quantize else "onnx"
+        return self.get(f"hf:{kind}:{variant}:{model_name}", load, evictable=True)
+
+    @staticmethod
+    def _load_asr_pipeline(model_name: str) -> Optional[Any]:
         try:
             from transformers import pipeline
         except Exception:
             return None
-        model_name = os.environ.get("SMARTPANTRY_WHISPER_MODEL", "openai/whisper-tiny")
         try:
             return pipeline("automatic-speech-recognition", model=model_name)
         except Exception:
             return None
 
-    @lru_cache(maxsize=1)
-    def get_text2text_pipeline(self) -> Optional[Any]:
-        if self._disabled:
-            return None
-        model_name = os.environ.get("SMARTPANTRY_T5_MODEL", "t5-small")
+    @staticmethod
+    def _load_text2text_pipeline(model_name: str) -> Optional[Any]:
         try:
             from transformers import pipeline
 
@@ -37,7 +275,6 @@ class ModelRegistry:
             pass
 
         try:
-            import torch
             from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
         except Exception:
             return None
@@ -48,33 +285,135 @@ class ModelRegistry:
         except Exception:
             return None
 
-        class _Seq2SeqWrapper:
-            def __call__(self, text: str, max_new_tokens: int = 64, **kwargs: Any) -> Any:
-                t = (text or "").strip()
-                if not t:
-                    return [{"generated_text": ""}]
-                inputs = tokenizer(t, return_tensors="pt")
-                with torch.no_grad():
-                    output_ids = model.generate(
-                        **inputs,
-                        max_new_tokens=int(max_new_tokens),
-                    )
-                out = tokenizer.decode(output_ids[0], skip_special_tokens=True)
-                return [{"generated_text": out}]
-
-        return _Seq2SeqWrapper()
-
-    @lru_cache(maxsize=1)
-    def get_ner_pipeline(self) -> Optional[Any]:
-        if self._disabled:
-            return None
+        return _Seq2SeqWrapper(model, tokenizer)
+
+    @staticmethod
+    def _load_ner_pipeline(model_name: str) -> Optional[Any]:
         try:
             from transformers import pipeline
         except Exception:
             return None
-        model_name = os.environ.get("SMARTPANTRY_NER_MODEL", "elastic/distilbert-base-uncased-finetuned-conll03-english")
         try:
             return pipeline("token-classification", model=model_name, aggregation_strategy="simple")
         except Exception:
             return None
 
+    @staticmethod
+    def _load_onnx_asr_pipeline(model_name: str, quantize: bool) -> Any:
+        return load_onnx_pipeline("automatic-speech-recognition", model_name, quantize=quantize)
+
+    @staticmethod
+    def _load_onnx_text2text_pipeline(model_name: str, quantize: bool) -> Any:
+        # As on torch: the stock pipeline (so generation defaults match), else
+        # the generate() wrapper where transformers has no text2text pipeline.
+        model, tokenizer = load_onnx_model("text2text-generation", model_name, quantize=quantize)
+        try:
+            from transformers import pipeline
+
+            return pipeline("text2text-generation", model=model, tokenizer=tokenizer)
+        except Exception:
+            return _Seq2SeqWrapper(model, tokenizer)
+
+    @staticmethod
+    def _load_onnx_ner_pipeline(model_name: str, quantize: bool) -> Any:
+        return load_onnx_pipeline("token-classification", model_name, quantize=quantize, aggregation_strategy="simple")
+
+
+class _Seq2SeqWrapper:
+    """text2text-generation pipeline stand-in: ``[{"generated_text": ...}]`` from ``model.generate``."""
+
+    def __init__(self, model: Any, tokenizer: Any) -> None:
+        self.model = model
+        self.tokenizer = tokenizer
+
+    def __call__(self, text: str, max_new_tokens: int = 64, **kwargs: Any) -> Any:
+        import torch
+
+        t = (text or "").strip()
+        if not t:
+            return [{"generated_text": ""}]
+        inputs = self.tokenizer(t, return_tensors="pt")
+        with torch.no_grad():
+            output_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=int(max_new_tokens),
+            )
+        out = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+        return [{"generated_text": out}]
+
+
+_shared: Optional[ModelRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def shared_registry() -> ModelRegistry:
+    """The process-wide registry every service resolves its models from."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ModelRegistry()
+        return _shared
+
+
+def file_version(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def current_rss_bytes() -> Optional[int]:
+    # Resident set size from /proc (Linux); None elsewhere.
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def estimate_nbytes(obj: Any, _depth: int = 0) -> int:
+    """Approximate memory held by a loaded model: tensor and array storage where it can be seen, else its pickled size."""
+    if obj is None or _depth > 3:
+        return 0
+    try:
+        import torch
+
+        if isinstance(obj, torch.Tensor):
+            return obj.numel() * obj.element_size()
+        if isinstance(obj, (torch.nn.Module, torch.jit.ScriptModule)):
+            total = 0
+            for value in obj.state_dict().values():
+                if isinstance(value, torch.Tensor):
+                    total += value.numel() * value.element_size()
+                elif isinstance(value, (tuple, list)):
+                    # Packed int8 Linear weights
+                    total += sum(estimate_nbytes(v, _depth + 1) for v in value)
+            return total
+    except ImportError:
+        pass
+    try:
+        import numpy as np
+
+        if isinstance(obj, np.ndarray):
+            return int(obj.nbytes)
+    except ImportError:
+        pass
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_nbytes(v, _depth + 1) for v in obj)
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v, _depth + 1) for v in obj.values())
+    model = getattr(obj, "model", None)
+    if model is not None and model is not obj:
+        # transformers pipelines and wrappers around a torch model
+        return estimate_nbytes(model, _depth + 1)
+    if hasattr(obj, "model_to_string"):
+        # LightGBM Booster: roughly the size of its text dump
+        try:
+            return len(obj.model_to_string())
+        except Exception:
+            return 0
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
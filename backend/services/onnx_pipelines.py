@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Any, Optional
+
+# torch: the stock transformers pipelines. onnx: the same models exported to
+# ONNX once (optionally int8) and run through ONNX Runtime via optimum.
+PIPELINE_BACKENDS = ("torch", "onnx")
+
+_ORT_CLASSES = {
+    "automatic-speech-recognition": "ORTModelForSpeechSeq2Seq",
+    "text2text-generation": "ORTModelForSeq2SeqLM",
+    "token-classification": "ORTModelForTokenClassification",
+}
+
+
+def pipeline_backend_from_env() -> str:
+    backend = os.environ.get("SMARTPANTRY_PIPELINE_BACKEND", "torch").strip().lower() or "torch"
+    if backend not in PIPELINE_BACKENDS:
+        print(f"DEBUG: Unknown SMARTPANTRY_PIPELINE_BACKEND={backend!r}, using torch")
+        return "torch"
+    return backend
+
+
+def onnx_quantize_from_env() -> bool:
+    return os.environ.get("SMARTPANTRY_ONNX_QUANTIZE", "").strip().lower() in {"1", "true", "yes"}
+
+
+def onnx_threads_from_env() -> int:
+    # 0 lets ONNX Runtime pick (one thread per physical core).
+    try:
+        return max(int(os.environ.get("SMARTPANTRY_ONNX_THREADS", "0")), 0)
+    except ValueError:
+        return 0
+
+
+def default_onnx_dir() -> Path:
+    override = os.environ.get("SMARTPANTRY_ONNX_DIR")
+    if override:
+        return Path(override)
+    return Path(__file__).resolve().parent.parent / "models" / "checkpoints" / "onnx"
+
+
+def export_dir(task: str, model_name: str, quantize: bool, cache_dir: Optional[Path] = None) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "--", f"{task}--{model_name}")
+    return Path(cache_dir or default_onnx_dir()) / (f"{slug}-int8" if quantize else slug)
+
+
+def export_onnx_model(task: str, model_name: str, quantize: bool = False, cache_dir: Optional[Path] = None) -> Path:
+    """
+    Directory holding ``model_name`` exported to ONNX for ``task`` (and its
+    tokenizer / processor), exporting it on first use. With ``quantize`` every
+    exported graph gets dynamic int8 MatMul weights. The export is written to a
+    temporary directory and renamed into place once complete, so a crashed or
+    concurrent export never leaves a half-written model behind.
+    """
+    from optimum import onnxruntime as ort_models
+    from transformers import AutoProcessor, AutoTokenizer
+
+    target = export_dir(task, model_name, quantize, cache_dir)
+    if (target / "export.json").exists():
+        return target
+
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    model_cls = getattr(ort_models, _ORT_CLASSES[task])
+    model_cls.from_pretrained(model_name, export=True).save_pretrained(tmp)
+    preprocessor = AutoProcessor if task == "automatic-speech-recognition" else AutoTokenizer
+    preprocessor.from_pretrained(model_name).save_pretrained(tmp)
+    graphs = sorted(p.name for p in tmp.glob("*.onnx"))
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        for name in graphs:
+            # Quantized in place so the ORTModel file names stay the defaults.
+            src, dst = tmp / name, tmp / f"{name}.int8"
+            quantize_dynamic(str(src), str(dst), weight_type=QuantType.QInt8)
+            os.replace(dst, src)
+    with open(tmp / "export.json", "w", encoding="utf-8") as f:
+        json.dump({"task": task, "model": model_name, "quantized": quantize, "graphs": graphs}, f, indent=2)
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another worker finished the same export first.
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not (target / "export.json").exists():
+            raise
+    return target
+
+
+def session_options(threads: Optional[int] = None) -> Any:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = onnx_threads_from_env() if threads is None else threads
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return options
+
+
+def load_onnx_model(
+    task: str,
+    model_name: str,
+    quantize: Optional[bool] = None,
+    threads: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+) -> Any:
+    """(ORTModel, tokenizer or processor) for ``task``, exported on first use."""
+    from optimum import onnxruntime as ort_models
+    from transformers import AutoProcessor, AutoTokenizer
+
+    quantize = onnx_quantize_from_env() if quantize is None else quantize
+    path = export_onnx_model(task, model_name, quantize, cache_dir)
+    model_cls = getattr(ort_models, _ORT_CLASSES[task])
+    model = model_cls.from_pretrained(path, session_options=session_options(threads), provider="CPUExecutionProvider")
+    preprocessor = AutoProcessor if task == "automatic-speech-recognition" else AutoTokenizer
+    print(f"DEBUG: {model_name} running onnxruntime{' int8' if quantize else ''} from {path}")
+    return model, preprocessor.from_pretrained(path)
+
+
+def load_onnx_pipeline(task: str, model_name: str, **kwargs: Any) -> Any:
+    """
+    A transformers ``pipeline`` for ``task`` backed by ONNX Runtime; it takes
+    the same inputs and returns the same output format as the torch one.
+    ``kwargs`` go to ``load_onnx_model``, except ``aggregation_strategy``
+    which goes to the pipeline.
+    """
+    from transformers import pipeline
+
+    pipeline_kwargs = {k: kwargs.pop(k) for k in ("aggregation_strategy",) if k in kwargs}
+    model, preprocessor = load_onnx_model(task, model_name, **kwargs)
+    if task == "automatic-speech-recognition":
+        return pipeline(
+            task,
+            model=model,
+            tokenizer=preprocessor.tokenizer,
+            feature_extractor=preprocessor.feature_extractor,
+            **pipeline_kwargs,
+        )
+    return pipeline(task, model=model, tokenizer=preprocessor, **pipeline_kwargs)
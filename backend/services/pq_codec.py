@@ -0,0 +1,137 @@
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from services.ann_index import _cluster_sums, top_k
+
+
+class ProductQuantizer:
+    """
+    Product quantization codec for recipe embeddings.
+
+    A ``dim``-dimensional vector is split into ``m`` sub-vectors and each is
+    replaced by the uint8 index of its nearest sub-centroid, so a 128-dim
+    float32 embedding (512 bytes) becomes ``m`` bytes (16 or 32 in practice).
+    Inner products are estimated with asymmetric distance computation (ADC):
+    the query stays in float32 and is turned into one (m x 256) lookup table,
+    after which each code costs ``m`` table reads.
+    """
+
+    def __init__(self, codebooks: np.ndarray) -> None:
+        # codebooks: (m, ks, dsub)
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)
+
+    @property
+    def m(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.codebooks.shape[0] * self.codebooks.shape[2]
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, m: int = 16, ks: int = 256, n_iter: int = 20, max_train: int = 65536, seed: int = 0) -> "ProductQuantizer":
+        n, dim = vectors.shape
+        if dim % m != 0:
+            raise ValueError(f"dim={dim} is not divisible by m={m}")
+        if not 1 <= ks <= 256:
+            raise ValueError("ks must be in [1, 256] to fit uint8 codes")
+        rng = np.random.default_rng(seed)
+        train = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, max_train), replace=False))], dtype=np.float32)
+        ks = min(ks, len(train))
+        dsub = dim // m
+        codebooks = np.empty((m, ks, dsub), dtype=np.float32)
+        for j in range(m):
+            codebooks[j] = _kmeans(train[:, j * dsub:(j + 1) * dsub], ks, n_iter, rng)
+        return cls(codebooks)
+
+    def encode(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        m, ks, dsub = self.codebooks.shape
+        codes = np.empty((len(vectors), m), dtype=np.uint8)
+        c_sq = (self.codebooks ** 2).sum(axis=2)  # (m, ks)
+        for start in range(0, len(vectors), chunk):
+            block = np.asarray(vectors[start:start + chunk], dtype=np.float32)
+            for j in range(m):
+                sub = np.ascontiguousarray(block[:, j * dsub:(j + 1) * dsub])
+                # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+                codes[start:start + len(block), j] = np.argmin(c_sq[j] - 2.0 * (sub @ self.codebooks[j].T), axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        m = self.m
+        return self.codebooks[np.arange(m), codes].reshape(len(codes), -1)
+
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        # (m, ks): inner product of every sub-centroid with the matching query slice.
+        m, ks, dsub = self.codebooks.shape
+        q = np.asarray(query, dtype=np.float32).reshape(m, 1, dsub)
+        return (self.codebooks * q).sum(axis=2)
+
+    def adc_scores(self, codes: np.ndarray, table: np.ndarray) -> np.ndarray:
+        return table[np.arange(self.m), codes].sum(axis=1, dtype=np.float32)
+
+    def save(self, path: Union[str, Path], codes: np.ndarray, **meta: str) -> None:
+        np.savez(
+            path,
+            codebooks=self.codebooks,
+            codes=codes,
+            **{f"meta_{key}": np.array(value) for key, value in meta.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Tuple["ProductQuantizer", np.ndarray, dict]:
+        with np.load(path) as data:
+            meta = {key[len("meta_"):]: str(data[key]) for key in data.files if key.startswith("meta_")}
+            return cls(data["codebooks"]), data["codes"], meta
+
+
+class PQScorer:
+    """
+    Scores recipe IDs against a query from PQ codes, optionally re-ranking the
+    best ``rerank`` candidates with exact float32 dot products. Only the rows
+    of ``vectors`` in the shortlist are read, so a memory-mapped embedding file
+    stays almost entirely on disk.
+    """
+
+    def __init__(self, pq: ProductQuantizer, codes: np.ndarray, vectors: Optional[np.ndarray] = None, rerank: int = 0) -> None:
+        self.pq = pq
+        self.codes = codes
+        self.vectors = vectors
+        self.rerank = rerank if vectors is not None else 0
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __call__(self, ids: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return self.pq.adc_scores(self.codes[ids], self.pq.lookup_table(query))
+
+    def search(self, query: np.ndarray, k: int, ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Top-k (ids, scores) over ``ids`` (default: every code), best first.
+        if ids is None:
+            ids = np.arange(len(self.codes), dtype=np.int64)
+            scores = self.pq.adc_scores(self.codes, self.pq.lookup_table(query))
+        else:
+            scores = self(ids, query)
+        shortlist, approx = top_k(ids, scores, max(k, self.rerank))
+        if self.rerank <= 0 or len(shortlist) == 0:
+            return shortlist[:k], approx[:k]
+        order = np.argsort(shortlist)
+        exact = np.empty(len(shortlist), dtype=np.float32)
+        exact[order] = np.asarray(self.vectors[shortlist[order]], dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+        return top_k(shortlist, exact, k)
+
+
+def _kmeans(x: np.ndarray, k: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        c_sq = (centroids ** 2).sum(axis=1)
+        assign = np.argmin(c_sq - 2.0 * (x @ centroids.T), axis=1)
+        counts = np.bincount(assign, minlength=k)
+        sums = _cluster_sums(x, assign, k)
+        empty = counts == 0
+        centroids = (sums / np.maximum(counts, 1)[:, None]).astype(np.float32)
+        centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+    return centroids
+
@@ -0,0 +1,413 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# On-disk columnar catalog: one .npy per array plus manifest.json.
+CATALOG_FORMAT_VERSION = 1
+_CATALOG_ARRAYS = (
+    "names", "name_offsets", "offsets", "ingredient_ids", "ratings",
+    "prep_times", "step_counts", "simplicity", "posting_offsets", "postings",
+)
+# Added after the first catalogs were written; absent files mean "no tags".
+_OPTIONAL_ARRAYS = ("tag_offsets", "tag_ids")
+
+
+@dataclass(frozen=True)
+class Recipe:
+    name: str
+    ingredients: List[str]
+    rating: float = 4.0
+    prep_time_mins: int = 20
+    steps: Optional[List[str]] = None
+    embedding: Optional[List[float]] = None
+    tags: Optional[List[str]] = None
+
+
+def norm_ingredient(x: str) -> str:
+    return " ".join((x or "").strip().lower().split())
+
+
+def simplicity_score(n_steps: int) -> float:
+    if n_steps <= 0:
+        return 0.6
+    return float(1.0 / (1.0 + math.log(1.0 + n_steps)))
+
+
+class RecipeCatalog:
+    """
+    Compact, array-backed recipe catalog.
+
+    Ingredients are normalized once and interned to integer IDs assigned in
+    lexical order, so a sorted ID array is also a sorted name list. Per-recipe
+    ingredient sets are stored CSR-style (``offsets`` + one flat ``ingredient_ids``
+    array) together with an inverted ingredient -> recipe index in the same layout.
+    Free-form recipe tags (e.g. Food.com's "vegetarian", "low-carb") use the
+    same CSR layout over their own lexically ordered vocabulary.
+    Every array can be a read-only memory map (see ``save`` / ``load``).
+    """
+
+    def __init__(
+        self,
+        ingredient_names: List[str],
+        name_blob: Union[bytes, np.ndarray],
+        name_offsets: np.ndarray,
+        offsets: np.ndarray,
+        ingredient_ids: np.ndarray,
+        ratings: np.ndarray,
+        prep_times: np.ndarray,
+        step_counts: np.ndarray,
+        simplicity: np.ndarray,
+        postings: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        fingerprint: Optional[str] = None,
+        tag_names: Optional[List[str]] = None,
+        tag_offsets: Optional[np.ndarray] = None,
+        tag_ids: Optional[np.ndarray] = None,
+    ) -> None:
+        self.ingredient_names = ingredient_names
+        self.vocab: Dict[str, int] = {name: i for i, name in enumerate(ingredient_names)}
+        self._name_blob = name_blob
+        self._name_offsets = name_offsets
+        self.offsets = offsets
+        self.ingredient_ids = ingredient_ids
+        self.ratings = ratings
+        self.prep_times = prep_times
+        self.step_counts = step_counts
+        self.simplicity = simplicity
+        self.tag_names = tag_names or []
+        self.tag_offsets = tag_offsets if tag_offsets is not None else np.zeros(len(offsets), dtype=np.int64)
+        self.tag_ids = tag_ids if tag_ids is not None else np.empty(0, dtype=np.int32)
+        self.sizes = np.diff(offsets).astype(np.int32)
+        self.posting_offsets, self.postings = postings if postings is not None else self._build_postings()
+        self._fingerprint = fingerprint
+        self._matrix: Optional[Any] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_recipes(cls, recipes: Iterable[Recipe]) -> "RecipeCatalog":
+        builder = RecipeCatalogBuilder()
+        for r in recipes:
+            builder.add(r.name, r.ingredients, r.rating, r.prep_time_mins, len(r.steps or []), r.tags or ())
+        return builder.build()
+
+    def name(self, recipe_id: int) -> str:
+        start, end = self._name_offsets[recipe_id], self._name_offsets[recipe_id + 1]
+        return bytes(self._name_blob[start:end]).decode("utf-8")
+
+    def ingredients_of(self, recipe_id: int) -> np.ndarray:
+        return self.ingredient_ids[self.offsets[recipe_id]:self.offsets[recipe_id + 1]]
+
+    def tags_of(self, recipe_id: int) -> List[str]:
+        ids = self.tag_ids[self.tag_offsets[recipe_id]:self.tag_offsets[recipe_id + 1]]
+        return [self.tag_names[i] for i in ids]
+
+    def ingredient_list(self, ids: Iterable[int]) -> List[str]:
+        names = self.ingredient_names
+        return [names[i] for i in ids]
+
+    def encode(self, ingredients: Iterable[str]) -> np.ndarray:
+        # Sorted, de-duplicated IDs of the known ingredients; unknown ones are dropped.
+        vocab = self.vocab
+        ids = {vocab[n] for n in (norm_ingredient(x) for x in ingredients) if n in vocab}
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def match_counts(self, query_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Ascending recipe IDs sharing at least one ingredient with the query and
+        # how many they share, accumulated from the posting lists.
+        if len(query_ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        po, postings = self.posting_offsets, self.postings
+        hits = np.concatenate([postings[po[i]:po[i + 1]] for i in query_ids])
+        ids, counts = np.unique(hits, return_counts=True)
+        return ids.astype(np.int64), counts.astype(np.int64)
+
+    def slice(self, start: int, stop: int) -> "RecipeCatalog":
+        # Recipes [start, stop) as a standalone catalog; ingredient IDs are unchanged
+        # and recipe IDs are shifted down by ``start``.
+        lo, hi = int(self.offsets[start]), int(self.offsets[stop])
+        name_lo, name_hi = int(self._name_offsets[start]), int(self._name_offsets[stop])
+        tag_lo, tag_hi = int(self.tag_offsets[start]), int(self.tag_offsets[stop])
+        return RecipeCatalog(
+            ingredient_names=self.ingredient_names,
+            name_blob=bytes(self._name_blob[name_lo:name_hi]),
+            name_offsets=np.asarray(self._name_offsets[start:stop + 1]) - name_lo,
+            offsets=np.asarray(self.offsets[start:stop + 1]) - lo,
+            ingredient_ids=np.array(self.ingredient_ids[lo:hi]),
+            ratings=np.array(self.ratings[start:stop]),
+            prep_times=np.array(self.prep_times[start:stop]),
+            step_counts=np.array(self.step_counts[start:stop]),
+            simplicity=np.array(self.simplicity[start:stop]),
+            tag_names=self.tag_names,
+            tag_offsets=np.asarray(self.tag_offsets[start:stop + 1]) - tag_lo,
+            tag_ids=np.array(self.tag_ids[tag_lo:tag_hi]),
+        )
+
+    def fingerprint(self) -> str:
+        # Identifies recipe order and content, so artifacts built row-by-row
+        # against this catalog (e.g. embeddings) can be checked for alignment.
+        if self._fingerprint is not None:
+            return self._fingerprint
+        h = hashlib.sha1()
+        h.update(self._name_blob)
+        h.update(np.ascontiguousarray(self.offsets).tobytes())
+        h.update("\n".join(self.ingredient_names).encode("utf-8"))
+        h.update(np.ascontiguousarray(self.ingredient_ids).tobytes())
+        self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def save(self, directory: Union[str, Path]) -> None:
+        # Written to a sibling temp directory and renamed into place, so a reader
+        # never sees a half-written catalog. Processes that still map the old
+        # files keep them until they drop the mapping.
+        directory = Path(directory)
+        tmp = directory.with_name(directory.name + ".tmp")
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        arrays = {
+            "names": np.frombuffer(bytes(self._name_blob), dtype=np.uint8),
+            "name_offsets": self._name_offsets,
+            "offsets": self.offsets,
+            "ingredient_ids": self.ingredient_ids,
+            "ratings": self.ratings,
+            "prep_times": self.prep_times,
+            "step_counts": self.step_counts,
+            "simplicity": self.simplicity,
+            "posting_offsets": self.posting_offsets,
+            "postings": self.postings,
+            "tag_offsets": self.tag_offsets,
+            "tag_ids": self.tag_ids,
+        }
+        for key, value in arrays.items():
+            np.save(tmp / f"{key}.npy", np.ascontiguousarray(value))
+        manifest = {
+            "version": CATALOG_FORMAT_VERSION,
+            "recipes": len(self),
+            "fingerprint": self.fingerprint(),
+            "ingredients": self.ingredient_names,
+            "tags": self.tag_names,
+        }
+        with open(tmp / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        shutil.rmtree(old, ignore_errors=True)
+        if directory.exists():
+            os.replace(directory, old)
+        os.replace(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], mmap: bool = True) -> "RecipeCatalog":
+        # With ``mmap`` the arrays stay in the OS page cache, shared by every
+        # worker process, and only the pages a query touches are read.
+        directory = Path(directory)
+        with open(directory / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CATALOG_FORMAT_VERSION:
+            raise ValueError(f"Unsupported catalog format version: {manifest.get('version')}")
+        arrays = {key: _load_array(directory / f"{key}.npy", mmap) for key in _CATALOG_ARRAYS}
+        for key in _OPTIONAL_ARRAYS:
+            if (directory / f"{key}.npy").exists():
+                arrays[key] = _load_array(directory / f"{key}.npy", mmap)
+        catalog = cls(
+            ingredient_names=manifest["ingredients"],
+            name_blob=arrays["names"],
+            name_offsets=arrays["name_offsets"],
+            offsets=arrays["offsets"],
+            ingredient_ids=arrays["ingredient_ids"],
+            ratings=arrays["ratings"],
+            prep_times=arrays["prep_times"],
+            step_counts=arrays["step_counts"],
+            simplicity=arrays["simplicity"],
+            postings=(arrays["posting_offsets"], arrays["postings"]),
+            fingerprint=manifest.get("fingerprint"),
+            tag_names=manifest.get("tags"),
+            tag_offsets=arrays.get("tag_offsets"),
+            tag_ids=arrays.get("tag_ids"),
+        )
+        if len(catalog) != manifest.get("recipes"):
+            raise ValueError(f"Catalog manifest lists {manifest.get('recipes')} recipes, arrays hold {len(catalog)}")
+        return catalog
+
+    def recipe_matrix(self) -> Optional[Any]:
+        # Binary recipe x ingredient CSR matrix, built on first use (needs SciPy).
+        if self._matrix is None:
+            try:
+                from scipy.sparse import csr_matrix
+            except Exception:
+                return None
+            data = np.ones(len(self.ingredient_ids), dtype=np.int32)
+            self._matrix = csr_matrix(
+                (data, self.ingredient_ids, self.offsets),
+                shape=(len(self), len(self.ingredient_names)),
+            )
+        return self._matrix
+
+    def query_matrix(self, query_ids: Sequence[np.ndarray]) -> Optional[Any]:
+        # Binary user x ingredient CSR matrix for a batch of encoded pantries.
+        try:
+            from scipy.sparse import csr_matrix
+        except Exception:
+            return None
+        indptr = np.zeros(len(query_ids) + 1, dtype=np.int64)
+        np.cumsum([len(q) for q in query_ids], out=indptr[1:])
+        indices = np.concatenate(query_ids) if query_ids else np.empty(0, dtype=np.int32)
+        data = np.ones(len(indices), dtype=np.int32)
+        return csr_matrix((data, indices, indptr), shape=(len(query_ids), len(self.ingredient_names)))
+
+    def _build_postings(self) -> Tuple[np.ndarray, np.ndarray]:
+        recipe_of_entry = np.repeat(np.arange(len(self), dtype=np.int32), self.sizes)
+        order = np.argsort(self.ingredient_ids, kind="stable")
+        counts = np.bincount(self.ingredient_ids, minlength=len(self.ingredient_names))
+        posting_offsets = np.zeros(len(self.ingredient_names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=posting_offsets[1:])
+        return posting_offsets, recipe_of_entry[order]
+
+
+class RecipeCatalogBuilder:
+    """Accumulates recipes into flat typed buffers and interns ingredients on the fly."""
+
+    def __init__(self) -> None:
+        self._vocab: Dict[str, int] = {}
+        self._names = bytearray()
+        self._name_offsets = array("q", [0])
+        self._offsets = array("q", [0])
+        self._ingredient_ids = array("i")
+        self._ratings = array("d")
+        self._prep_times = array("i")
+        self._step_counts = array("i")
+        self._simplicity = array("d")
+        self._tag_vocab: Dict[str, int] = {}
+        self._tag_offsets = array("q", [0])
+        self._tag_ids = array("i")
+
+    def add(self, name: str, ingredients: Sequence[str], rating: float = 4.0, prep_time_mins: int = 20, n_steps: int = 0, tags: Sequence[str] = ()) -> None:
+        ids = set()
+        for x in ingredients:
+            n = norm_ingredient(x)
+            if n:
+                ids.add(self._vocab.setdefault(n, len(self._vocab)))
+        self._names += name.encode("utf-8")
+        self._name_offsets.append(len(self._names))
+        self._ingredient_ids.extend(ids)
+        self._offsets.append(len(self._ingredient_ids))
+        self._ratings.append(float(rating))
+        self._prep_times.append(int(prep_time_mins))
+        self._step_counts.append(int(n_steps))
+        self._simplicity.append(simplicity_score(int(n_steps)))
+        tag_ids = set()
+        for t in tags:
+            n = norm_ingredient(t)
+            if n:
+                tag_ids.add(self._tag_vocab.setdefault(n, len(self._tag_vocab)))
+        self._tag_ids.extend(tag_ids)
+        self._tag_offsets.append(len(self._tag_ids))
+
+    def __len__(self) -> int:
+        return len(self._ratings)
+
+    def build(self) -> RecipeCatalog:
+        # Re-number ingredients (and tags) in lexical order and sort each recipe's IDs.
+        ingredient_names, offsets, ids = _intern_sorted(self._vocab, self._offsets, self._ingredient_ids)
+        tag_names, tag_offsets, tag_ids = _intern_sorted(self._tag_vocab, self._tag_offsets, self._tag_ids)
+
+        return RecipeCatalog(
+            ingredient_names=ingredient_names,
+            name_blob=bytes(self._names),
+            name_offsets=np.frombuffer(self._name_offsets, dtype=np.int64).copy(),
+            offsets=offsets,
+            ingredient_ids=ids,
+            ratings=np.frombuffer(self._ratings, dtype=np.float64).copy(),
+            prep_times=np.frombuffer(self._prep_times, dtype=np.int32).copy(),
+            step_counts=np.frombuffer(self._step_counts, dtype=np.int32).copy(),
+            simplicity=np.frombuffer(self._simplicity, dtype=np.float64).copy(),
+            tag_names=tag_names,
+            tag_offsets=tag_offsets,
+            tag_ids=tag_ids,
+        )
+
+
+def default_catalog_dir() -> Path:
+    # Written by scripts/ingest_foodcom.py
+    return Path(os.environ.get("SMARTPANTRY_CATALOG_DIR", _BACKEND_DIR / "data" / "catalog"))
+
+
+def default_recipes_path() -> Path:
+    return _BACKEND_DIR / "data" / "recipes_sample.json"
+
+
+def load_catalog(catalog_dir: Optional[Union[str, Path]] = None, recipes_path: Optional[Union[str, Path]] = None) -> RecipeCatalog:
+    """The columnar catalog in ``catalog_dir`` if there is one, else the recipes in the JSON file."""
+    catalog_dir = Path(catalog_dir) if catalog_dir is not None else default_catalog_dir()
+    if (catalog_dir / "manifest.json").exists():
+        try:
+            return RecipeCatalog.load(catalog_dir)
+        except Exception as e:
+            print(f"DEBUG: Failed to load catalog from {catalog_dir}: {e}")
+    return RecipeCatalog.from_recipes(read_recipe_records(recipes_path if recipes_path is not None else default_recipes_path()))
+
+
+def read_recipe_records(path: Union[str, Path]) -> List[Recipe]:
+    # Tries to load existing json, fallback to mock data
+    path = Path(path)
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            recipes: List[Recipe] = []
+            if isinstance(raw, list):
+                for r in raw:
+                    if not isinstance(r, dict): continue
+                    name = str(r.get("name") or "").strip()
+                    ings = r.get("ingredients")
+                    if not name or not isinstance(ings, list): continue
+                    recipes.append(Recipe(
+                        name=name,
+                        ingredients=[str(x) for x in ings],
+                        rating=float(r.get("rating", 4.0)),
+                        prep_time_mins=int(r.get("prep_time_mins", 20)),
+                        steps=r.get("steps") if isinstance(r.get("steps"), list) else None,
+                        tags=[str(t) for t in r["tags"]] if isinstance(r.get("tags"), list) else None
+                    ))
+            if recipes: return recipes
+        except: pass
+        
+    return [
+        Recipe(name="Classic Pancakes", ingredients=["milk", "eggs", "flour", "sugar", "butter"], rating=4.6, prep_time_mins=15),
+        Recipe(name="Scrambled Eggs", ingredients=["eggs", "butter", "salt", "pepper"], rating=4.4, prep_time_mins=8),
+        Recipe(name="Tomato Pasta", ingredients=["pasta", "tomato sauce", "garlic", "olive oil", "salt"], rating=4.5, prep_time_mins=25),
+        Recipe(name="Chicken Rice Bowl", ingredients=["chicken breast", "rice", "soy sauce", "garlic", "onions"], rating=4.3, prep_time_mins=30),
+    ]
+
+
+def _intern_sorted(vocab: Dict[str, int], offsets_buf: array, ids_buf: array) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    interned = list(vocab)
+    order = sorted(range(len(interned)), key=interned.__getitem__)
+    rank = np.empty(len(interned), dtype=np.int32)
+    rank[order] = np.arange(len(interned), dtype=np.int32)
+
+    offsets = np.frombuffer(offsets_buf, dtype=np.int64).copy()
+    ids = rank[np.frombuffer(ids_buf, dtype=np.int32)] if len(ids_buf) else np.empty(0, dtype=np.int32)
+    row = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    ids = ids[np.lexsort((ids, row))]
+    return [interned[i] for i in order], offsets, ids.astype(np.int32)
+
+
+def _load_array(path: Path, mmap: bool) -> np.ndarray:
+    if not mmap:
+        return np.load(path)
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Zero-length arrays cannot be memory-mapped.
+        return np.load(path)
@@ -0,0 +1,281 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.recipe_catalog import RecipeCatalog, norm_ingredient
+from services.result_cache import ResultCache
+
+# Ingredient groups used for allergen exclusion and diet inference, as
+# (phrases that put an ingredient in the group, phrases that take it back out).
+# Phrases match whole words, singular or plural ("egg" matches "large eggs").
+INGREDIENT_GROUPS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "meat": ((
+        "beef", "pork", "chicken", "turkey", "lamb", "veal", "bacon", "ham", "sausage", "salami",
+        "pepperoni", "prosciutto", "chorizo", "pancetta", "duck", "goose", "venison", "mutton",
+        "steak", "meat", "meatball", "hamburger", "hot dog", "gelatin", "lard", "suet",
+    ), ()),
+    "fish": ((
+        "fish", "salmon", "tuna", "cod", "tilapia", "anchovy", "sardine", "trout", "halibut",
+        "mackerel", "haddock", "worcestershire sauce",
+    ), ()),
+    "shellfish": ((
+        "shrimp", "prawn", "crab", "lobster", "scallop", "clam", "mussel", "oyster", "squid",
+        "calamari", "crawfish",
+    ), ()),
+    "dairy": ((
+        "milk", "butter", "cheese", "cream", "yogurt", "yoghurt", "ghee", "whey", "buttermilk",
+        "parmesan", "mozzarella", "cheddar", "ricotta", "feta", "mascarpone", "custard",
+    ), (
+        "coconut milk", "almond milk", "oat milk", "soy milk", "rice milk", "coconut cream",
+        "peanut butter", "almond butter", "nut butter", "cocoa butter", "apple butter", "cream of tartar",
+    )),
+    "egg": (("egg", "mayonnaise"), ()),
+    "gluten": ((
+        "flour", "wheat", "bread", "breadcrumb", "pasta", "spaghetti", "macaroni", "noodle",
+        "couscous", "barley", "rye", "bulgur", "semolina", "farro", "spelt", "cracker", "tortilla",
+        "pita", "bagel", "croissant", "baguette", "panko", "seitan", "soy sauce", "beer",
+        "pastry", "dough", "lasagna", "penne", "fettuccine", "linguine", "ramen", "udon",
+    ), (
+        "almond flour", "rice flour", "coconut flour", "corn flour", "gluten-free", "corn tortilla",
+        "rice noodle", "pasta sauce",
+    )),
+    "nuts": ((
+        "nut", "peanut", "almond", "walnut", "cashew", "pecan", "hazelnut", "pistachio", "macadamia",
+    ), ()),
+    "soy": (("soy", "soy sauce", "tofu", "edamame", "tempeh", "miso"), ()),
+    "sesame": (("sesame", "tahini"), ()),
+    "honey": (("honey",), ()),
+}
+
+# Diets inferred from ingredients: a recipe qualifies when it contains none of the groups.
+DIET_EXCLUDED_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "vegetarian": ("meat", "fish", "shellfish"),
+    "pescatarian": ("meat",),
+    "vegan": ("meat", "fish", "shellfish", "dairy", "egg", "honey"),
+    "gluten-free": ("gluten",),
+    "dairy-free": ("dairy",),
+    "nut-free": ("nuts",),
+}
+
+_GROUP_ALIASES = {"nut": "nuts", "tree nuts": "nuts", "eggs": "egg", "milk products": "dairy"}
+
+# Thresholds with precomputed bitmaps; other values go through the sorted arrays.
+PREP_TIME_BUCKETS = (10, 15, 20, 30, 45, 60, 90, 120)
+RATING_BUCKETS = (3.0, 3.5, 4.0, 4.5)
+
+
+@dataclass(frozen=True)
+class RecipeFilters:
+    """Hard constraints applied to the candidate set before scoring."""
+    max_prep_time_mins: Optional[int] = None
+    min_rating: Optional[float] = None
+    exclude: FrozenSet[str] = frozenset()
+    diets: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["RecipeFilters"]:
+        # Parses the "filters" object of a request body; None when nothing is set.
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("filters must be an object")
+
+        def names(key: str) -> FrozenSet[str]:
+            value = data.get(key) or []
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list):
+                raise ValueError(f"filters.{key} must be a list of strings")
+            return frozenset(n for n in (norm_ingredient(str(x)) for x in value) if n)
+
+        max_prep = data.get("max_prep_time_mins")
+        min_rating = data.get("min_rating")
+        try:
+            filters = cls(
+                max_prep_time_mins=int(max_prep) if max_prep is not None else None,
+                min_rating=float(min_rating) if min_rating is not None else None,
+                exclude=names("exclude"),
+                diets=names("diets"),
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid filters: {e}")
+        return None if filters.is_empty() else filters
+
+    def is_empty(self) -> bool:
+        return self.max_prep_time_mins is None and self.min_rating is None and not self.exclude and not self.diets
+
+    def key(self) -> Tuple[Any, ...]:
+        return (self.max_prep_time_mins, self.min_rating, tuple(sorted(self.exclude)), tuple(sorted(self.diets)))
+
+
+class RecipeFilterIndex:
+    """
+    Packed per-recipe bitmaps (one bit per recipe, ``np.packbits`` little-endian)
+    for filter attributes: prep-time and rating buckets, ingredient groups,
+    inferred diets and catalog tags, plus prep-time / rating arrays sorted for
+    arbitrary thresholds. A filter set becomes one bitmap with a few bitwise
+    ANDs, and candidates are tested against it before they are scored.
+
+    Bitmaps are built on first use and the combined bitmap of recent filter
+    sets is cached.
+    """
+
+    def __init__(self, catalog: RecipeCatalog, cache_size: int = 256) -> None:
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._built = False
+        self._combined = ResultCache(max_size=cache_size, ttl_seconds=float("inf"), copy_values=False)
+        self._tag_bitmaps: Dict[str, np.ndarray] = {}
+
+    def build(self) -> "RecipeFilterIndex":
+        with self._lock:
+            if self._built:
+                return self
+            catalog = self.catalog
+            prep, ratings = np.asarray(catalog.prep_times), np.asarray(catalog.ratings)
+            self._prep_order = np.argsort(prep, kind="stable")
+            self._prep_sorted = prep[self._prep_order]
+            self._rating_order = np.argsort(ratings, kind="stable")
+            self._rating_sorted = ratings[self._rating_order]
+            self._prep_bitmaps = {t: self._pack(prep <= t) for t in PREP_TIME_BUCKETS}
+            self._rating_bitmaps = {t: self._pack(ratings >= t) for t in RATING_BUCKETS}
+
+            self._token_index = _token_index(catalog.ingredient_names)
+            contains = {group: self._recipes_with(self._group_ingredients(group)) for group in INGREDIENT_GROUPS}
+            self._group_bitmaps = {group: self._pack(mask) for group, mask in contains.items()}
+            self._diet_bitmaps = {}
+            for diet, groups in DIET_EXCLUDED_GROUPS.items():
+                excluded = np.zeros(len(catalog), dtype=bool)
+                for group in groups:
+                    excluded |= contains[group]
+                self._diet_bitmaps[diet] = self._pack(~excluded)
+            self._all = self._pack(np.ones(len(catalog), dtype=bool))
+            self._built = True
+        return self
+
+    def diets(self) -> List[str]:
+        return sorted(set(DIET_EXCLUDED_GROUPS) | set(self.catalog.tag_names))
+
+    def allowed(self, filters: Optional[RecipeFilters]) -> Optional[np.ndarray]:
+        # Packed bitmap of recipes passing every filter, or None for "no filter".
+        if filters is None or filters.is_empty():
+            return None
+        key = filters.key()
+        bitmap = self._combined.get(key)
+        if bitmap is not None:
+            return bitmap
+        self.build()
+        bitmap = self._all.copy()
+        if filters.max_prep_time_mins is not None:
+            bitmap &= self._prep_bitmap(filters.max_prep_time_mins)
+        if filters.min_rating is not None:
+            bitmap &= self._rating_bitmap(filters.min_rating)
+        for diet in filters.diets:
+            bitmap &= self._diet_bitmap(diet)
+        for term in filters.exclude:
+            bitmap &= ~self._exclusion_bitmap(term)
+        bitmap.setflags(write=False)
+        self._combined.put(key, bitmap)
+        return bitmap
+
+    @staticmethod
+    def mask(bitmap: np.ndarray, recipe_ids: np.ndarray) -> np.ndarray:
+        # Boolean mask of ``recipe_ids`` whose bit is set.
+        return ((bitmap[recipe_ids >> 3] >> (recipe_ids & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask, bitorder="little")
+
+    def _from_ids(self, recipe_ids: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self.catalog), dtype=bool)
+        mask[recipe_ids] = True
+        return self._pack(mask)
+
+    def _prep_bitmap(self, max_mins: int) -> np.ndarray:
+        if max_mins in self._prep_bitmaps:
+            return self._prep_bitmaps[max_mins]
+        n = np.searchsorted(self._prep_sorted, max_mins, side="right")
+        return self._from_ids(self._prep_order[:n])
+
+    def _rating_bitmap(self, min_rating: float) -> np.ndarray:
+        if min_rating in self._rating_bitmaps:
+            return self._rating_bitmaps[min_rating]
+        n = np.searchsorted(self._rating_sorted, min_rating, side="left")
+        return self._from_ids(self._rating_order[n:])
+
+    def _diet_bitmap(self, diet: str) -> np.ndarray:
+        if diet in self._diet_bitmaps:
+            return self._diet_bitmaps[diet]
+        with self._lock:
+            bitmap = self._tag_bitmaps.get(diet)
+            if bitmap is None:
+                catalog = self.catalog
+                names = catalog.tag_names
+                tag_id = np.searchsorted(names, diet) if names else 0
+                if tag_id >= len(names) or names[tag_id] != diet:
+                    raise ValueError(f"Unknown diet tag: {diet}")
+                tag_ids = np.asarray(catalog.tag_ids)
+                rows = np.repeat(np.arange(len(catalog)), np.diff(np.asarray(catalog.tag_offsets)))
+                bitmap = self._from_ids(rows[tag_ids == tag_id])
+                self._tag_bitmaps[diet] = bitmap
+        return bitmap
+
+    def _exclusion_bitmap(self, term: str) -> np.ndarray:
+        group = _GROUP_ALIASES.get(term, term)
+        if group in self._group_bitmaps:
+            return self._group_bitmaps[group]
+        return self._pack(self._recipes_with(self._phrase_ingredients(term)))
+
+    def _group_ingredients(self, group: str) -> np.ndarray:
+        include, unless = INGREDIENT_GROUPS[group]
+        ids = set()
+        for phrase in include:
+            ids.update(self._phrase_ingredients(phrase).tolist())
+        for phrase in unless:
+            ids.difference_update(self._phrase_ingredients(phrase).tolist())
+        return np.array(sorted(ids), dtype=np.int64)
+
+    def _phrase_ingredients(self, phrase: str) -> np.ndarray:
+        # Ingredient IDs whose name contains ``phrase`` as a run of whole words.
+        words = [_singular(w) for w in phrase.split()]
+        if not words:
+            return np.empty(0, dtype=np.int64)
+        candidates = set(self._token_index.get(words[0], ()))
+        for w in words[1:]:
+            candidates.intersection_update(self._token_index.get(w, ()))
+        names = self.catalog.ingredient_names
+        out = [i for i in candidates if _contains_run([_singular(w) for w in names[i].split()], words)]
+        return np.array(sorted(out), dtype=np.int64)
+
+    def _recipes_with(self, ingredient_ids: np.ndarray) -> np.ndarray:
+        # Boolean mask of recipes containing any of ``ingredient_ids``, from the posting lists.
+        mask = np.zeros(len(self.catalog), dtype=bool)
+        po, postings = self.catalog.posting_offsets, self.catalog.postings
+        for i in ingredient_ids.tolist():
+            mask[postings[po[i]:po[i + 1]]] = True
+        return mask
+
+
+def _singular(word: str) -> str:
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith(("oes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _token_index(names: Iterable[str]) -> Dict[str, List[int]]:
+    index: Dict[str, List[int]] = {}
+    for i, name in enumerate(names):
+        for w in set(name.split()):
+            index.setdefault(_singular(w), []).append(i)
+    return index
+
+
+def _contains_run(tokens: List[str], words: List[str]) -> bool:
+    n = len(words)
+    return any(tokens[j:j + n] == words for j in range(len(tokens) - n + 1))
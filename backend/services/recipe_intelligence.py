@@ -1,6 +1,9 @@
+import base64
+import hashlib
 import json
-import math
 import os
+import threading
+import time
 import torch
 import numpy as np
 from dataclasses import dataclass
@@ -8,17 +11,68 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 # Models
-from models.set_transformer import SetTransformer
+from models.set_transformer import SetTransformerWithEmbedding
 from models.autoencoder import RecipeAutoencoder
+from models.length_bucketing import length_buckets, pad_index_sets
+from services.ann_index import IVFIndex, exact_search
+from services.association_rules import DEFAULT_RULES, POPULAR_ITEMS, RuleIndex, RuleTable, default_rules_dir, load_rule_table
+from services.micro_batcher import MicroBatcher
+from services.model_compiler import compile_for_inference, inference_mode_from_env, state_dict_digest
+from services.model_registry import file_version, shared_registry
+from services.pq_codec import PQScorer, ProductQuantizer
+from services.recipe_catalog import RecipeCatalog, default_catalog_dir, default_recipes_path, load_catalog, norm_ingredient
+from services.recipe_filters import INGREDIENT_GROUPS, RecipeFilterIndex, RecipeFilters
+from services.recipe_scoring import RankedCandidates, RecipeCascade, SimilarityFn, rank_top_k
+from services.result_cache import ResultCache
+from services.shard_pool import ShardPool
+
+# Ingredient sets are truncated to this length, matching training.
+EMBED_MAX_INGREDIENTS = 20
+# The autoencoder runs fp32 where int8 is requested (see _compile_models).
+AUTOENCODER_INFERENCE_MODES = {"int8": "eager", "int8-torchscript": "torchscript"}
+# iter_recipe_embeddings encodes recipes of similar length together, this many at a time.
+EMBED_BUCKET_SIZE = 64
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    The recipe catalog plus everything derived from it. Never mutated: a reload
+    builds a new snapshot and swaps it in with one reference assignment, so a
+    request that already holds the old snapshot finishes on it.
+    """
+    generation: int
+    catalog: RecipeCatalog
+    vocab_map: np.ndarray
+    embeddings: Optional[np.ndarray] = None
+    pq_scorer: Optional[PQScorer] = None
+    ann_index: Optional[IVFIndex] = None
+    shards: Optional[ShardPool] = None
+    filter_index: Optional[RecipeFilterIndex] = None
+    rule_index: Optional[RuleIndex] = None
+    source_mtimes: Tuple[float, ...] = ()
+    loaded_at: float = 0.0
+
 
 @dataclass(frozen=True)
-class Recipe:
-    name: str
-    ingredients: List[str]
-    rating: float = 4.0
-    prep_time_mins: int = 20
-    steps: Optional[List[str]] = None
-    embedding: Optional[List[float]] = None
+class CompletionModel:
+    """
+    The autoencoder with its vocabulary lookups, built once per model load.
+    ``model`` is the runner for the configured inference mode, called as
+    ``model(x, padding_mask)``. ``names[i]`` is the ingredient for output index i; ``blocked`` is True for
+    indices that can never be suggested (padding, indices without a name).
+    """
+    model: Any
+    names: Tuple[str, ...]
+    blocked: torch.Tensor
+
+
+@dataclass(frozen=True)
+class InferenceModel:
+    """A recipe model prepared for one inference mode; ``runner`` is called like the eager module."""
+    runner: Any
+    mode: str
+    vocab_size: int
 
 class RecipeIntelligence:
     def __init__(self) -> None:
@@ -26,79 +80,333 @@ class RecipeIntelligence:
         self._data_dir = self._repo_root / "backend" / "data"
         self._models_dir = self._repo_root / "backend" / "models" / "checkpoints"
         
-        self._recipes_path = self._data_dir / "recipes_sample.json"
-        
-        # Load Data
-        self._recipes = self._load_recipes()
-        
-        # Load Models (Lazy / Optional)
-        self._ranker = self._try_load_ranker()
-        self._set_transformer = self._try_load_set_transformer()
-        self._autoencoder = self._try_load_autoencoder()
-
-    def get_top_recipes(self, user_ingredients: List[str], k: int = 5) -> List[Dict[str, Any]]:
-        user_set = {self._norm(x) for x in user_ingredients if self._norm(x)}
-        scored: List[Tuple[float, Dict[str, Any]]] = []
-        
-        # 1. Candidate Retrieval (Heuristic + Embedding if available)
-        
-        for recipe in self._recipes:
-            rec_ings = [self._norm(x) for x in recipe.ingredients if self._norm(x)]
-            rec_set = set(rec_ings)
-            
-            if not rec_set:
-                continue
-                
-            matched = sorted(user_set.intersection(rec_set))
-            missing = sorted(rec_set.difference(user_set))
-            match_count = len(matched)
-            
-            # Base Score (Heuristic)
-            base_score = self._score_recipe_heuristic(
-                match_count=match_count,
-                total=len(rec_set),
-                rating=float(recipe.rating),
-                prep_time_mins=int(recipe.prep_time_mins),
-                simplicity_score=self._simplicity_score(recipe)
+        self._recipes_path = default_recipes_path()
+        # Memory-mapped columnar catalog written by scripts/ingest_foodcom.py;
+        # used instead of the JSON file when present.
+        self._catalog_dir = default_catalog_dir()
+
+        # Results are keyed on the canonical ingredient set and the load generation,
+        # so a reload can never serve an answer computed against the old catalog.
+        self._result_cache = ResultCache(
+            max_size=int(os.environ.get("SMARTPANTRY_RESULT_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.environ.get("SMARTPANTRY_RESULT_CACHE_TTL_SECS", "300")),
+        )
+        # Full candidate rankings behind paginated results; immutable, so not copied.
+        self._ranking_cache = ResultCache(
+            max_size=int(os.environ.get("SMARTPANTRY_RANKING_CACHE_SIZE", "128")),
+            ttl_seconds=float(os.environ.get("SMARTPANTRY_RANKING_CACHE_TTL_SECS", "600")),
+            copy_values=False,
+        )
+        # Heuristic -> ranker -> embedding, each stage capped at a row budget
+        # (SMARTPANTRY_CASCADE_RANKER_N / _EMBEDDING_N) and timed.
+        self._cascade = RecipeCascade.from_env()
+        # Concurrent Set Transformer / autoencoder calls are coalesced into one
+        # padded forward pass of up to SMARTPANTRY_INFERENCE_MAX_BATCH items,
+        # waiting at most SMARTPANTRY_INFERENCE_MAX_WAIT_MS for company.
+        max_batch = int(os.environ.get("SMARTPANTRY_INFERENCE_MAX_BATCH", "32"))
+        max_wait_ms = float(os.environ.get("SMARTPANTRY_INFERENCE_MAX_WAIT_MS", "2"))
+        self._encode_batcher = MicroBatcher(self._encode_batch, max_batch, max_wait_ms, name="set-transformer-batcher")
+        self._completion_batcher = MicroBatcher(self._complete_batch, max_batch, max_wait_ms, name="autoencoder-batcher")
+        # "Frequently bought together" rules: the table mined by
+        # scripts/mine_association_rules.py when present, else these.
+        self._rules_dir = default_rules_dir()
+        self._default_rule_index = RuleIndex(RuleTable.from_ranked_lists(DEFAULT_RULES))
+        self._reload_lock = threading.Lock()
+        self._overlap_retrieval_logged = False
+        self._load_models()
+        self._snapshot = self._build_snapshot(generation=1)
+        self._result_cache.invalidate()
+
+        # Catalog hot reload: poll the source files' mtimes in the background
+        # (SMARTPANTRY_CATALOG_POLL_SECS, 0 disables).
+        self._watcher_stop = threading.Event()
+        poll_secs = float(os.environ.get("SMARTPANTRY_CATALOG_POLL_SECS", "10"))
+        if poll_secs > 0:
+            threading.Thread(target=self._watch_catalog, args=(poll_secs,), name="catalog-watcher", daemon=True).start()
+
+    def reload(self) -> None:
+        """Reloads the models and the recipe catalog and invalidates cached results."""
+        with self._reload_lock:
+            self._load_models()
+            self._swap_snapshot()
+
+    def reload_catalog(self, background: bool = False) -> Optional[int]:
+        """
+        Rebuilds the catalog and its derived indexes into a fresh snapshot and
+        swaps it in. Models are left untouched. Returns the new generation, or
+        None when the rebuild was scheduled on a background thread.
+        """
+        if background:
+            threading.Thread(target=self.reload_catalog, name="catalog-reload", daemon=True).start()
+            return None
+        with self._reload_lock:
+            return self._swap_snapshot().generation
+
+    def catalog_info(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "generation": snap.generation,
+            "recipes": len(snap.catalog),
+            "ingredients": len(snap.catalog.ingredient_names),
+            "embeddings": snap.embeddings is not None,
+            "pq_codes": snap.pq_scorer is not None,
+            "ann_index": snap.ann_index is not None,
+            "semantic_retrieval": "embeddings" if snap.embeddings is not None or snap.pq_scorer is not None else "ingredient_overlap",
+            "shards": snap.shards.stats() if snap.shards is not None else None,
+            "loaded_at": snap.loaded_at,
+        }
+
+    def filter_options(self) -> Dict[str, List[str]]:
+        return {"diets": self._snapshot.filter_index.diets(), "allergens": sorted(INGREDIENT_GROUPS)}
+
+    def stop_catalog_watcher(self) -> None:
+        self._watcher_stop.set()
+
+    def get_top_recipes(self, user_ingredients: List[str], k: int = 5, filters: Optional[RecipeFilters] = None) -> List[Dict[str, Any]]:
+        snap = self._snapshot
+        key = ("top", snap.generation, self._canonical_key(user_ingredients), k, filters.key() if filters else None)
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._compute_top_recipes(snap, user_ingredients, k, filters)
+        self._result_cache.put(key, result)
+        return result
+
+    def _compute_top_recipes(self, snap: CatalogSnapshot, user_ingredients: List[str], k: int, filters: Optional[RecipeFilters] = None) -> List[Dict[str, Any]]:
+        catalog = snap.catalog
+        query_ids = catalog.encode(user_ingredients)
+        allowed = snap.filter_index.allowed(filters)
+
+        if snap.shards is not None and allowed is None:
+            # Sharded mode: the workers' merged heuristic top rows are exactly
+            # the rows the later stages would see in-process.
+            t0 = time.perf_counter()
+            hits = snap.shards.top_k(query_ids, self._cascade.pool_size(k, self._ranker))
+            if hits is not None:
+                self._cascade.record("retrieval", len(hits[0]), time.perf_counter() - t0)
+                ranking = self._rerank(snap, user_ingredients, hits[0], hits[1], heuristic=hits[2])
+                return self._materialize(catalog, ranking.page(0, k), query_ids)
+
+        # Only IDs, match counts and scores go through selection; result dicts
+        # are built for the k rows actually returned.
+        return self._materialize(catalog, self._rank(snap, user_ingredients, query_ids, allowed).page(0, k), query_ids)
+
+    def get_recipe_page(
+        self,
+        user_ingredients: List[str],
+        limit: int = 5,
+        cursor: Optional[str] = None,
+        filters: Optional[RecipeFilters] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of ranked recipes plus an opaque cursor for the next page
+        (None when exhausted). Pass the cursor back with the same ingredients;
+        later pages are cut from the cached ranking instead of re-scoring.
+        Raises ValueError for a malformed cursor or one issued against a
+        catalog that has since been reloaded, and for unknown diet tags.
+        Materialized pages share the result cache with get_top_recipes.
+        """
+        snap = self._snapshot
+        query_key = (self._canonical_key(user_ingredients), filters.key() if filters else None)
+        offset = self._decode_cursor(cursor, snap.generation, query_key) if cursor else 0
+        limit = max(int(limit), 0)
+        page_key = ("page", snap.generation, query_key, offset, limit)
+        cached = self._result_cache.get(page_key)
+        if cached is not None:
+            return cached
+
+        catalog = snap.catalog
+        query_ids = catalog.encode(user_ingredients)
+        cache_key = ("rank", snap.generation, query_key)
+        ranking = self._ranking_cache.get(cache_key)
+        if ranking is None:
+            ranking = self._rank(snap, user_ingredients, query_ids, snap.filter_index.allowed(filters))
+            self._ranking_cache.put(cache_key, ranking)
+
+        results = self._materialize(catalog, ranking.page(offset, limit), query_ids)
+        next_offset = offset + len(results)
+        next_cursor = None
+        if results and next_offset < len(ranking):
+            next_cursor = self._encode_cursor(snap.generation, query_key, next_offset)
+        self._result_cache.put(page_key, (results, next_cursor))
+        return results, next_cursor
+
+    def get_top_recipes_batch(
+        self,
+        pantries: List[List[str]],
+        k: int = 5,
+        chunk_size: int = 1024,
+        filters: Optional[RecipeFilters] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k recipes for many pantries at once. Match counts for a whole chunk
+        of users come from one sparse (user x ingredient) @ (ingredient x recipe)
+        product, followed by one scoring pass and a vectorized per-row top-k.
+        """
+        snap = self._snapshot
+        catalog = snap.catalog
+        recipe_matrix = catalog.recipe_matrix()
+        if recipe_matrix is None:
+            return [self.get_top_recipes(p, k=k, filters=filters) for p in pantries]
+        allowed = snap.filter_index.allowed(filters)
+
+        results: List[List[Dict[str, Any]]] = []
+        recipe_matrix_t = recipe_matrix.T.tocsr()
+        for start in range(0, len(pantries), max(chunk_size, 1)):
+            t0 = time.perf_counter()
+            chunk_pantries = pantries[start:start + chunk_size]
+            query_ids = [catalog.encode(p) for p in chunk_pantries]
+            counts = catalog.query_matrix(query_ids) @ recipe_matrix_t
+            counts.sort_indices()
+
+            rows = np.repeat(np.arange(len(query_ids)), np.diff(counts.indptr))
+            recipe_ids = counts.indices.astype(np.int64)
+            match_counts = counts.data.astype(np.int64)
+            if allowed is not None:
+                keep = RecipeFilterIndex.mask(allowed, recipe_ids)
+                rows, recipe_ids, match_counts = rows[keep], recipe_ids[keep], match_counts[keep]
+            self._cascade.record("retrieval", len(recipe_ids), time.perf_counter() - t0)
+            scores, depth = self._cascade.run(
+                catalog, self._ranker, recipe_ids, match_counts,
+                rows=rows, similarity=self._embedding_similarity(snap, chunk_pantries),
             )
-            
-            # ML Score (LightGBM) - uses the heuristic features
-            final_score = base_score
-            if self._ranker:
-                match_pct = match_count / max(len(rec_set), 1)
-                feats = np.array([[match_pct, float(recipe.prep_time_mins), float(recipe.rating), float(self._simplicity_score(recipe))]], dtype=float)
-                try:
-                    final_score = float(self._ranker.predict(feats)[0])
-                except:
-                    pass
-            
-            # Embedding Similarity (Set Transformer) - Bonus
-            # In a real system, we would encode user_ingredients and dot-product with recipe embeddings
-            # For now, we rely on the intersection logic as the primary filter
-            
-            if match_count > 0: # Only consider if at least one ingredient matches
-                scored.append(
-                    (
-                        final_score,
-                        {
-                            "name": recipe.name,
-                            "match": f"{match_count}/{len(rec_set)}",
-                            "missing": missing,
-                            "score": float(final_score),
-                            "rating": recipe.rating,
-                            "time": recipe.prep_time_mins
-                        },
-                    )
-                )
-                
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [x[1] for x in scored[: max(k, 0)]]
+
+            # Order by (row, cascade depth desc, score desc, recipe id) and keep the first k of every row.
+            row_starts = np.zeros(len(query_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=len(query_ids)), out=row_starts[1:])
+            order = np.lexsort((recipe_ids, -scores, -depth, rows))
+            rank = np.arange(len(order)) - row_starts[rows[order]]
+            keep = order[rank < k]
+
+            chunk: List[List[Dict[str, Any]]] = [[] for _ in query_ids]
+            for i in keep.tolist():
+                row = int(rows[i])
+                chunk[row].append(self._recipe_result(catalog, int(recipe_ids[i]), int(match_counts[i]), float(scores[i]), query_ids[row]))
+            results.extend(chunk)
+        return results
+
+    def get_similar_recipes(self, user_ingredients: List[str], k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Semantic retrieval: encodes the user's ingredient set once with the Set
+        Transformer and ranks recipes by one matrix-vector product against the
+        memory-mapped recipe embeddings, or by an IVF index over them when one
+        has been built. With the PQ codec enabled, candidates are scored from
+        compressed codes instead. Without usable embeddings (none built, or no
+        Set Transformer that can encode the query) recipes are ranked by the
+        Jaccard overlap of their ingredient sets with the query.
+        """
+        snap = self._snapshot
+        if k <= 0:
+            return []
+        catalog = snap.catalog
+        query_ids = catalog.encode(user_ingredients)
+        query_vec = None
+        if snap.embeddings is not None or snap.pq_scorer is not None:
+            query_vec = self.encode_ingredient_sets([user_ingredients])
+
+        if query_vec is None:
+            if not self._overlap_retrieval_logged:
+                self._overlap_retrieval_logged = True
+                print("DEBUG: No usable recipe embeddings; get_similar_recipes ranks by ingredient overlap "
+                      "(see backend/data/README.md to build them)")
+            top, scores = self._overlap_search(catalog, query_ids, k)
+        elif snap.pq_scorer is not None:
+            q = query_vec[0]
+            candidates = snap.ann_index.candidates(q) if snap.ann_index is not None else None
+            top, scores = snap.pq_scorer.search(q, k, ids=candidates)
+        elif snap.ann_index is not None:
+            top, scores = snap.ann_index.search(query_vec[0], k)
+        else:
+            top, scores = exact_search(snap.embeddings, query_vec[0], k)
+
+        out: List[Dict[str, Any]] = []
+        for recipe_id, score in zip(top.tolist(), scores.tolist()):
+            match_count = len(np.intersect1d(catalog.ingredients_of(recipe_id), query_ids, assume_unique=True))
+            out.append(self._recipe_result(catalog, recipe_id, match_count, score, query_ids))
+        return out
+
+    @staticmethod
+    def _overlap_search(catalog: RecipeCatalog, query_ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # |recipe & query| / |recipe | query| over recipes sharing an ingredient; ties by recipe ID.
+        ids, counts = catalog.match_counts(query_ids)
+        sizes = np.diff(np.asarray(catalog.offsets))[ids]
+        scores = counts / (sizes + len(query_ids) - counts)
+        top, _, scores = rank_top_k(ids, counts, scores, k)
+        return top, scores
+
+    def encode_ingredient_sets(self, ingredient_sets: List[List[str]]) -> Optional[np.ndarray]:
+        vocab = self._ingredient_vocab
+        index_sets = [[vocab.get(n, 0) for n in (self._norm(x) for x in ings) if n] for ings in ingredient_sets]
+        if not index_sets:
+            return self._encode_index_sets(index_sets)
+        rows = self._encode_batcher.map(index_sets)
+        if any(row is None for row in rows):
+            return None
+        return np.stack(rows)
+
+    def iter_recipe_embeddings(self, batch_size: int = 256):
+        """Yields (start_row, float32 block) for every recipe in catalog order."""
+        snap = self._snapshot
+        catalog = snap.catalog
+        for start in range(0, len(catalog), batch_size):
+            stop = min(start + batch_size, len(catalog))
+            index_sets = [snap.vocab_map[catalog.ingredients_of(i)].tolist() for i in range(start, stop)]
+            block = self._encode_index_sets(index_sets, bucket_size=EMBED_BUCKET_SIZE)
+            if block is None:
+                return
+            yield start, block
+
+    def recipe_embeddings_meta(self, dim: int) -> Dict[str, Any]:
+        catalog = self._snapshot.catalog
+        return {"count": len(catalog), "dim": int(dim), "catalog_fingerprint": catalog.fingerprint(), "encoder_version": self._encoder_version}
+
+    def current_catalog(self) -> RecipeCatalog:
+        return self._snapshot.catalog
+
+    def known_ingredients(self) -> List[str]:
+        return list(self._snapshot.catalog.ingredient_names)
 
     def recommend_more(self, ingredients: List[str], missing: List[str]) -> Dict[str, Any]:
         """
         Uses Association Rules (Apriori-style logic) and Autoencoder (if available)
         to suggest what else to buy.
         """
+        snap = self._snapshot
+        key = ("more", snap.generation, self._canonical_key(ingredients), self._canonical_key(missing))
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._compute_recommend_more(snap, ingredients, missing)
+        self._result_cache.put(key, result)
+        return result
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = self._result_cache.stats()
+        stats["rankings"] = self._ranking_cache.stats()
+        return stats
+
+    def inference_stats(self) -> Dict[str, Any]:
+        return {
+            "set_transformer": self._encode_batcher.stats(),
+            "autoencoder": self._completion_batcher.stats(),
+            "modes": {name: model.mode for name, model in self._inference_models.items()},
+        }
+
+    def inference_models(self, mode: Optional[str] = None) -> Dict[str, InferenceModel]:
+        """
+        The Set Transformer and autoencoder runners, keyed by model name. With
+        ``mode`` they are prepared for that inference mode (as at startup, and
+        shared through the model registry) without changing what this service
+        serves with; without it, the ones in use.
+        """
+        if mode is None:
+            return dict(self._inference_models)
+        return self._compile_models(mode)
+
+    def cascade_stats(self) -> Dict[str, Any]:
+        return self._cascade.stats()
+
+    def _compute_recommend_more(self, snap: CatalogSnapshot, ingredients: List[str], missing: List[str]) -> Dict[str, Any]:
         ing_set = {self._norm(x) for x in ingredients if self._norm(x)}
         missing_norm = [self._norm(x) for x in missing if self._norm(x)]
 
@@ -112,31 +420,12 @@ class RecipeIntelligence:
                 substitutes[m] = subs
                 explanations[m] = "Common substitute suggestions"
 
-        extras = self._frequently_bought_together(ing_set)
-        
-        # Use Autoencoder to "complete" the set if model exists
-        if self._autoencoder:
-            try:
-                # 1. Map ingredients to indices (simplified for demo)
-                # In a real app, this would use a proper vocabulary mapping
-                # For demo, we'll hash the normalized names to [1, vocab_size-1]
-                vocab_size = 2000
-                indices = []
-                for ing in ingredients:
-                    idx = (hash(self._norm(ing)) % (vocab_size - 1)) + 1
-                    indices.append(idx)
-                
-                if indices:
-                    x = torch.tensor([indices], dtype=torch.long)
-                    with torch.no_grad():
-                        logits, _ = self._autoencoder(x)
-                        # Get top predicted ingredient indices
-                        # (simplified output to actual item names would need reverse mapping)
-                        # For demo, if we don't have reverse map, we rely on Association Rules
-                        # but we've successfully called the model.
-                        pass
-            except Exception as e:
-                print(f"DEBUG: Autoencoder inference failed: {e}")
+        # Use Autoencoder to "complete" the set if model exists; its suggestions
+        # follow the association rules and come before the generic fallback.
+        completions: List[str] = []
+        if self._completion is not None:
+            completions = self._completion_batcher.submit((sorted(ing_set), self._completion_top_k)).result()
+        extras = self._frequently_bought_together(snap.rule_index or self._default_rule_index, ing_set, completions)
 
         return {
             "substitutes": substitutes,
@@ -144,12 +433,314 @@ class RecipeIntelligence:
             "explanations": explanations,
         }
 
-    def _score_recipe_heuristic(self, match_count: int, total: int, rating: float, prep_time_mins: int, simplicity_score: float) -> float:
-        match_pct = match_count / max(total, 1)
-        rating_norm = max(0.0, min(1.0, rating / 5.0))
-        prep_norm = 1.0 - max(0.0, min(1.0, prep_time_mins / 90.0))
-        simple_norm = max(0.0, min(1.0, simplicity_score))
-        return float(0.65 * match_pct + 0.2 * rating_norm + 0.1 * prep_norm + 0.05 * simple_norm)
+    def _rank(self, snap: CatalogSnapshot, user_ingredients: List[str], query_ids: np.ndarray, allowed: Optional[np.ndarray] = None) -> RankedCandidates:
+        # 1. Candidate Retrieval
+        # Only recipes sharing at least one ingredient are touched; match counts
+        # are accumulated from the posting lists instead of set intersections.
+        t0 = time.perf_counter()
+        candidate_ids, counts = snap.catalog.match_counts(query_ids)
+        if allowed is not None:
+            # Filters drop candidates before anything is scored.
+            keep = RecipeFilterIndex.mask(allowed, candidate_ids)
+            candidate_ids, counts = candidate_ids[keep], counts[keep]
+        self._cascade.record("retrieval", len(candidate_ids), time.perf_counter() - t0)
+        return self._rerank(snap, user_ingredients, candidate_ids, counts)
+
+    def _rerank(
+        self,
+        snap: CatalogSnapshot,
+        user_ingredients: List[str],
+        candidate_ids: np.ndarray,
+        counts: np.ndarray,
+        heuristic: Optional[np.ndarray] = None,
+    ) -> RankedCandidates:
+        # 2. Heuristic -> Ranker -> Embedding, each on a bounded head of the previous stage
+        scores, depth = self._cascade.run(
+            snap.catalog, self._ranker, candidate_ids, counts,
+            heuristic=heuristic, similarity=self._embedding_similarity(snap, [user_ingredients]),
+        )
+        for a in (candidate_ids, counts, scores, depth):
+            a.setflags(write=False)
+        return RankedCandidates(candidate_ids, counts, scores, depth if depth.any() else None)
+
+    def _embedding_similarity(self, snap: CatalogSnapshot, pantries: List[List[str]]) -> Optional[SimilarityFn]:
+        # Cosine similarity between each pantry's Set Transformer encoding and
+        # the recipe embeddings (or their PQ codes); pantries are only encoded
+        # if some candidate actually reaches the embedding stage.
+        if not self._cascade.uses_embeddings or (snap.embeddings is None and snap.pq_scorer is None):
+            return None
+
+        def similarity(recipe_ids: np.ndarray, rows: np.ndarray) -> Optional[np.ndarray]:
+            query_vecs = self.encode_ingredient_sets(pantries)
+            if query_vecs is None:
+                return None
+            out = np.empty(len(recipe_ids), dtype=np.float64)
+            if snap.pq_scorer is not None:
+                for row in np.unique(rows).tolist():
+                    sel = rows == row
+                    out[sel] = snap.pq_scorer(recipe_ids[sel], query_vecs[row])
+                return out
+            # Sorted reads keep the memory-mapped embedding file access sequential.
+            order = np.argsort(recipe_ids, kind="stable")
+            vectors = np.asarray(snap.embeddings[recipe_ids[order]], dtype=np.float32)
+            out[order] = np.einsum("ij,ij->i", vectors, query_vecs[rows[order]])
+            return out
+
+        return similarity
+
+    def _materialize(self, catalog: RecipeCatalog, hits: Tuple[np.ndarray, np.ndarray, np.ndarray], query_ids: np.ndarray) -> List[Dict[str, Any]]:
+        recipe_ids, match_counts, scores = hits
+        return [self._recipe_result(catalog, recipe_id, match_count, score, query_ids)
+                for recipe_id, match_count, score in zip(recipe_ids.tolist(), match_counts.tolist(), scores.tolist())]
+
+    @staticmethod
+    def _encode_cursor(generation: int, query_key: Tuple[Any, ...], offset: int) -> str:
+        payload = json.dumps({"g": generation, "q": RecipeIntelligence._query_digest(query_key), "o": offset}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, generation: int, query_key: Tuple[Any, ...]) -> int:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+            cursor_generation, digest, offset = int(payload["g"]), str(payload["q"]), int(payload["o"])
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if digest != RecipeIntelligence._query_digest(query_key) or offset < 0:
+            raise ValueError("Cursor does not belong to this query")
+        if cursor_generation != generation:
+            raise ValueError("Cursor expired: the recipe catalog was reloaded; start again without a cursor")
+        return offset
+
+    @staticmethod
+    def _query_digest(query_key: Tuple[Any, ...]) -> str:
+        ingredients, filters_key = query_key
+        return hashlib.sha1(repr((sorted(ingredients), filters_key)).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _recipe_result(catalog: RecipeCatalog, recipe_id: int, match_count: int, score: float, query_ids: np.ndarray) -> Dict[str, Any]:
+        rec_ids = catalog.ingredients_of(recipe_id)
+        return {
+            "name": catalog.name(recipe_id),
+            "match": f"{match_count}/{len(rec_ids)}",
+            "missing": catalog.ingredient_list(np.setdiff1d(rec_ids, query_ids, assume_unique=True)),
+            "score": float(score),
+            "rating": float(catalog.ratings[recipe_id]),
+            "time": int(catalog.prep_times[recipe_id])
+        }
+
+    def _complete_batch(self, requests: List[Tuple[List[str], int]]) -> List[List[str]]:
+        # MicroBatcher callback: one forward pass for every queued (ingredients, k).
+        top = self._complete_ingredient_sets([ings for ings, _ in requests], max(k for _, k in requests))
+        return [names[:k] for names, (_, k) in zip(top, requests)]
+
+    def _encode_batch(self, index_sets: List[List[int]]) -> List[Optional[np.ndarray]]:
+        # MicroBatcher callback: one Set Transformer forward pass for every queued set.
+        block = self._encode_index_sets(index_sets)
+        return [None] * len(index_sets) if block is None else list(block)
+
+    def _complete_ingredient_sets(self, ingredient_sets: List[List[str]], k: int) -> List[List[str]]:
+        # Batched autoencoder completion: the k most likely ingredients missing
+        # from each (normalized) set, most likely first.
+        completion = self._completion
+        out: List[List[str]] = [[] for _ in ingredient_sets]
+        if completion is None or k <= 0:
+            return out
+        vocab, vocab_size = self._ingredient_vocab, len(completion.names)
+        index_sets = [sorted({vocab[n] for n in ings if 0 < vocab.get(n, 0) < vocab_size})[:EMBED_MAX_INGREDIENTS] for ings in ingredient_sets]
+        rows = [row for row, idx in enumerate(index_sets) if idx]
+        if not rows:
+            return out
+
+        x = torch.zeros((len(rows), max(len(index_sets[r]) for r in rows)), dtype=torch.long)
+        for i, row in enumerate(rows):
+            x[i, :len(index_sets[row])] = torch.tensor(index_sets[row], dtype=torch.long)
+        try:
+            with torch.no_grad():
+                logits, _ = completion.model(x, x == 0)
+                # Never suggest padding, unnamed indices or what the user already has.
+                logits = logits.masked_fill(completion.blocked, float("-inf")).scatter(1, x, float("-inf"))
+                values, indices = torch.topk(logits, min(k, vocab_size), dim=1)
+        except Exception as e:
+            print(f"DEBUG: Autoencoder inference failed: {e}")
+            return out
+
+        finite = torch.isfinite(values).tolist()
+        for i, row in enumerate(rows):
+            out[row] = [completion.names[j] for j, ok in zip(indices[i].tolist(), finite[i]) if ok]
+        return out
+
+    def _encode_index_sets(self, index_sets: List[List[int]], bucket_size: int = 0) -> Optional[np.ndarray]:
+        # Batched Set Transformer forward pass; rows are L2-normalized so dot = cosine.
+        # Batches are padded only to their longest set (padding is masked out of
+        # attention); bucket_size > 0 first regroups sets of similar length.
+        model = self._set_transformer
+        if not isinstance(model, SetTransformerWithEmbedding) or self._set_transformer_fn is None:
+            return None
+        vocab_size = model.embedding.num_embeddings
+        index_sets = [[i for i in idx if 0 < i < vocab_size][:EMBED_MAX_INGREDIENTS] for idx in index_sets]
+        if bucket_size > 0 and len(index_sets) > bucket_size:
+            groups = length_buckets([len(idx) for idx in index_sets], bucket_size)
+        else:
+            groups = [list(range(len(index_sets)))]
+        try:
+            with torch.no_grad():
+                blocks = [self._set_transformer_fn(pad_index_sets([index_sets[r] for r in rows])).float() for rows in groups]
+            out = torch.cat(blocks)
+            if len(groups) > 1:
+                out = out[torch.argsort(torch.tensor([r for rows in groups for r in rows]))]
+            out = out / out.norm(dim=-1, keepdim=True).clamp_min(1e-12)
+            return out.numpy().astype(np.float32, copy=False)
+        except Exception as e:
+            print(f"DEBUG: Set Transformer encoding failed: {e}")
+            return None
+
+    def _load_models(self) -> None:
+        # Load Models (Lazy / Optional). Checkpoints are shared process-wide through
+        # the model registry and only re-read when their files change.
+        registry = shared_registry()
+        self._ranker = registry.get_file("lightgbm_ranker", self._models_dir / "lgbm_ranker.txt", self._try_load_ranker)
+        self._set_transformer = registry.get_file("set_transformer", self._models_dir / "set_transformer.pth", self._try_load_set_transformer)
+        # Identifies the encoder weights that precomputed recipe embeddings must match.
+        self._encoder_version = state_dict_digest(self._set_transformer) if isinstance(self._set_transformer, SetTransformerWithEmbedding) else None
+        self._autoencoder = registry.get_file("autoencoder", self._models_dir / "autoencoder.pth", self._try_load_autoencoder)
+        self._ingredient_vocab = self._load_ingredient_vocab()
+        self._inference_models = self._compile_models()
+        set_transformer = self._inference_models.get("set_transformer")
+        autoencoder = self._inference_models.get("autoencoder")
+        self._set_transformer_fn = set_transformer.runner if set_transformer is not None else None
+        self._completion = self._build_completion_model(self._autoencoder, self._ingredient_vocab, autoencoder.runner if autoencoder is not None else None)
+        self._completion_top_k = int(os.environ.get("SMARTPANTRY_COMPLETION_TOP_K", "5"))
+
+    def _compile_models(self, mode: Optional[str] = None) -> Dict[str, InferenceModel]:
+        # Opt-in SMARTPANTRY_INFERENCE_MODE=int8|torchscript|int8-torchscript; the
+        # eager modules stay loaded for their metadata. TorchScript artifacts are
+        # cached in checkpoints/compiled.
+        mode = mode or inference_mode_from_env()
+        cache_dir = self._models_dir / "compiled"
+        gen = torch.Generator().manual_seed(0)
+        models: Dict[str, InferenceModel] = {}
+        registry = shared_registry()
+
+        def shared(name: str, model_mode: str, vocab_size: int, compile_fn: Any) -> InferenceModel:
+            if model_mode == "eager":
+                runner, applied = compile_fn()
+            else:
+                path = self._models_dir / f"{name}.pth"
+                runner, applied = registry.get(f"{name}:{model_mode}:{path}", compile_fn, version=file_version(path))
+            return InferenceModel(runner=runner, mode=applied, vocab_size=vocab_size)
+
+        if isinstance(self._set_transformer, SetTransformerWithEmbedding):
+            vocab_size = self._set_transformer.embedding.num_embeddings
+            example = torch.randint(1, vocab_size, (2, EMBED_MAX_INGREDIENTS), generator=gen)
+            check = torch.randint(1, vocab_size, (3, EMBED_MAX_INGREDIENTS), generator=gen)
+            check[0, 4:] = 0
+            models["set_transformer"] = shared("set_transformer", mode, vocab_size, lambda: compile_for_inference(
+                self._set_transformer, "set_transformer", mode, (example,), (check,),
+                cache_dir=cache_dir,
+            ))
+
+        if self._autoencoder is not None:
+            # TorchScript cannot script nn.TransformerEncoder's fast path, so the
+            # autoencoder is traced. It stays fp32 in the int8 modes: its encoder
+            # layers reject quantized Linears, and quantizing only the output
+            # projections measured slower than fp32 (0.77x at batch 32).
+            ae_mode = AUTOENCODER_INFERENCE_MODES.get(mode, mode)
+            vocab_size = self._autoencoder.embedding.num_embeddings
+            example = torch.randint(1, vocab_size, (2, 6), generator=gen)
+            example[1, 3:] = 0
+            check = torch.randint(1, vocab_size, (3, 9), generator=gen)
+            check[0, 2:] = 0
+            models["autoencoder"] = shared("autoencoder", ae_mode, vocab_size, lambda: compile_for_inference(
+                self._autoencoder, "autoencoder", ae_mode, (example, example == 0), (check, check == 0),
+                cache_dir=cache_dir, trace=True,
+            ))
+        return models
+
+    def _build_snapshot(self, generation: int) -> CatalogSnapshot:
+        # Read mtimes first so a file written during the build triggers another reload.
+        mtimes = self._source_mtimes()
+        catalog = self._load_recipes()
+        # On reload, derived structures are built here, off the request path; at
+        # startup they stay lazy so a memory-mapped catalog opens in milliseconds.
+        filter_index = RecipeFilterIndex(catalog)
+        if generation > 1:
+            catalog.recipe_matrix()
+            filter_index.build()
+        embeddings = self._try_load_recipe_embeddings(catalog)
+        pq_scorer = self._try_load_pq_scorer(catalog, embeddings)
+        return CatalogSnapshot(
+            generation=generation,
+            catalog=catalog,
+            vocab_map=self._build_vocab_map(catalog),
+            embeddings=embeddings,
+            pq_scorer=pq_scorer,
+            ann_index=self._try_load_ann_index(catalog, embeddings, pq_scorer),
+            shards=self._try_start_shards(catalog),
+            filter_index=filter_index,
+            rule_index=self._try_load_rule_index(),
+            source_mtimes=mtimes,
+            loaded_at=time.time(),
+        )
+
+    def _swap_snapshot(self) -> CatalogSnapshot:
+        old = self._snapshot
+        snap = self._build_snapshot(generation=old.generation + 1)
+        self._snapshot = snap
+        self._result_cache.invalidate()
+        self._ranking_cache.invalidate()
+        if old.shards is not None:
+            # Requests still holding the old snapshot fall back to in-process scoring.
+            old.shards.close()
+        print(f"DEBUG: Recipe catalog generation {snap.generation} live ({len(snap.catalog)} recipes)")
+        return snap
+
+    def _catalog_sources(self) -> List[Path]:
+        return [
+            self._catalog_dir / "manifest.json",
+            self._recipes_path,
+            self._models_dir / "recipe_embeddings.npy",
+            self._models_dir / "recipe_embeddings.json",
+            self._models_dir / "recipe_embeddings_pq.npz",
+            self._models_dir / "recipe_ann_ivf.npz",
+            self._rules_dir / "manifest.json",
+        ]
+
+    def _source_mtimes(self) -> Tuple[float, ...]:
+        out = []
+        for path in self._catalog_sources():
+            try:
+                out.append(path.stat().st_mtime)
+            except OSError:
+                out.append(0.0)
+        return tuple(out)
+
+    def _watch_catalog(self, poll_secs: float) -> None:
+        while not self._watcher_stop.wait(poll_secs):
+            try:
+                if self._source_mtimes() != self._snapshot.source_mtimes:
+                    self.reload_catalog()
+            except Exception as e:
+                print(f"DEBUG: Catalog reload failed: {e}")
+
+    def _try_start_shards(self, catalog: RecipeCatalog) -> Optional[ShardPool]:
+        # Opt-in multi-process scoring: SMARTPANTRY_SCORING_SHARDS worker processes.
+        n_shards = int(os.environ.get("SMARTPANTRY_SCORING_SHARDS", "0"))
+        if n_shards <= 1 or len(catalog) < n_shards:
+            return None
+        try:
+            timeout = float(os.environ.get("SMARTPANTRY_SHARD_TIMEOUT_SECS", "30"))
+            return ShardPool(catalog, n_shards, timeout=timeout)
+        except Exception as e:
+            print(f"DEBUG: Scoring shards failed to start: {e}")
+            return None
+
+    def _try_load_rule_index(self) -> Optional[RuleIndex]:
+        table = load_rule_table(self._rules_dir)
+        if table is None:
+            return None
+        print(f"DEBUG: Loaded {len(table)} association rules from {self._rules_dir}")
+        return RuleIndex(table)
 
     def _try_load_ranker(self) -> Optional[Any]:
         model_path = self._models_dir / "lgbm_ranker.txt"
@@ -170,41 +761,113 @@ class RecipeIntelligence:
             return None
         try:
             import warnings
-            import torch.nn as nn
-            
-            # Use the same architecture as training (SetTransformerWithEmbedding)
-            class SetTransformerWithEmbedding(nn.Module):
-                def __init__(self, vocab_size, embed_dim, hidden_dim, output_dim, num_heads, num_inds):
-                    super().__init__()
-                    self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
-                    self.set_transformer = SetTransformer(
-                        dim_input=embed_dim, num_outputs=1, dim_output=output_dim,
-                        num_inds=num_inds, dim_hidden=hidden_dim, num_heads=num_heads, ln=True
-                    )
-                def forward(self, x):
-                    return self.set_transformer(self.embedding(x))
-            
-            # Try loading as SetTransformerWithEmbedding (trained model)
-            model = SetTransformerWithEmbedding(
-                vocab_size=5000, embed_dim=100, hidden_dim=128,
-                output_dim=128, num_heads=4, num_inds=32
-            )
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore", FutureWarning)
-                model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=False), strict=False)
+                state = torch.load(model_path, map_location='cpu', weights_only=False)
+        except Exception as e:
+            print(f"DEBUG: Set Transformer load failed: {e}")
+            return None
+        # Strict loads: a checkpoint that does not cover every parameter would
+        # leave freshly initialized (random) weights behind, and encodings that
+        # change from process to process.
+        if "embedding.weight" not in state:
+            # Older train_sample_models.py runs saved only the inner SetTransformer,
+            # without the ingredient embedding it was trained with.
+            print(
+                f"DEBUG: Set Transformer checkpoint at {model_path} has no ingredient embedding, so it cannot "
+                "encode recipes; semantic retrieval falls back to ingredient overlap. Retrain with "
+                "scripts/train_sample_models.py or scripts/train_set_transformer.py to enable it."
+            )
+            return None
+        try:
+            # Sizes come from the checkpoint (5000 x 100 in train_set_transformer.py,
+            # 2000 x 128 in train_sample_models.py); both use 4 heads.
+            vocab_size, embed_dim = state["embedding.weight"].shape
+            _, num_inds, hidden_dim = state["set_transformer.enc.0.I"].shape
+            model = SetTransformerWithEmbedding(
+                vocab_size=int(vocab_size), embed_dim=int(embed_dim), hidden_dim=int(hidden_dim),
+                output_dim=int(state["set_transformer.dec.1.weight"].shape[0]), num_heads=4, num_inds=int(num_inds)
+            )
+            model.load_state_dict(state)
             model.eval()
             return model
+        except Exception as e:
+            print(f"DEBUG: Set Transformer checkpoint at {model_path} does not match SetTransformerWithEmbedding, ignoring: {e}")
+            return None
+
+    def _load_ingredient_vocab(self) -> Dict[str, int]:
+        vocab_path = self._models_dir / "ingredient_vocab.json"
+        try:
+            with open(vocab_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            return {self._norm(k): int(v) for k, v in raw.items() if self._norm(k)}
         except Exception:
-            # Fallback to plain SetTransformer for demo weights
-            try:
-                model = SetTransformer(dim_input=100)
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore", FutureWarning)
-                    model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=False), strict=False)
-                model.eval()
-                return model
-            except:
+            return {}
+
+    def _build_vocab_map(self, catalog: RecipeCatalog) -> np.ndarray:
+        # Catalog ingredient ID -> model vocabulary index (0 = unknown / padding).
+        vocab = self._ingredient_vocab
+        return np.array([vocab.get(n, 0) for n in catalog.ingredient_names], dtype=np.int64)
+
+    def _try_load_recipe_embeddings(self, catalog: RecipeCatalog) -> Optional[np.ndarray]:
+        emb_path = self._models_dir / "recipe_embeddings.npy"
+        meta_path = self._models_dir / "recipe_embeddings.json"
+        if not emb_path.exists() or not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            embeddings = np.load(emb_path, mmap_mode="r")
+            if meta.get("catalog_fingerprint") != catalog.fingerprint() or embeddings.shape[0] != len(catalog):
+                print(f"DEBUG: Recipe embeddings at {emb_path} are stale for the loaded catalog, ignoring")
+                return None
+            if self._encoder_version is None or meta.get("encoder_version") != self._encoder_version:
+                print(f"DEBUG: Recipe embeddings at {emb_path} were not built with the loaded Set Transformer, ignoring")
                 return None
+            return embeddings
+        except Exception as e:
+            print(f"DEBUG: Recipe embeddings load failed: {e}")
+            return None
+
+    def _try_load_pq_scorer(self, catalog: RecipeCatalog, embeddings: Optional[np.ndarray]) -> Optional[PQScorer]:
+        # Opt-in: SMARTPANTRY_EMBEDDING_CODEC=pq scores from PQ codes instead of float32
+        # rows; SMARTPANTRY_PQ_RERANK=N re-ranks the best N exactly from the mmap.
+        if os.environ.get("SMARTPANTRY_EMBEDDING_CODEC", "").strip().lower() != "pq":
+            return None
+        codes_path = self._models_dir / "recipe_embeddings_pq.npz"
+        if not codes_path.exists():
+            return None
+        try:
+            pq, codes, meta = ProductQuantizer.load(codes_path)
+            if meta.get("catalog_fingerprint") != catalog.fingerprint() or len(codes) != len(catalog):
+                print(f"DEBUG: PQ codes at {codes_path} are stale for the loaded catalog, ignoring")
+                return None
+            if meta.get("encoder_version") != self._encoder_version:
+                print(f"DEBUG: PQ codes at {codes_path} were not built with the loaded Set Transformer, ignoring")
+                return None
+            rerank = int(os.environ.get("SMARTPANTRY_PQ_RERANK", "0"))
+            return PQScorer(pq, codes, vectors=embeddings, rerank=rerank)
+        except Exception as e:
+            print(f"DEBUG: PQ codes load failed: {e}")
+            return None
+
+    def _try_load_ann_index(self, catalog: RecipeCatalog, embeddings: Optional[np.ndarray], pq_scorer: Optional[PQScorer]) -> Optional[IVFIndex]:
+        index_path = self._models_dir / "recipe_ann_ivf.npz"
+        if (embeddings is None and pq_scorer is None) or not index_path.exists():
+            return None
+        try:
+            nprobe = int(os.environ.get("SMARTPANTRY_ANN_NPROBE", "8"))
+            index, meta = IVFIndex.load(index_path, embeddings, nprobe=nprobe)
+            if meta.get("catalog_fingerprint") != catalog.fingerprint():
+                print(f"DEBUG: ANN index at {index_path} is stale for the loaded catalog, ignoring")
+                return None
+            if meta.get("encoder_version") != self._encoder_version:
+                print(f"DEBUG: ANN index at {index_path} was not built with the loaded Set Transformer, ignoring")
+                return None
+            return index
+        except Exception as e:
+            print(f"DEBUG: ANN index load failed: {e}")
+            return None
 
     def _try_load_autoencoder(self) -> Optional[Any]:
         model_path = self._models_dir / "autoencoder.pth"
@@ -212,11 +875,13 @@ class RecipeIntelligence:
             return None
         try:
             import warnings
-            # Vocab size 2000 as in init_demo_models.py
-            model = RecipeAutoencoder(vocab_size=2000, embed_dim=128, num_heads=4, hidden_dim=256)
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore", FutureWarning)
-                model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=False))
+                state = torch.load(model_path, map_location='cpu', weights_only=False)
+            # Vocab size comes from the checkpoint (2000 in init_demo_models.py)
+            vocab_size = int(state["embedding.weight"].shape[0])
+            model = RecipeAutoencoder(vocab_size=vocab_size, embed_dim=128, num_heads=4, hidden_dim=256)
+            model.load_state_dict(state)
             model.eval()
             print(f"DEBUG: Autoencoder loaded from {model_path}")
             return model
@@ -224,18 +889,28 @@ class RecipeIntelligence:
             print(f"DEBUG: Autoencoder load failed: {e}")
             return None
 
-    # ... (Existing Helper Methods below: _frequently_bought_together, _simplicity_score, _norm, _substitute_map, _load_recipes) ...
-    
     @staticmethod
-    def _simplicity_score(recipe: Recipe) -> float:
-        steps = recipe.steps or []
-        n = len(steps)
-        if n <= 0: return 0.6
-        return float(1.0 / (1.0 + math.log(1.0 + n)))
+    def _build_completion_model(model: Optional[Any], vocab: Dict[str, int], runner: Optional[Any] = None) -> Optional[CompletionModel]:
+        # Reverse vocabulary lookup and blocked-index mask for the autoencoder's output layer.
+        if model is None or not vocab:
+            return None
+        vocab_size = model.embedding.num_embeddings
+        names = [""] * vocab_size
+        for name, idx in vocab.items():
+            if 0 < idx < vocab_size:
+                names[idx] = name
+        blocked = torch.tensor([not n for n in names], dtype=torch.bool)
+        return CompletionModel(model=runner if runner is not None else model, names=tuple(names), blocked=blocked)
+
+    # ... (Existing Helper Methods below: _frequently_bought_together, _norm, _substitute_map, _load_recipes) ...
+    
+    @classmethod
+    def _canonical_key(cls, items: List[str]) -> frozenset:
+        return frozenset(n for n in (cls._norm(x) for x in items or []) if n)
 
     @staticmethod
     def _norm(x: str) -> str:
-        return " ".join((x or "").strip().lower().split())
+        return norm_ingredient(x)
 
     @staticmethod
     def _substitute_map() -> Dict[str, List[str]]:
@@ -251,66 +926,22 @@ class RecipeIntelligence:
         }
 
     @staticmethod
-    def _frequently_bought_together(ingredients: set) -> List[str]:
-        # Expanded rules for the 400-item dataset
-        rules = {
-            "milk": ["eggs", "bread", "butter", "cereal"],
-            "pasta": ["tomato sauce", "cheese", "garlic", "ground beef", "olive oil"],
-            "chicken breast": ["rice", "onions", "bell peppers", "broccoli", "soy sauce"],
-            "salt": ["pepper", "olive oil", "garlic powder"],
-            "bread": ["butter", "jam", "cheese", "ham", "avocado"],
-            "avocado": ["lemon", "bread", "eggs", "tomatoes", "onions"],
-            "coffee": ["milk", "sugar", "creamer", "biscuits"],
-            "flour": ["sugar", "eggs", "butter", "baking powder", "milk"],
-            "potato": ["onions", "carrots", "cooking oil", "salt"],
-            "yogurt": ["honey", "granola", "berries", "banana"],
-            "lettuce": ["tomatoes", "cucumber", "onions", "olive oil", "vinegar"],
-            "salmon": ["lemon", "asparagus", "olive oil", "garlic"],
-        }
-        out: List[str] = []
-        for i in ingredients:
-            normalized_i = i.lower()
-            # Try exact match or partial match
-            for key, results in rules.items():
-                if key in normalized_i or normalized_i in key:
-                    for x in results:
-                        if x not in out and x not in ingredients:
-                            out.append(x)
+    def _frequently_bought_together(rule_index: RuleIndex, ingredients: set, completions: List[str] = ()) -> List[str]:
+        # Rule hits merged by score, then model completions, then popular padding.
+        out = [name for name, _ in rule_index.suggest(ingredients)]
+        seen = set(out) | set(ingredients)
+        for x in completions:
+            if x not in seen:
+                out.append(x)
+                seen.add(x)
         
         # Add some general popular items if list is short
         if len(out) < 3:
-            popular = ["milk", "eggs", "bread", "bananas", "apples"]
-            for p in popular:
-                if p not in out and p not in ingredients:
+            for p in POPULAR_ITEMS:
+                if p not in seen:
                     out.append(p)
+                    seen.add(p)
         return out
 
-    def _load_recipes(self) -> List[Recipe]:
-        # Tries to load existing json, fallback to mock data
-        if self._recipes_path.exists():
-            try:
-                with open(self._recipes_path, "r", encoding="utf-8") as f:
-                    raw = json.load(f)
-                recipes: List[Recipe] = []
-                if isinstance(raw, list):
-                    for r in raw:
-                        if not isinstance(r, dict): continue
-                        name = str(r.get("name") or "").strip()
-                        ings = r.get("ingredients")
-                        if not name or not isinstance(ings, list): continue
-                        recipes.append(Recipe(
-                            name=name,
-                            ingredients=[str(x) for x in ings],
-                            rating=float(r.get("rating", 4.0)),
-                            prep_time_mins=int(r.get("prep_time_mins", 20)),
-                            steps=r.get("steps") if isinstance(r.get("steps"), list) else None
-                        ))
-                if recipes: return recipes
-            except: pass
-            
-        return [
-            Recipe(name="Classic Pancakes", ingredients=["milk", "eggs", "flour", "sugar", "butter"], rating=4.6, prep_time_mins=15),
-            Recipe(name="Scrambled Eggs", ingredients=["eggs", "butter", "salt", "pepper"], rating=4.4, prep_time_mins=8),
-            Recipe(name="Tomato Pasta", ingredients=["pasta", "tomato sauce", "garlic", "olive oil", "salt"], rating=4.5, prep_time_mins=25),
-            Recipe(name="Chicken Rice Bowl", ingredients=["chicken breast", "rice", "soy sauce", "garlic", "onions"], rating=4.3, prep_time_mins=30),
-        ]
+    def _load_recipes(self) -> RecipeCatalog:
+        return load_catalog(self._catalog_dir, self._recipes_path)
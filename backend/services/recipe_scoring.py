@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from services.recipe_catalog import RecipeCatalog
+
+# (recipe IDs, row of each ID) -> similarity per ID, or None when unavailable.
+SimilarityFn = Callable[[np.ndarray, np.ndarray], Optional[np.ndarray]]
+
+
+def score_recipe_heuristic(match_pct: np.ndarray, rating: np.ndarray, prep_time_mins: np.ndarray, simplicity_score: np.ndarray) -> np.ndarray:
+    rating_norm = np.clip(rating / 5.0, 0.0, 1.0)
+    prep_norm = 1.0 - np.clip(prep_time_mins / 90.0, 0.0, 1.0)
+    simple_norm = np.clip(simplicity_score, 0.0, 1.0)
+    return 0.65 * match_pct + 0.2 * rating_norm + 0.1 * prep_norm + 0.05 * simple_norm
+
+
+def candidate_features(catalog: RecipeCatalog, candidate_ids: np.ndarray, match_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # (match_pct, prep, rating, simplicity); only match_pct depends on the query.
+    totals = np.maximum(catalog.sizes[candidate_ids], 1).astype(np.float64)
+    match_pct = match_counts / totals
+    prep = catalog.prep_times[candidate_ids].astype(np.float64)
+    return match_pct, prep, catalog.ratings[candidate_ids], catalog.simplicity[candidate_ids]
+
+
+def heuristic_scores(catalog: RecipeCatalog, candidate_ids: np.ndarray, match_counts: np.ndarray) -> np.ndarray:
+    match_pct, prep, rating, simplicity = candidate_features(catalog, candidate_ids, match_counts)
+    return score_recipe_heuristic(match_pct, rating, prep, simplicity)
+
+
+def ranker_scores(catalog: RecipeCatalog, ranker: Any, candidate_ids: np.ndarray, match_counts: np.ndarray) -> Optional[np.ndarray]:
+    # ML Score (LightGBM) - uses the heuristic features, one Booster call per batch
+    feats = np.column_stack(candidate_features(catalog, candidate_ids, match_counts))
+    try:
+        return np.asarray(ranker.predict(feats), dtype=np.float64)
+    except Exception:
+        return None
+
+
+def top_n_mask(recipe_ids: np.ndarray, scores: np.ndarray, n: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    # The best n entries of every row (one row when rows is None); equal scores
+    # keep ascending recipe-ID order, as in rank_top_k.
+    mask = np.zeros(len(recipe_ids), dtype=bool)
+    if n <= 0 or len(recipe_ids) == 0:
+        return mask
+    if rows is not None:
+        order = np.lexsort((recipe_ids, -scores, rows))
+        sorted_rows = rows[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows, side="left")
+        mask[order[rank < n]] = True
+        return mask
+    if n >= len(recipe_ids):
+        mask[:] = True
+        return mask
+    kth = -np.partition(-scores, n - 1)[n - 1]
+    mask[scores > kth] = True
+    ties = np.flatnonzero(scores == kth)
+    mask[ties[np.argsort(recipe_ids[ties], kind="stable")][:n - int(mask.sum())]] = True
+    return mask
+
+
+def rank_top_k(recipe_ids: np.ndarray, match_counts: np.ndarray, scores: np.ndarray, k: int, depth: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Best k by score; equal scores keep ascending recipe-ID order. With a
+    # cascade depth, rows that reached a later stage come first.
+    if depth is not None and len(depth) and depth.min() != depth.max():
+        parts = []
+        for d in np.unique(depth)[::-1]:
+            sel = depth == d
+            part = rank_top_k(recipe_ids[sel], match_counts[sel], scores[sel], k)
+            parts.append(part)
+            k -= len(part[0])
+            if k <= 0:
+                break
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+    k = min(max(k, 0), len(recipe_ids))
+    if k < len(recipe_ids):
+        # Everything scoring at least the k-th best survives, so ties at the
+        # cut-off are still resolved by recipe ID below.
+        kth = -np.partition(-scores, k - 1)[k - 1] if k > 0 else np.inf
+        keep = scores >= kth
+        recipe_ids, match_counts, scores = recipe_ids[keep], match_counts[keep], scores[keep]
+    order = np.lexsort((recipe_ids, -scores))[:k]
+    return recipe_ids[order], match_counts[order], scores[order]
+
+
+class RecipeCascade:
+    """
+    Retrieve-then-rerank scoring with a row budget per stage.
+
+    Every retrieved candidate gets the heuristic score; only the best
+    ``ranker_n`` of each query go on to the LightGBM ranker, and only the best
+    ``embedding_n`` of those get an embedding-similarity bonus (weighted by
+    ``embedding_weight``, 0 disables the stage). The expensive stages therefore
+    see a bounded number of rows however large the catalog is. A row keeps the
+    score of the last stage it reached, and ``depth`` counts the stages after
+    the heuristic that it reached; deeper rows rank first.
+    """
+
+    STAGES = ("retrieval", "heuristic", "ranker", "embedding")
+
+    def __init__(self, ranker_n: int = 1000, embedding_n: int = 100, embedding_weight: float = 0.0) -> None:
+        self.ranker_n = max(int(ranker_n), 0)
+        self.embedding_n = max(int(embedding_n), 0)
+        self.embedding_weight = float(embedding_weight)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            s: {"calls": 0, "rows": 0, "max_rows": 0, "total_ms": 0.0} for s in self.STAGES
+        }
+
+    @classmethod
+    def from_env(cls) -> "RecipeCascade":
+        return cls(
+            ranker_n=int(os.environ.get("SMARTPANTRY_CASCADE_RANKER_N", "1000")),
+            embedding_n=int(os.environ.get("SMARTPANTRY_CASCADE_EMBEDDING_N", "100")),
+            embedding_weight=float(os.environ.get("SMARTPANTRY_CASCADE_EMBEDDING_WEIGHT", "0")),
+        )
+
+    @property
+    def uses_embeddings(self) -> bool:
+        return self.embedding_n > 0 and self.embedding_weight != 0.0
+
+    def pool_size(self, k: int, ranker: Optional[Any]) -> int:
+        # Heuristic-ranked rows a query needs so that its top k is exact.
+        if ranker is not None and self.ranker_n > 0:
+            return max(k, self.ranker_n)
+        if self.uses_embeddings:
+            return max(k, self.embedding_n)
+        return k
+
+    def run(
+        self,
+        catalog: RecipeCatalog,
+        ranker: Optional[Any],
+        recipe_ids: np.ndarray,
+        match_counts: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+        heuristic: Optional[np.ndarray] = None,
+        similarity: Optional[SimilarityFn] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Final (scores, depth) for retrieved candidates, grouped by ``rows`` when batched."""
+        if heuristic is None:
+            t0 = time.perf_counter()
+            heuristic = heuristic_scores(catalog, recipe_ids, match_counts)
+            self.record("heuristic", len(recipe_ids), time.perf_counter() - t0)
+        scores = heuristic
+        depth = np.zeros(len(recipe_ids), dtype=np.int8)
+        if len(recipe_ids) == 0:
+            return scores, depth
+
+        if ranker is not None and self.ranker_n > 0:
+            t0 = time.perf_counter()
+            head = np.flatnonzero(top_n_mask(recipe_ids, scores, self.ranker_n, rows))
+            predicted = ranker_scores(catalog, ranker, recipe_ids[head], match_counts[head])
+            if predicted is not None:
+                scores = scores.copy()
+                scores[head] = predicted
+                depth[head] += 1
+            self.record("ranker", len(head), time.perf_counter() - t0)
+
+        if similarity is not None and self.uses_embeddings:
+            t0 = time.perf_counter()
+            pool = np.flatnonzero(depth == depth.max())
+            head = pool[top_n_mask(recipe_ids[pool], scores[pool], self.embedding_n, rows[pool] if rows is not None else None)]
+            head_rows = rows[head] if rows is not None else np.zeros(len(head), dtype=np.int64)
+            sim = similarity(recipe_ids[head], head_rows)
+            if sim is not None:
+                scores = scores.copy()
+                scores[head] += self.embedding_weight * sim
+                depth[head] += 1
+            self.record("embedding", len(head), time.perf_counter() - t0)
+        return scores, depth
+
+    def record(self, stage: str, rows: int, seconds: float) -> None:
+        with self._lock:
+            s = self._stats[stage]
+            s["calls"] += 1
+            s["rows"] += int(rows)
+            s["max_rows"] = max(s["max_rows"], int(rows))
+            s["total_ms"] += 1000.0 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {**s, "mean_ms": s["total_ms"] / s["calls"] if s["calls"] else 0.0}
+                for name, s in self._stats.items()
+            }
+        return {
+            "ranker_n": self.ranker_n,
+            "embedding_n": self.embedding_n,
+            "embedding_weight": self.embedding_weight,
+            "stages": stages,
+        }
+
+
+class RankedCandidates:
+    """
+    Every scored candidate for one query, kept as parallel ID / match-count /
+    score arrays so result pages can be cut without re-scoring. The full sort
+    is deferred until a page past the first is requested.
+    """
+
+    def __init__(self, recipe_ids: np.ndarray, match_counts: np.ndarray, scores: np.ndarray, depth: Optional[np.ndarray] = None) -> None:
+        self.recipe_ids = recipe_ids
+        self.match_counts = match_counts
+        self.scores = scores
+        self.depth = depth
+        self._order: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def page(self, offset: int, limit: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if offset <= 0 and self._order is None:
+            return rank_top_k(self.recipe_ids, self.match_counts, self.scores, limit, self.depth)
+        with self._lock:
+            if self._order is None:
+                keys = (self.recipe_ids, -self.scores) if self.depth is None else (self.recipe_ids, -self.scores, -self.depth)
+                self._order = np.lexsort(keys)
+        sel = self._order[max(offset, 0):max(offset, 0) + max(limit, 0)]
+        return self.recipe_ids[sel], self.match_counts[sel], self.scores[sel]
@@ -15,16 +15,20 @@ For production, implement with actual ML models and database queries.
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+from services.association_rules import load_rule_table
+
 class RecommendationEngine:
     """
     Core recommendation engine for SmartCart AI
     """
     
-    def __init__(self):
+    def __init__(self, rule_table=None):
         # In production, load from database
         self.user_patterns = {}
         self.item_associations = {}
         self.global_frequencies = {}
+        # Mined association rules (scripts/mine_association_rules.py), memory-mapped
+        self.rule_table = rule_table if rule_table is not None else load_rule_table()
     
     def get_personalized_recommendations(self, user_id, current_items, limit=5):
         """
@@ -70,6 +74,9 @@ class RecommendationEngine:
         
         Example: If user has milk, suggest bread (often bought together)
         """
+        if self.rule_table is not None:
+            return self._get_mined_association_recommendations(current_items)
+
         recommendations = []
         
         # Placeholder association rules
@@ -94,6 +101,32 @@ class RecommendationEngine:
         
         return recommendations
     
+    def _get_mined_association_recommendations(self, current_items):
+        """
+        Recommend items from the mined rule table: every rule whose whole
+        antecedent is in the basket, scored by its confidence
+        """
+        table = self.rule_table
+        basket = {' '.join(item.lower().split()) for item in current_items}
+        item_ids = sorted(i for i in (table.item_id(name) for name in basket) if i is not None)
+        
+        recommendations = []
+        for rule in table.fire(item_ids):
+            assoc_item = table.items[int(table.consequents[rule])]
+            if assoc_item in basket:
+                continue
+            related = [table.items[int(i)] for i in table.antecedent(rule)]
+            recommendations.append({
+                'item_name': assoc_item.title(),
+                'category': 'other',  # Would be predicted by ML
+                'confidence': round(float(table.confidence[rule]), 4),
+                'lift': round(float(table.lift[rule]), 4),
+                'reason': f"Often bought with {', '.join(related)}",
+                'related_items': related
+            })
+        
+        return recommendations
+    
     def _get_frequency_recommendations(self, user_id):
         """
         Recommend items user frequently purchases
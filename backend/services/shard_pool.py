@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import multiprocessing as mp
+import signal
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from services.recipe_catalog import RecipeCatalog
+from services.recipe_scoring import heuristic_scores, rank_top_k
+
+# (recipe IDs, match counts, scores), best first.
+ShardHits = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class ShardPool:
+    """
+    Runs the retrieval and heuristic stages of the scoring cascade against a
+    catalog partitioned across worker processes.
+
+    Each worker owns one contiguous recipe-ID range and answers with its local
+    heuristic top-k; the parent merges them with a heap and runs the bounded
+    ranker / embedding stages itself. Equal scores resolve by recipe ID, as in
+    single-process scoring, so results are identical. A worker that dies or
+    stops answering is respawned; if the retry also fails the query returns
+    None and the caller scores in-process instead.
+
+    Each shard has its own lock, held from sending a query to reading its
+    reply, and a query takes them in shard order; concurrent queries are thus
+    pipelined through the shards rather than serialized on the whole pool.
+    Requests carry a sequence number and a reply for any other request (one
+    left behind by a timed-out or abandoned query) is discarded.
+    """
+
+    def __init__(self, catalog: RecipeCatalog, n_shards: int, timeout: float = 30.0) -> None:
+        self.catalog = catalog
+        self.timeout = timeout
+        self.restarts = 0
+        bounds = np.linspace(0, len(catalog), max(n_shards, 1) + 1).astype(np.int64)
+        self._ranges = [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+        # Worker processes are started with "spawn" so they never inherit the
+        # parent's threads or torch state.
+        self._ctx = mp.get_context("spawn")
+        self._locks = [threading.Lock() for _ in self._ranges]
+        self._seq = itertools.count(1)
+        self._closed = False
+        self._workers: List[Optional[Tuple[Any, Any]]] = [None] * len(self._ranges)
+        for i in range(len(self._ranges)):
+            self._spawn(i)
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    def top_k(self, query_ids: np.ndarray, k: int) -> Optional[ShardHits]:
+        if self._closed:
+            return None
+        seq = next(self._seq)
+        msg = (seq, np.asarray(query_ids, dtype=np.int32), int(k))
+        # Scatter to every shard before gathering, so they score in parallel.
+        # Shard locks are taken in order (no deadlock) and each is released
+        # as soon as that shard has answered.
+        sent = []
+        for i, lock in enumerate(self._locks):
+            lock.acquire()
+            sent.append(not self._closed and self._send(i, msg))
+        parts: List[ShardHits] = []
+        failed = False
+        for i, ok in enumerate(sent):
+            try:
+                if failed:
+                    # Read (and drop) what was already asked of the rest.
+                    if ok:
+                        self._recv(i, seq)
+                    continue
+                hits = self._recv(i, seq) if ok else None
+                if hits is None and not self._closed:
+                    # Respawn the shard and retry once before giving up on the pool.
+                    self._respawn(i)
+                    hits = self._recv(i, seq) if self._send(i, msg) else None
+                if hits is None:
+                    failed = True
+                    continue
+                parts.append(hits)
+            finally:
+                self._locks[i].release()
+        return None if failed else _merge(parts, k)
+
+    def stats(self) -> dict:
+        return {"shards": len(self._ranges), "restarts": self.restarts, "closed": self._closed}
+
+    def close(self) -> None:
+        # Waits for an in-flight query; later queries get None.
+        self._closed = True
+        for i, lock in enumerate(self._locks):
+            with lock:
+                self._stop(i)
+
+    def _spawn(self, i: int) -> None:
+        lo, hi = self._ranges[i]
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_shard_main,
+            args=(child_conn, self.catalog.slice(lo, hi), lo),
+            name=f"recipe-shard-{i}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self._workers[i] = (process, parent_conn)
+
+    def _respawn(self, i: int) -> None:
+        print(f"DEBUG: Restarting recipe shard {i}")
+        self._stop(i)
+        self._spawn(i)
+        self.restarts += 1
+
+    def _stop(self, i: int) -> None:
+        worker = self._workers[i]
+        if worker is None:
+            return
+        process, conn = worker
+        try:
+            conn.send(None)
+        except Exception:
+            pass
+        process.join(timeout=1.0)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn.close()
+        self._workers[i] = None
+
+    def _send(self, i: int, msg: Any) -> bool:
+        try:
+            self._workers[i][1].send(msg)
+            return True
+        except Exception:
+            return False
+
+    def _recv(self, i: int, seq: int) -> Optional[ShardHits]:
+        worker = self._workers[i]
+        if worker is None:
+            return None
+        conn = worker[1]
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if not conn.poll(max(deadline - time.monotonic(), 0.0)):
+                    return None
+                reply = conn.recv()
+            except Exception:
+                return None
+            if not isinstance(reply, tuple) or not reply or reply[0] != seq:
+                # A reply to an earlier, abandoned request.
+                continue
+            return reply[1:] if len(reply) == 4 else None
+
+
+def _merge(parts: List[ShardHits], k: int) -> ShardHits:
+    # Shards cover ascending, disjoint ID ranges and each part is sorted by
+    # (score desc, id asc), so a heap merge on the same key gives the global order.
+    streams = [zip((-scores).tolist(), ids.tolist(), counts.tolist()) for ids, counts, scores in parts]
+    best = list(itertools.islice(heapq.merge(*streams), max(k, 0)))
+    ids = np.array([b[1] for b in best], dtype=np.int64)
+    counts = np.array([b[2] for b in best], dtype=np.int64)
+    scores = np.array([-b[0] for b in best], dtype=np.float64)
+    return ids, counts, scores
+
+
+def _shard_main(conn: Any, catalog: RecipeCatalog, offset: int) -> None:
+    # The parent owns shutdown; Ctrl-C in a terminal should not kill shards first.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        seq, query_ids, k = msg
+        try:
+            ids, counts = catalog.match_counts(query_ids)
+            scores = heuristic_scores(catalog, ids, counts)
+            ids, counts, scores = rank_top_k(ids, counts, scores, k)
+            conn.send((seq, ids + offset, counts, scores))
+        except Exception as e:
+            conn.send((seq, f"error: {e}"))
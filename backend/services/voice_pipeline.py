@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Sequence
 
 from services.category_classifier import CategoryClassifier
-from services.model_registry import ModelRegistry
+from services.model_registry import shared_registry
 
 
 _STOPWORDS = {
@@ -35,7 +35,7 @@ class VoicePipelineResult:
 
 class VoicePipeline:
     def __init__(self, category_classifier: CategoryClassifier) -> None:
-        self._models = ModelRegistry()
+        self._models = shared_registry()
         self._category_classifier = category_classifier
 
     def process_audio_file(self, audio_path: str) -> Dict[str, Any]:
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional
+
+from services.model_registry import shared_registry
+
+# A factory gets the warm-up so it can wait for services listed before it.
+ServiceFactory = Callable[["ServiceWarmup"], Any]
+
+
+class ServiceWarmup:
+    """
+    Builds the API's services on a background thread pool at startup.
+
+    ``factories`` run in parallel, in the order given; a factory may call
+    ``warmup.get(name)`` for a service listed before it (with the default of
+    one thread per factory nothing waits behind a blocked thread). Requests
+    call ``get``/``services``, which block until the services they need are
+    built, so concurrent first requests share one build instead of racing to
+    make their own. ``status`` reports per-service state and timings for the
+    readiness probe.
+    """
+
+    def __init__(self, factories: Dict[str, ServiceFactory], max_workers: Optional[int] = None) -> None:
+        self._factories = dict(factories)
+        self._max_workers = max(int(max_workers or len(self._factories) or 1), 1)
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._timings: Dict[str, Dict[str, Any]] = {name: {"state": "pending"} for name in self._factories}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def start(self) -> "ServiceWarmup":
+        with self._lock:
+            if self._pool is not None:
+                return self
+            self._started_at = time.perf_counter()
+            self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="warmup")
+            for name, factory in self._factories.items():
+                self._futures[name] = self._pool.submit(self._build, name, factory)
+            remaining = [len(self._futures)]
+            for future in self._futures.values():
+                future.add_done_callback(lambda _f: self._on_done(remaining))
+        return self
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """The built service; waits for it, and re-raises if its factory failed."""
+        self.start()
+        return self._futures[name].result(timeout=timeout)
+
+    def services(self) -> Mapping[str, Any]:
+        """Read-only name -> service mapping; each lookup waits for just that service."""
+        return _ServiceMap(self)
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return bool(self._futures) and all(t["state"] == "ready" for t in self._timings.values())
+
+    def ready_service(self, name: str) -> Optional[Any]:
+        """The service if it is already built, else None (never blocks)."""
+        future = self._futures.get(name)
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            services = {name: dict(t) for name, t in self._timings.items()}
+            started, finished = self._started_at, self._finished_at
+        now = time.perf_counter()
+        return {
+            "ready": all(t["state"] == "ready" for t in services.values()) and started is not None,
+            "elapsed_s": None if started is None else (finished or now) - started,
+            "services": services,
+            "models": {m["key"]: m["load_seconds"] for m in shared_registry().stats()["models"]},
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool = self._pool
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _build(self, name: str, factory: ServiceFactory) -> Any:
+        t0 = time.perf_counter()
+        with self._lock:
+            self._timings[name] = {"state": "loading"}
+        try:
+            service = factory(self)
+        except Exception as e:
+            with self._lock:
+                self._timings[name] = {"state": "failed", "seconds": time.perf_counter() - t0, "error": str(e)}
+            print(f"DEBUG: Warm-up of {name} failed: {e}")
+            raise
+        with self._lock:
+            self._timings[name] = {"state": "ready", "seconds": time.perf_counter() - t0}
+        return service
+
+    def _on_done(self, remaining: list) -> None:
+        with self._lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+            self._finished_at = time.perf_counter()
+            summary = ", ".join(f"{name} {t.get('seconds', 0.0):.2f}s" for name, t in self._timings.items())
+            elapsed = self._finished_at - self._started_at
+        print(f"DEBUG: Warm-up finished in {elapsed:.2f}s ({summary})")
+
+
+def default_factories() -> Dict[str, ServiceFactory]:
+    # Imported here so importing this module stays cheap.
+    from services.category_classifier import CategoryClassifier
+    from services.feedback_store import FeedbackStore
+    from services.recipe_intelligence import RecipeIntelligence
+    from services.user_history_store import UserHistoryStore
+    from services.voice_pipeline import VoicePipeline
+
+    factories: Dict[str, ServiceFactory] = {
+        "category_classifier": lambda w: CategoryClassifier(),
+        "recipe_intelligence": lambda w: RecipeIntelligence(),
+        "feedback_store": lambda w: FeedbackStore(),
+        "user_history_store": lambda w: UserHistoryStore(),
+        "voice_pipeline": lambda w: VoicePipeline(category_classifier=w.get("category_classifier")),
+    }
+    # The speech / text pipelines are loaded by the first voice request unless
+    # SMARTPANTRY_WARMUP_PIPELINES=1; readiness then also waits for their download.
+    if os.environ.get("SMARTPANTRY_WARMUP_PIPELINES", "0").strip().lower() in {"1", "true", "yes"}:
+        registry = shared_registry()
+        factories["asr_pipeline"] = lambda w: registry.get_asr_pipeline()
+        factories["text2text_pipeline"] = lambda w: registry.get_text2text_pipeline()
+        factories["ner_pipeline"] = lambda w: registry.get_ner_pipeline()
+    return factories
+
+
+_shared: Optional[ServiceWarmup] = None
+_shared_lock = threading.Lock()
+
+
+def shared_warmup() -> ServiceWarmup:
+    """The process-wide warm-up, started on first use (SMARTPANTRY_WARMUP_WORKERS threads)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            workers = int(os.environ.get("SMARTPANTRY_WARMUP_WORKERS", "0")) or None
+            _shared = ServiceWarmup(default_factories(), max_workers=workers)
+        warmup = _shared
+    return warmup.start()
+
+
+class _ServiceMap(Mapping):
+    def __init__(self, warmup: ServiceWarmup) -> None:
+        self._warmup = warmup
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._warmup._factories:
+            raise KeyError(name)
+        return self._warmup.get(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._warmup._factories)
+
+    def __len__(self) -> int:
+        return len(self._warmup._factories)
+
+
+class ServiceProxy:
+    """
+    Module-level stand-in for a warm-up service: attribute access waits for
+    the service and delegates to it, so route modules can keep their globals
+    without building anything at import time.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(shared_warmup().get(self._name), attr)
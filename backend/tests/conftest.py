@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the backend's top-level packages (services, models) the way the
+# servers and scripts do.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
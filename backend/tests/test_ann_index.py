@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from services.ann_index import IVFIndex, exact_search
+from services.recipe_catalog import RecipeCatalogBuilder
+from services.recipe_intelligence import RecipeIntelligence
+
+
+def random_unit_vectors(n, dim, seed=0):
+    x = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def recall_at_k(index, vectors, queries, k, nprobe):
+    hits = 0
+    for q in queries:
+        approx, _ = index.search(q, k, nprobe=nprobe)
+        exact, _ = exact_search(vectors, q, k)
+        hits += len(np.intersect1d(approx, exact))
+    return hits / (k * len(queries))
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = random_unit_vectors(2000, 32)
+    queries = random_unit_vectors(50, 32, seed=1)
+    return vectors, queries, IVFIndex.build(vectors, n_lists=32, seed=0)
+
+
+def test_every_vector_is_in_exactly_one_list(data):
+    vectors, _, index = data
+    assert len(index) == len(vectors)
+    assert np.array_equal(np.sort(index.list_ids), np.arange(len(vectors)))
+    assert index.list_offsets[-1] == len(vectors)
+
+
+def test_recall_against_brute_force(data):
+    vectors, queries, index = data
+    assert recall_at_k(index, vectors, queries, k=10, nprobe=8) >= 0.6
+    assert recall_at_k(index, vectors, queries, k=10, nprobe=16) >= recall_at_k(index, vectors, queries, k=10, nprobe=4)
+    # Probing every cell is an exact search.
+    for q in queries[:10]:
+        approx_ids, approx_scores = index.search(q, 10, nprobe=index.n_lists)
+        exact_ids, exact_scores = exact_search(vectors, q, 10)
+        assert np.array_equal(approx_ids, exact_ids)
+        assert np.allclose(approx_scores, exact_scores)
+
+
+def test_save_load_round_trip(data, tmp_path):
+    vectors, queries, index = data
+    path = tmp_path / "ivf.npz"
+    index.save(path, catalog_fingerprint="abc", encoder_version="v1")
+    loaded, meta = IVFIndex.load(path, vectors, nprobe=8)
+    assert meta == {"catalog_fingerprint": "abc", "encoder_version": "v1"}
+    assert np.array_equal(loaded.centroids, index.centroids)
+    assert np.array_equal(loaded.list_offsets, index.list_offsets)
+    assert np.array_equal(loaded.list_ids, index.list_ids)
+    for q in queries[:10]:
+        assert np.array_equal(loaded.search(q, 10)[0], index.search(q, 10, nprobe=8)[0])
+
+
+def test_load_rejects_index_for_other_embeddings(data, tmp_path):
+    vectors, _, index = data
+    index.save(tmp_path / "ivf.npz")
+    with pytest.raises(ValueError):
+        IVFIndex.load(tmp_path / "ivf.npz", vectors[:-1])
+
+
+def small_catalog(n):
+    builder = RecipeCatalogBuilder()
+    for i in range(n):
+        builder.add(f"recipe {i}", [f"ingredient {i}", "salt"])
+    return builder.build()
+
+
+def loader_for(models_dir, encoder_version):
+    # Just enough of a RecipeIntelligence to run its ANN index loader.
+    service = RecipeIntelligence.__new__(RecipeIntelligence)
+    service._models_dir = models_dir
+    service._encoder_version = encoder_version
+    return service
+
+
+def test_index_built_with_another_encoder_is_rejected(tmp_path, capsys):
+    catalog = small_catalog(64)
+    vectors = random_unit_vectors(64, 8)
+    index = IVFIndex.build(vectors, n_lists=4)
+    index.save(tmp_path / "recipe_ann_ivf.npz", catalog_fingerprint=catalog.fingerprint(), encoder_version="v1")
+
+    assert loader_for(tmp_path, "v1")._try_load_ann_index(catalog, vectors, None) is not None
+    assert loader_for(tmp_path, "v2")._try_load_ann_index(catalog, vectors, None) is None
+    assert "was not built with the loaded Set Transformer" in capsys.readouterr().out
+    # A different catalog is rejected too, whatever the encoder.
+    assert loader_for(tmp_path, "v1")._try_load_ann_index(small_catalog(63), vectors, None) is None
+    assert "is stale for the loaded catalog" in capsys.readouterr().out
@@ -0,0 +1,136 @@
+import itertools
+import random
+
+import pytest
+
+from services.association_rules import DEFAULT_RULES, RuleIndex, RuleTable, derive_rules, fp_growth
+
+
+def substring_scan(rules, ingredients):
+    # The per-call scan RuleIndex replaced: every rule key against every item.
+    out = []
+    for i in ingredients:
+        normalized_i = i.lower()
+        for key, results in rules.items():
+            if key in normalized_i or normalized_i in key:
+                for x in results:
+                    if x not in out and x not in ingredients:
+                        out.append(x)
+    return out
+
+
+@pytest.fixture(scope="module")
+def default_index():
+    return RuleIndex(RuleTable.from_ranked_lists(DEFAULT_RULES))
+
+
+def test_match_equals_brute_force_substring_test():
+    rng = random.Random(0)
+    # A small alphabet makes keys overlap and nest inside each other.
+    words = sorted({"".join(rng.choice("abc") for _ in range(rng.randint(1, 5))) for _ in range(60)})
+    rules = {w: [f"item-{i}"] for i, w in enumerate(words)}
+    index = RuleIndex(RuleTable.from_ranked_lists(rules))
+    table = index.table
+    for _ in range(300):
+        text = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 8))).strip()
+        expected = {w for w in words if text and (w in text or text in w)}
+        assert {table.items[i] for i in index.match(text)} == expected, text
+
+
+@pytest.mark.parametrize("ingredient", ["milk", "Whole Milk", "chicken", "chicken breast fillets", "potatoes", "sea salt", "wholemeal flour", "kale"])
+def test_single_ingredient_suggestions_keep_the_scan_order(default_index, ingredient):
+    names = [name for name, _ in default_index.suggest([ingredient])]
+    assert names == substring_scan(DEFAULT_RULES, [ingredient.strip().lower()])
+
+
+@pytest.mark.parametrize("basket", [
+    ["milk", "flour"],
+    ["pasta", "salt", "lettuce"],
+    ["bread", "avocado", "eggs"],
+    ["coffee", "yogurt", "salmon", "potato"],
+])
+def test_multi_ingredient_suggestions_cover_the_same_items(default_index, basket):
+    suggested = default_index.suggest(basket)
+    assert {name for name, _ in suggested} == set(substring_scan(DEFAULT_RULES, basket))
+    scores = [score for _, score in suggested]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_items_agreed_on_by_more_rules_rank_first(default_index):
+    # butter is first for bread and third for flour (1 + 1/3), ahead of
+    # flour's first pick, sugar (1).
+    names = [name for name, _ in default_index.suggest(["bread", "flour"])]
+    assert names[:2] == ["butter", "sugar"]
+
+
+def test_suggestions_exclude_the_basket_and_respect_limit(default_index):
+    suggested = default_index.suggest(["milk", "eggs", "bread"], limit=3)
+    assert len(suggested) == 3
+    assert not {"milk", "eggs", "bread"} & {name for name, _ in suggested}
+    assert default_index.suggest(["", "  "]) == []
+
+
+def brute_force_itemsets(transactions, min_count, max_len):
+    counts = {}
+    for t in transactions:
+        items = sorted(set(t))
+        for size in range(1, max_len + 1):
+            for combo in itertools.combinations(items, size):
+                counts[combo] = counts.get(combo, 0) + 1
+    return {itemset: c for itemset, c in counts.items() if c >= min_count}
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    rng = random.Random(1)
+    # Skewed item popularity, like ingredients: a few staples, a long tail.
+    weights = [1.0 / (i + 1) for i in range(25)]
+    return [rng.choices(range(25), weights=weights, k=rng.randint(1, 7)) for _ in range(400)]
+
+
+@pytest.mark.parametrize("min_count,max_len", [(2, 1), (5, 2), (8, 3), (20, 3), (4, 4)])
+def test_fp_growth_matches_brute_force_support(transactions, min_count, max_len):
+    assert fp_growth(transactions, min_count, max_len=max_len) == brute_force_itemsets(transactions, min_count, max_len)
+
+
+def test_derived_rules_match_brute_force_confidence_and_lift(transactions):
+    n = len(transactions)
+    itemsets = fp_growth(transactions, 6, max_len=3)
+    support = brute_force_itemsets(transactions, 1, 3)
+    expected = {}
+    for itemset in itemsets:
+        for c in itemset if len(itemset) > 1 else ():
+            antecedent = tuple(i for i in itemset if i != c)
+            confidence = support[itemset] / support[antecedent]
+            lift = confidence * n / support[(c,)]
+            if confidence >= 0.3 and lift >= 1.0:
+                expected[(antecedent, c)] = (support[itemset] / n, confidence, lift)
+
+    rules = derive_rules(itemsets, n, 0.3, min_lift=1.0)
+    assert expected
+    assert {(a, c): (s, conf, lift) for a, c, s, conf, lift in rules} == pytest.approx(expected)
+
+
+def test_max_per_antecedent_keeps_the_most_confident(transactions):
+    itemsets = fp_growth(transactions, 6, max_len=3)
+    all_rules = derive_rules(itemsets, len(transactions), 0.1)
+    capped = derive_rules(itemsets, len(transactions), 0.1, max_per_antecedent=2)
+    by_antecedent = {}
+    for rule in all_rules:
+        by_antecedent.setdefault(rule[0], []).append(rule)
+    for antecedent, group in by_antecedent.items():
+        kept = [r for r in capped if r[0] == antecedent]
+        best = sorted(group, key=lambda r: (-r[3], -r[4], r[1]))[:2]
+        assert kept == best
+
+
+def test_rule_table_round_trip_fires_only_covered_antecedents(transactions, tmp_path):
+    itemsets = fp_growth(transactions, 6, max_len=3)
+    rules = derive_rules(itemsets, len(transactions), 0.2)
+    items = [f"item-{i}" for i in range(25)]
+    RuleTable.from_rules(items, rules).save(tmp_path / "rules")
+    table = RuleTable.load(tmp_path / "rules")
+    assert len(table) == len(rules)
+    basket = [0, 1, 2]
+    fired = {(tuple(int(a) for a in table.antecedent(r)), int(table.consequents[r])) for r in table.fire(basket)}
+    assert fired == {(a, c) for a, c, *_ in rules if set(a) <= set(basket)}
@@ -0,0 +1,58 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from models.autoencoder import RecipeAutoencoder
+from services.recipe_intelligence import RecipeIntelligence
+
+VOCAB = {"milk": 1, "eggs": 2, "flour": 3, "sugar": 4, "butter": 5, "salt": 6}  # index 7 has no name
+VOCAB_SIZE = 8
+
+
+class FixedLogits(nn.Module):
+    # Scores every ingredient the same way whatever the input; index 7 (unnamed)
+    # and 0 (padding) score highest, so decoding has to skip them.
+    def __init__(self):
+        super().__init__()
+        self.embedding = nn.Embedding(VOCAB_SIZE, 2)
+        self.logits = torch.tensor([9.0, 6.0, 5.0, 3.0, 1.0, 4.0, 2.0, 10.0])
+
+    def forward(self, x, mask=None):
+        return self.logits.expand(len(x), -1).clone(), None
+
+
+def completer(model):
+    # Just enough of a RecipeIntelligence to run completion decoding.
+    service = RecipeIntelligence.__new__(RecipeIntelligence)
+    service._ingredient_vocab = dict(VOCAB)
+    service._completion = RecipeIntelligence._build_completion_model(model, service._ingredient_vocab)
+    return service
+
+
+def test_completions_are_ranked_by_score_and_skip_the_pantry():
+    service = completer(FixedLogits())
+    assert service._complete_ingredient_sets([["milk"]], 3) == [["eggs", "butter", "flour"]]
+    assert service._complete_ingredient_sets([["eggs", "butter"]], 2) == [["milk", "flour"]]
+
+
+def test_completions_never_include_padding_unnamed_or_owned_items():
+    service = completer(FixedLogits())
+    (names,) = service._complete_ingredient_sets([["milk", "eggs", "flour"]], 10)
+    assert names == ["butter", "salt", "sugar"]
+
+
+def test_unknown_or_empty_sets_get_no_completions():
+    service = completer(FixedLogits())
+    assert service._complete_ingredient_sets([[], ["saffron"]], 3) == [[], []]
+    assert service._complete_ingredient_sets([["milk"]], 0) == [[]]
+    assert completer(None)._complete_ingredient_sets([["milk"]], 3) == [[]]
+
+
+def test_batched_completion_matches_one_set_at_a_time():
+    torch.manual_seed(0)
+    model = RecipeAutoencoder(vocab_size=VOCAB_SIZE, embed_dim=16, num_heads=2, hidden_dim=32).eval()
+    service = completer(model)
+    sets = [["milk"], ["eggs", "flour", "sugar", "butter"], ["salt", "milk"], [], ["flour", "eggs"]]
+    batched = service._complete_ingredient_sets(sets, 3)
+    assert batched == [service._complete_ingredient_sets([s], 3)[0] for s in sets]
+    assert all(not set(names) & set(s) for names, s in zip(batched, sets))
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from services.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """Batch function that squares items and records each batch it was called with."""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+        time.sleep(self.delay)
+        return [x * x for x in items]
+
+
+def submit_concurrently(batcher, items):
+    results = [None] * len(items)
+    start = threading.Barrier(len(items))
+
+    def call(i):
+        start.wait()
+        results[i] = batcher.submit(items[i]).result(timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(items))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_batched_results_equal_unbatched():
+    fn = Recorder()
+    items = list(range(40))
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=20)
+    assert submit_concurrently(batcher, items) == [x * x for x in items]
+    assert batcher.map(items) == MicroBatcher(Recorder(), max_batch_size=1).map(items)
+    assert max(len(b) for b in fn.batches) <= 8
+    batcher.close()
+
+
+def test_max_batch_size_flushes_without_waiting():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=10_000)
+    t0 = time.monotonic()
+    assert batcher.map([1, 2, 3, 4]) == [1, 4, 9, 16]
+    assert time.monotonic() - t0 < 5
+    assert fn.batches == [[1, 2, 3, 4]]
+    batcher.close()
+
+
+def test_max_wait_flushes_a_partial_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch_size=32, max_wait_ms=50)
+    t0 = time.monotonic()
+    assert batcher.submit(3).result(timeout=5) == 9
+    elapsed = time.monotonic() - t0
+    assert 0.04 <= elapsed < 5
+    assert fn.batches == [[3]]
+    assert batcher.stats()["batches"] == 1
+    batcher.close()
+
+
+def test_one_callers_items_share_a_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch_size=16, max_wait_ms=50)
+    assert batcher.map([1, 2, 3]) == [1, 4, 9]
+    assert fn.batches == [[1, 2, 3]]
+    stats = batcher.stats()
+    assert (stats["items"], stats["max_batch_size_seen"]) == (3, 3)
+    batcher.close()
+
+
+def test_worker_exception_reaches_every_waiting_caller():
+    def fail(items):
+        raise RuntimeError(f"model crashed on {len(items)} items")
+
+    batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(4)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed on 4 items"):
+            future.result(timeout=5)
+    # The worker survives the error.
+    batcher.fn = Recorder()
+    assert batcher.submit(5).result(timeout=5) == 25
+    batcher.close()
+
+
+def test_wrong_result_count_is_an_error_for_the_batch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=3, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="expected 3 results, got 2"):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_closed_batcher_answers_queued_items_then_runs_inline():
+    fn = Recorder(delay=0.05)
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=20)
+    queued = [batcher.submit(i) for i in range(3)]
+    batcher.close()
+    assert [f.result(timeout=5) for f in queued] == [0, 1, 4]
+    assert batcher.submit(7).result(timeout=0) == 49
+    assert fn.batches[-1] == [7]
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services.model_registry import ModelRegistry
+
+MB = 1024 * 1024
+
+
+class Loader:
+    # Fake loader: a numpy array of ``mb`` megabytes, counting its calls.
+    def __init__(self, mb, delay=0.0):
+        self.mb = mb
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return np.zeros(int(self.mb * MB), dtype=np.uint8)
+
+
+@pytest.fixture(autouse=True)
+def models_enabled(monkeypatch):
+    monkeypatch.delenv("SMARTPANTRY_DISABLE_MODELS", raising=False)
+
+
+def loaded_keys(registry):
+    return [m["key"] for m in registry.stats()["models"]]
+
+
+def test_loads_once_and_reloads_on_new_version():
+    registry = ModelRegistry(memory_budget_mb=0)
+    loader = Loader(0.1)
+    first = registry.get("a", loader, version=1)
+    assert registry.get("a", loader, version=1) is first
+    assert loader.calls == 1
+    registry.get("a", loader, version=2)
+    assert loader.calls == 2
+
+
+def test_evicts_least_recently_used_when_over_budget():
+    registry = ModelRegistry(memory_budget_mb=2.5)
+    loaders = {key: Loader(1) for key in "abc"}
+    registry.get("a", loaders["a"], evictable=True)
+    registry.get("b", loaders["b"], evictable=True)
+    registry.get("a", loaders["a"], evictable=True)  # b is now least recently used
+    registry.get("c", loaders["c"], evictable=True)
+    assert sorted(loaded_keys(registry)) == ["a", "c"]
+    assert registry.metrics()["evictions"] == 1
+    assert registry.metrics()["budgeted_bytes"] <= 2.5 * MB
+
+    # An evicted key is loaded again on its next get.
+    registry.get("b", loaders["b"], evictable=True)
+    assert loaders["b"].calls == 2
+    assert registry.metrics()["reloads"] == 1
+    assert "b" in loaded_keys(registry)
+
+
+def test_only_evictable_entries_are_evicted():
+    registry = ModelRegistry(memory_budget_mb=2.5)
+    registry.get("held", Loader(1))
+    registry.get("pipeline", Loader(1), evictable=True)
+    registry.get("other", Loader(1), evictable=True)
+    assert sorted(loaded_keys(registry)) == ["held", "other"]
+
+    # Nothing evictable is left to drop: the budget is exceeded rather than
+    # freeing a model a service still holds.
+    registry.get("held2", Loader(1))
+    assert "held" in loaded_keys(registry) and "held2" in loaded_keys(registry)
+
+
+def test_a_model_larger_than_the_budget_is_kept():
+    registry = ModelRegistry(memory_budget_mb=1)
+    registry.get("big", Loader(2), evictable=True)
+    assert loaded_keys(registry) == ["big"]
+
+
+def test_concurrent_gets_load_once():
+    registry = ModelRegistry(memory_budget_mb=0)
+    loader = Loader(0.1, delay=0.2)
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(registry.get("shared", loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loader.calls == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+
+
+def test_eviction_prunes_the_key_lock():
+    registry = ModelRegistry(memory_budget_mb=1.5)
+    for i in range(20):
+        registry.get(f"m{i}", Loader(1), evictable=True)
+    assert set(registry._key_locks) == {"m19"}
+
+    assert registry.evict("m19")
+    assert registry._key_locks == {}
+    assert not registry.evict("m19")
+
+
+class StaleLocks(dict):
+    # Hands the given thread a lock that was pruned, as if it had looked the
+    # key's lock up just before an eviction dropped it.
+    def __init__(self, locks, thread_name, stale):
+        super().__init__(locks)
+        self.thread_name = thread_name
+        self.stale = stale
+
+    def setdefault(self, key, default=None):
+        if threading.current_thread().name == self.thread_name and self.stale is not None:
+            stale, self.stale = self.stale, None
+            return stale
+        return super().setdefault(key, default)
+
+
+def test_get_holding_a_pruned_lock_waits_for_the_current_load():
+    registry = ModelRegistry(memory_budget_mb=0)
+    loader = Loader(0.1, delay=0.3)
+    first = registry.get("k", loader, evictable=True)
+    pruned = registry._key_locks["k"]
+    registry.evict("k")
+    registry._key_locks = StaleLocks(registry._key_locks, "late", pruned)
+
+    results = {}
+    loading = threading.Thread(target=lambda: results.update(loading=registry.get("k", loader, evictable=True)))
+    loading.start()  # reloads under a new lock
+    time.sleep(0.1)
+    late = threading.Thread(target=lambda: results.update(late=registry.get("k", loader, evictable=True)), name="late")
+    late.start()
+    loading.join()
+    late.join()
+    assert loader.calls == 2
+    assert results["late"] is results["loading"] and results["late"] is not first
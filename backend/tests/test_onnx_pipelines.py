@@ -0,0 +1,165 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum.onnxruntime")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+from services.model_registry import ModelRegistry
+from services.onnx_pipelines import export_dir, export_onnx_model
+
+# Tiny random-weight models with local tokenizers, so the export -> load ->
+# inference path runs without downloading the real checkpoints.
+WORDS = "two cups of basmati rice chicken breast and a bunch fresh coriander summarize : ,".split()
+TEXT = "two cups of basmati rice , chicken breast and a bunch of fresh coriander"
+
+
+def word_tokenizer(path, specials, **special_tokens):
+    vocab = {t: i for i, t in enumerate(specials + WORDS)}
+    tok = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<unk>"))
+    tok.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    fast = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tok, model_input_names=["input_ids", "attention_mask"], unk_token="<unk>", **special_tokens
+    )
+    fast.save_pretrained(path)
+    return len(vocab)
+
+
+def make_ner(path):
+    n = word_tokenizer(path, ["[PAD]", "<unk>", "[CLS]", "[SEP]"], pad_token="[PAD]", cls_token="[CLS]", sep_token="[SEP]")
+    labels = ["O", "B-PER", "I-PER", "B-LOC", "I-LOC"]
+    config = transformers.DistilBertConfig(
+        vocab_size=n, dim=32, hidden_dim=64, n_layers=2, n_heads=2, max_position_embeddings=64,
+        id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)},
+    )
+    transformers.DistilBertForTokenClassification(config).save_pretrained(path)
+
+
+def make_t5(path):
+    n = word_tokenizer(path, ["<pad>", "</s>", "<unk>"], pad_token="<pad>", eos_token="</s>")
+    config = transformers.T5Config(
+        vocab_size=n, d_model=32, d_kv=8, d_ff=64, num_layers=2, num_heads=4,
+        decoder_start_token_id=0, pad_token_id=0, eos_token_id=1,
+    )
+    model = transformers.T5ForConditionalGeneration(config)
+    model.generation_config.max_length = 16
+    model.save_pretrained(path)
+
+
+def make_whisper(path):
+    path.mkdir(parents=True)
+    (path / "vocab.json").write_text(json.dumps({chr(c): i for i, c in enumerate(range(33, 127))} | {"Ġ": 94}))
+    (path / "merges.txt").write_text("#version: 0.2\n")
+    eot = "<|endoftext|>"
+    tokenizer = transformers.WhisperTokenizer(
+        str(path / "vocab.json"), str(path / "merges.txt"), bos_token=eot, eos_token=eot, unk_token=eot, pad_token=eot
+    )
+    tokenizer.add_special_tokens({"additional_special_tokens": ["<|startoftranscript|>", "<|en|>", "<|transcribe|>", "<|notimestamps|>"]})
+    ids = {t: tokenizer.convert_tokens_to_ids(t) for t in (eot, "<|startoftranscript|>", "<|notimestamps|>")}
+    config = transformers.WhisperConfig(
+        vocab_size=len(tokenizer), d_model=32, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=64, decoder_ffn_dim=64,
+        num_mel_bins=80, max_source_positions=1500, max_target_positions=64,
+        pad_token_id=ids[eot], bos_token_id=ids[eot], eos_token_id=ids[eot],
+        decoder_start_token_id=ids["<|startoftranscript|>"],
+    )
+    model = transformers.WhisperForConditionalGeneration(config)
+    model.generation_config.max_length = 16
+    model.generation_config.no_timestamps_token_id = ids["<|notimestamps|>"]
+    model.generation_config.suppress_tokens = []
+    model.generation_config.begin_suppress_tokens = []
+    model.generation_config.forced_decoder_ids = None
+    model.save_pretrained(path)
+    feature_extractor = transformers.WhisperFeatureExtractor(feature_size=80)
+    transformers.WhisperProcessor(feature_extractor=feature_extractor, tokenizer=tokenizer).save_pretrained(path)
+
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    import torch
+
+    torch.manual_seed(0)
+    root = tmp_path_factory.mktemp("hf")
+    paths = {"asr": root / "whisper", "text2text": root / "t5", "ner": root / "ner"}
+    make_whisper(paths["asr"])
+    make_t5(paths["text2text"])
+    make_ner(paths["ner"])
+    return paths
+
+
+@pytest.fixture
+def registry_env(models, tmp_path, monkeypatch):
+    monkeypatch.setenv("HF_HUB_OFFLINE", "1")
+    monkeypatch.setenv("SMARTPANTRY_ONNX_DIR", str(tmp_path / "onnx"))
+    monkeypatch.setenv("SMARTPANTRY_WHISPER_MODEL", str(models["asr"]))
+    monkeypatch.setenv("SMARTPANTRY_T5_MODEL", str(models["text2text"]))
+    monkeypatch.setenv("SMARTPANTRY_NER_MODEL", str(models["ner"]))
+    monkeypatch.delenv("SMARTPANTRY_DISABLE_MODELS", raising=False)
+
+    def registry(backend, quantize=False):
+        monkeypatch.setenv("SMARTPANTRY_PIPELINE_BACKEND", backend)
+        monkeypatch.setenv("SMARTPANTRY_ONNX_QUANTIZE", "1" if quantize else "0")
+        return ModelRegistry(memory_budget_mb=0)
+
+    return registry
+
+
+def sample(kind):
+    if kind == "asr":
+        rng = np.random.default_rng(0)
+        return {"raw": (rng.standard_normal(16000) * 0.01).astype(np.float32), "sampling_rate": 16000}
+    return f"summarize : {TEXT}" if kind == "text2text" else TEXT
+
+
+def run(pipe, kind):
+    x = sample(kind)
+    return pipe(dict(x) if isinstance(x, dict) else x)
+
+
+def assert_same_output(a, b):
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            assert_same_output(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same_output(x, y)
+    elif isinstance(a, (float, np.floating)):
+        assert float(a) == pytest.approx(float(b), abs=1e-4)
+    else:
+        assert a == b
+
+
+@pytest.mark.parametrize("kind", ["asr", "text2text", "ner"])
+def test_onnx_pipeline_matches_torch(registry_env, kind):
+    onnx_pipe = getattr(registry_env("onnx"), f"get_{kind}_pipeline")()
+    # A failed ONNX load falls back to torch, which would make this vacuous.
+    assert type(onnx_pipe.model).__name__.startswith("ORTModel")
+    torch_pipe = getattr(registry_env("torch"), f"get_{kind}_pipeline")()
+    assert_same_output(run(onnx_pipe, kind), run(torch_pipe, kind))
+
+
+def test_export_is_cached_and_quantized_separately(models, tmp_path):
+    task = "token-classification"
+    path = export_onnx_model(task, str(models["ner"]), cache_dir=tmp_path)
+    assert path == export_dir(task, str(models["ner"]), False, tmp_path)
+    meta = json.loads((path / "export.json").read_text())
+    assert meta["quantized"] is False and meta["graphs"] == ["model.onnx"]
+    mtime = (path / "model.onnx").stat().st_mtime_ns
+    assert export_onnx_model(task, str(models["ner"]), cache_dir=tmp_path) == path
+    assert (path / "model.onnx").stat().st_mtime_ns == mtime
+
+    int8 = export_onnx_model(task, str(models["ner"]), quantize=True, cache_dir=tmp_path)
+    assert int8 != path and json.loads((int8 / "export.json").read_text())["quantized"] is True
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_quantized_ner_pipeline_runs(registry_env):
+    pipe = registry_env("onnx", quantize=True).get_ner_pipeline()
+    assert type(pipe.model).__name__.startswith("ORTModel")
+    entities = run(pipe, "ner")
+    assert entities and {"entity_group", "score", "word", "start", "end"} <= set(entities[0])
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from services.ann_index import exact_search
+from services.pq_codec import PQScorer, ProductQuantizer
+from services.recipe_catalog import RecipeCatalogBuilder
+from services.recipe_intelligence import RecipeIntelligence
+
+
+def random_unit_vectors(n, dim, seed=0):
+    x = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def recall_at_k(scorer, vectors, queries, k):
+    hits = 0
+    for q in queries:
+        approx, _ = scorer.search(q, k)
+        exact, _ = exact_search(vectors, q, k)
+        hits += len(np.intersect1d(approx, exact))
+    return hits / (k * len(queries))
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = random_unit_vectors(2000, 32)
+    queries = random_unit_vectors(50, 32, seed=1)
+    pq = ProductQuantizer.train(vectors, m=8, ks=64, n_iter=10, seed=0)
+    return vectors, queries, pq, pq.encode(vectors)
+
+
+def test_codes_shape_and_reconstruction(data):
+    vectors, _, pq, codes = data
+    assert codes.shape == (len(vectors), 8) and codes.dtype == np.uint8
+    error = np.linalg.norm(pq.decode(codes) - vectors, axis=1).mean()
+    assert error < 0.8
+
+
+def test_adc_scores_equal_dot_products_with_decoded_vectors(data):
+    vectors, queries, pq, codes = data
+    q = queries[0]
+    assert np.allclose(pq.adc_scores(codes, pq.lookup_table(q)), pq.decode(codes) @ q, atol=1e-5)
+
+
+def test_recall_against_brute_force(data):
+    vectors, queries, pq, codes = data
+    adc = recall_at_k(PQScorer(pq, codes), vectors, queries, k=10)
+    reranked = recall_at_k(PQScorer(pq, codes, vectors=vectors, rerank=100), vectors, queries, k=10)
+    assert adc >= 0.3
+    assert reranked >= 0.8 and reranked >= adc
+
+
+def test_rerank_returns_exact_scores(data):
+    vectors, queries, pq, codes = data
+    q = queries[0]
+    ids, scores = PQScorer(pq, codes, vectors=vectors, rerank=50).search(q, 5)
+    assert np.allclose(scores, vectors[ids] @ q, atol=1e-6)
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_search_restricted_to_ids(data):
+    vectors, queries, pq, codes = data
+    ids = np.arange(0, len(vectors), 7, dtype=np.int64)
+    found, _ = PQScorer(pq, codes).search(queries[0], 10, ids=ids)
+    assert np.isin(found, ids).all()
+
+
+def test_save_load_round_trip(data, tmp_path):
+    _, queries, pq, codes = data
+    pq.save(tmp_path / "pq.npz", codes, catalog_fingerprint="abc", encoder_version="v1")
+    loaded, loaded_codes, meta = ProductQuantizer.load(tmp_path / "pq.npz")
+    assert meta == {"catalog_fingerprint": "abc", "encoder_version": "v1"}
+    assert np.array_equal(loaded.codebooks, pq.codebooks)
+    assert np.array_equal(loaded_codes, codes)
+    for q in queries[:10]:
+        assert np.array_equal(PQScorer(loaded, loaded_codes).search(q, 10)[0], PQScorer(pq, codes).search(q, 10)[0])
+
+
+def small_catalog(n):
+    builder = RecipeCatalogBuilder()
+    for i in range(n):
+        builder.add(f"recipe {i}", [f"ingredient {i}", "salt"])
+    return builder.build()
+
+
+def loader_for(models_dir, encoder_version):
+    # Just enough of a RecipeIntelligence to run its PQ codes loader.
+    service = RecipeIntelligence.__new__(RecipeIntelligence)
+    service._models_dir = models_dir
+    service._encoder_version = encoder_version
+    return service
+
+
+def test_codes_built_with_another_encoder_are_rejected(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("SMARTPANTRY_EMBEDDING_CODEC", "pq")
+    catalog = small_catalog(64)
+    vectors = random_unit_vectors(64, 8)
+    pq = ProductQuantizer.train(vectors, m=2, ks=16, n_iter=5)
+    pq.save(tmp_path / "recipe_embeddings_pq.npz", pq.encode(vectors), catalog_fingerprint=catalog.fingerprint(), encoder_version="v1")
+
+    assert isinstance(loader_for(tmp_path, "v1")._try_load_pq_scorer(catalog, vectors), PQScorer)
+    assert loader_for(tmp_path, "v2")._try_load_pq_scorer(catalog, vectors) is None
+    assert "were not built with the loaded Set Transformer" in capsys.readouterr().out
+    assert loader_for(tmp_path, "v1")._try_load_pq_scorer(small_catalog(63), vectors) is None
+    assert "are stale for the loaded catalog" in capsys.readouterr().out
@@ -0,0 +1,93 @@
+import csv
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from services.recipe_catalog import RecipeCatalog, RecipeCatalogBuilder, load_catalog
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(0)
+    pool = [f"ingredient {i}" for i in range(40)] + ["salt", "olive oil", "crème fraîche"]
+    builder = RecipeCatalogBuilder()
+    for i in range(300):
+        picked = rng.choice(len(pool), size=int(rng.integers(1, 9)), replace=False)
+        builder.add(
+            f"Recipe {i} ünïcode" if i % 7 == 0 else f"Recipe {i}",
+            [pool[j] for j in picked],
+            rating=float(rng.uniform(1, 5)),
+            prep_time_mins=int(rng.integers(5, 120)),
+            n_steps=int(rng.integers(1, 12)),
+            tags=["vegetarian"] if i % 3 == 0 else [],
+        )
+    return builder.build()
+
+
+def record(catalog, i):
+    return (
+        catalog.name(i),
+        catalog.ingredient_list(catalog.ingredients_of(i)),
+        float(catalog.ratings[i]),
+        int(catalog.prep_times[i]),
+        int(catalog.step_counts[i]),
+        float(catalog.simplicity[i]),
+        catalog.tags_of(i),
+    )
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(catalog, tmp_path, mmap):
+    catalog.save(tmp_path / "catalog")
+    loaded = RecipeCatalog.load(tmp_path / "catalog", mmap=mmap)
+    assert isinstance(loaded.offsets, np.memmap) == mmap
+    assert len(loaded) == len(catalog)
+    assert loaded.ingredient_names == catalog.ingredient_names
+    assert loaded.tag_names == catalog.tag_names
+    assert loaded.fingerprint() == catalog.fingerprint()
+    for i in range(len(catalog)):
+        assert record(loaded, i) == record(catalog, i)
+
+    for query in (["salt"], ["ingredient 3", "olive oil", "crème fraîche"], [f"ingredient {i}" for i in range(40)], ["unknown"]):
+        ids = catalog.encode(query)
+        assert np.array_equal(loaded.encode(query), ids)
+        for got, want in zip(loaded.match_counts(ids), catalog.match_counts(ids)):
+            assert np.array_equal(got, want)
+
+
+def test_save_replaces_an_existing_catalog(catalog, tmp_path):
+    catalog.save(tmp_path / "catalog")
+    smaller = catalog.slice(0, 10)
+    smaller.save(tmp_path / "catalog")
+    assert len(RecipeCatalog.load(tmp_path / "catalog")) == 10
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["catalog"]
+
+
+def test_load_catalog_honors_the_catalog_dir_env(catalog, tmp_path, monkeypatch):
+    catalog.save(tmp_path / "catalog")
+    monkeypatch.setenv("SMARTPANTRY_CATALOG_DIR", str(tmp_path / "catalog"))
+    assert load_catalog().fingerprint() == catalog.fingerprint()
+
+
+def test_ingest_writes_where_the_service_loads(tmp_path, monkeypatch):
+    recipes = tmp_path / "RAW_recipes.csv"
+    with open(recipes, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "id", "minutes", "tags", "n_steps", "steps", "ingredients"])
+        writer.writerow(["tomato pasta", "1", "20", "['vegetarian']", "3", "[]", "['pasta', 'tomato', \"baker's salt\"]"])
+        writer.writerow(["omelette", "2", "10", "[]", "2", "[]", "['egg', 'butter']"])
+    env = dict(os.environ, SMARTPANTRY_CATALOG_DIR=str(tmp_path / "catalog"))
+    result = subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, "scripts", "ingest_foodcom.py"), "--recipes", str(recipes), "--progress-every", "0"],
+        env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert "[SUCCESS]" in result.stdout, result.stdout + result.stderr
+
+    monkeypatch.setenv("SMARTPANTRY_CATALOG_DIR", str(tmp_path / "catalog"))
+    loaded = load_catalog()
+    assert [loaded.name(i) for i in range(len(loaded))] == ["tomato pasta", "omelette"]
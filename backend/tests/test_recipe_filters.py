@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from services.recipe_catalog import RecipeCatalogBuilder
+from services.recipe_filters import RecipeFilterIndex, RecipeFilters
+
+RECIPES = [
+    # name, ingredients, rating, prep minutes, tags
+    ("Pancakes", ["milk", "eggs", "flour", "sugar"], 4.6, 15, ["breakfast"]),
+    ("Tofu Stir Fry", ["tofu", "soy sauce", "broccoli", "garlic"], 4.2, 20, ["vegan", "quick"]),
+    ("Chicken Rice", ["chicken breast", "rice", "onions"], 4.3, 30, []),
+    ("Salmon Bowl", ["salmon fillet", "rice", "avocado"], 4.8, 25, []),
+    ("Peanut Toast", ["peanut butter", "gluten-free bread", "banana"], 3.9, 5, ["breakfast"]),
+    ("Almond Cake", ["almond flour", "eggs", "honey"], 4.1, 60, []),
+    ("Garlic Pasta", ["pasta", "olive oil", "garlic", "parmesan cheese"], 4.5, 20, ["quick"]),
+    ("Shrimp Tacos", ["shrimp", "corn tortillas", "lime"], 4.4, 25, []),
+    ("Lentil Soup", ["lentils", "carrots", "onions", "olive oil"], 4.0, 45, ["vegan"]),
+    ("Coconut Curry", ["coconut milk", "chickpeas", "curry paste"], 4.7, 35, []),
+    ("Mayo Salad", ["mayonnaise", "potatoes", "celery"], 3.2, 10, []),
+]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    builder = RecipeCatalogBuilder()
+    for name, ingredients, rating, prep, tags in RECIPES:
+        builder.add(name, ingredients, rating=rating, prep_time_mins=prep, tags=tags)
+    return builder.build()
+
+
+def names_passing(catalog, filters):
+    bitmap = RecipeFilterIndex(catalog).allowed(filters)
+    ids = np.arange(len(catalog), dtype=np.int64)
+    return {catalog.name(i) for i in ids[RecipeFilterIndex.mask(bitmap, ids)]}
+
+
+def expected(predicate):
+    return {name for name, ingredients, rating, prep, tags in RECIPES if predicate(ingredients, rating, prep, tags)}
+
+
+@pytest.mark.parametrize("minutes", [5, 12, 20, 30, 44, 200])
+def test_max_prep_time_matches_brute_force(catalog, minutes):
+    got = names_passing(catalog, RecipeFilters(max_prep_time_mins=minutes))
+    assert got == expected(lambda ings, rating, prep, tags: prep <= minutes)
+
+
+@pytest.mark.parametrize("min_rating", [3.0, 4.0, 4.25, 4.5, 5.0])
+def test_min_rating_matches_brute_force(catalog, min_rating):
+    got = names_passing(catalog, RecipeFilters(min_rating=min_rating))
+    assert got == expected(lambda ings, rating, prep, tags: rating >= min_rating)
+
+
+def test_inferred_diets(catalog):
+    assert names_passing(catalog, RecipeFilters(diets=frozenset({"vegetarian"}))) == expected(
+        lambda ings, *_: not any(w in " ".join(ings) for w in ("chicken", "salmon", "shrimp")))
+    # Peanut butter and coconut milk are not dairy; honey and mayonnaise rule out vegan.
+    assert names_passing(catalog, RecipeFilters(diets=frozenset({"vegan"}))) == {
+        "Tofu Stir Fry", "Peanut Toast", "Lentil Soup", "Coconut Curry"}
+    # Almond flour, gluten-free bread and corn tortillas are gluten-free; soy sauce is not.
+    assert names_passing(catalog, RecipeFilters(diets=frozenset({"gluten-free"}))) == {
+        "Chicken Rice", "Salmon Bowl", "Peanut Toast", "Almond Cake", "Shrimp Tacos",
+        "Lentil Soup", "Coconut Curry", "Mayo Salad"}
+
+
+def test_catalog_tags_act_as_diets(catalog):
+    assert names_passing(catalog, RecipeFilters(diets=frozenset({"quick"}))) == {"Tofu Stir Fry", "Garlic Pasta"}
+    with pytest.raises(ValueError, match="Unknown diet tag"):
+        names_passing(catalog, RecipeFilters(diets=frozenset({"keto"})))
+
+
+def test_exclusions_by_group_alias_and_phrase(catalog):
+    # "eggs" is an alias of the egg group, which includes mayonnaise.
+    assert names_passing(catalog, RecipeFilters(exclude=frozenset({"eggs"}))) == expected(
+        lambda ings, *_: not ({"eggs", "mayonnaise"} & set(ings)))
+    assert names_passing(catalog, RecipeFilters(exclude=frozenset({"olive oil"}))) == expected(
+        lambda ings, *_: "olive oil" not in ings)
+    # Whole words, singular or plural: "onion" matches "onions" but "oil" alone
+    # does not match "coconut milk".
+    assert names_passing(catalog, RecipeFilters(exclude=frozenset({"onion"}))) == expected(
+        lambda ings, *_: "onions" not in ings)
+    assert names_passing(catalog, RecipeFilters(exclude=frozenset({"oil"}))) == expected(
+        lambda ings, *_: "olive oil" not in ings)
+
+
+def test_combined_filters_intersect(catalog):
+    filters = RecipeFilters(max_prep_time_mins=30, min_rating=4.2, diets=frozenset({"pescatarian"}), exclude=frozenset({"dairy"}))
+    assert names_passing(catalog, filters) == {"Tofu Stir Fry", "Salmon Bowl", "Shrimp Tacos"}
+
+
+def test_no_filters_means_no_bitmap(catalog):
+    index = RecipeFilterIndex(catalog)
+    assert index.allowed(None) is None
+    assert index.allowed(RecipeFilters()) is None
+
+
+def test_mask_reads_packed_bits():
+    rng = np.random.default_rng(0)
+    bits = rng.random(37) < 0.5
+    bitmap = np.packbits(bits, bitorder="little")
+    ids = rng.permutation(37).astype(np.int64)
+    assert np.array_equal(RecipeFilterIndex.mask(bitmap, ids), bits[ids])
+
+
+def test_from_dict():
+    assert RecipeFilters.from_dict(None) is None
+    assert RecipeFilters.from_dict({"exclude": []}) is None
+    filters = RecipeFilters.from_dict({"max_prep_time_mins": "20", "exclude": "Peanuts ", "diets": ["Vegan"]})
+    assert filters == RecipeFilters(max_prep_time_mins=20, exclude=frozenset({"peanuts"}), diets=frozenset({"vegan"}))
+    with pytest.raises(ValueError):
+        RecipeFilters.from_dict({"min_rating": "high"})
+    with pytest.raises(ValueError):
+        RecipeFilters.from_dict({"diets": {"vegan": True}})
@@ -0,0 +1,73 @@
+import base64
+import json
+
+import pytest
+
+from services.recipe_intelligence import RecipeIntelligence
+
+
+@pytest.fixture(scope="module")
+def ri():
+    mp = pytest.MonkeyPatch()
+    mp.setenv("SMARTPANTRY_CATALOG_POLL_SECS", "0")
+    service = RecipeIntelligence()
+    yield service
+    service.stop_catalog_watcher()
+    mp.undo()
+
+
+QUERY_KEY = (frozenset({"milk", "eggs"}), None)
+
+
+def test_cursor_round_trip():
+    cursor = RecipeIntelligence._encode_cursor(3, QUERY_KEY, 10)
+    assert RecipeIntelligence._decode_cursor(cursor, 3, QUERY_KEY) == 10
+
+
+def test_cursor_is_tied_to_the_query():
+    cursor = RecipeIntelligence._encode_cursor(3, QUERY_KEY, 10)
+    with pytest.raises(ValueError, match="does not belong"):
+        RecipeIntelligence._decode_cursor(cursor, 3, (frozenset({"milk"}), None))
+    with pytest.raises(ValueError, match="does not belong"):
+        RecipeIntelligence._decode_cursor(cursor, 3, (frozenset({"milk", "eggs"}), ("diet", "vegan")))
+
+
+def test_cursor_from_an_older_generation_is_rejected():
+    cursor = RecipeIntelligence._encode_cursor(3, QUERY_KEY, 10)
+    with pytest.raises(ValueError, match="expired"):
+        RecipeIntelligence._decode_cursor(cursor, 4, QUERY_KEY)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", base64.urlsafe_b64encode(b"[1, 2]").decode("ascii")])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        RecipeIntelligence._decode_cursor(cursor, 3, QUERY_KEY)
+
+
+def test_tampered_cursor_is_rejected():
+    cursor = RecipeIntelligence._encode_cursor(3, QUERY_KEY, 10)
+    payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    payload["o"] = -1
+    tampered = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+    with pytest.raises(ValueError):
+        RecipeIntelligence._decode_cursor(tampered, 3, QUERY_KEY)
+
+
+def test_pages_concatenate_to_the_full_ranking(ri):
+    ingredients = ["milk", "eggs", "flour"]
+    expected = ri.get_top_recipes(ingredients, k=1000)
+    pages, cursor = [], None
+    while True:
+        page, cursor = ri.get_recipe_page(ingredients, limit=4, cursor=cursor)
+        pages.extend(page)
+        if cursor is None:
+            break
+    assert [r["name"] for r in pages] == [r["name"] for r in expected]
+
+
+def test_cursor_expires_when_the_catalog_reloads(ri):
+    _, cursor = ri.get_recipe_page(["milk", "eggs"], limit=2)
+    assert cursor is not None
+    ri.reload_catalog()
+    with pytest.raises(ValueError, match="expired"):
+        ri.get_recipe_page(["milk", "eggs"], limit=2, cursor=cursor)
@@ -0,0 +1,63 @@
+import pytest
+import torch
+
+from models.set_transformer import SetTransformer, SetTransformerWithEmbedding
+from services.recipe_intelligence import RecipeIntelligence
+
+
+@pytest.fixture(scope="module")
+def ri():
+    mp = pytest.MonkeyPatch()
+    mp.setenv("SMARTPANTRY_CATALOG_POLL_SECS", "0")
+    service = RecipeIntelligence()
+    yield service
+    service.stop_catalog_watcher()
+    mp.undo()
+
+
+def loader_for(models_dir):
+    # Just enough of a RecipeIntelligence to run its checkpoint loader on another directory.
+    service = RecipeIntelligence.__new__(RecipeIntelligence)
+    service._models_dir = models_dir
+    return service
+
+
+def test_set_transformer_sizes_are_read_from_the_checkpoint(tmp_path):
+    torch.manual_seed(0)
+    trained = SetTransformerWithEmbedding(vocab_size=40, embed_dim=16, hidden_dim=32, output_dim=24, num_heads=4, num_inds=8)
+    torch.save(trained.state_dict(), tmp_path / "set_transformer.pth")
+    model = loader_for(tmp_path)._try_load_set_transformer()
+    assert isinstance(model, SetTransformerWithEmbedding)
+    x = torch.tensor([[3, 7, 9, 0, 0]])
+    trained.eval()
+    with torch.no_grad():
+        assert torch.equal(model(x), trained(x))
+
+
+def test_set_transformer_without_its_embedding_is_rejected(tmp_path, capsys):
+    # What older train_sample_models.py runs saved (and what the repo ships).
+    bare = SetTransformer(dim_input=128, ln=True)
+    torch.save(bare.state_dict(), tmp_path / "set_transformer.pth")
+    assert loader_for(tmp_path)._try_load_set_transformer() is None
+    assert "no ingredient embedding" in capsys.readouterr().out
+
+
+def test_similar_recipes_fall_back_to_ingredient_overlap(ri):
+    if ri.catalog_info()["semantic_retrieval"] != "ingredient_overlap":
+        pytest.skip("recipe embeddings are built in this tree")
+    catalog = ri.current_catalog()
+    query = ["eggs", "flour", "milk", "butter"]
+    query_ids = set(catalog.encode(query).tolist())
+    expected = []
+    for recipe_id in range(len(catalog)):
+        ingredients = set(catalog.ingredients_of(recipe_id).tolist())
+        if ingredients & query_ids:
+            score = len(ingredients & query_ids) / len(ingredients | query_ids)
+            expected.append((-score, recipe_id))
+    expected = [catalog.name(recipe_id) for _, recipe_id in sorted(expected)[:5]]
+
+    results = ri.get_similar_recipes(query, k=5)
+    assert [r["name"] for r in results] == expected
+    scores = [r["score"] for r in results]
+    assert scores == sorted(scores, reverse=True) and 0 < scores[-1] <= scores[0] <= 1
+    assert ri.get_similar_recipes(["unobtainium"], k=5) == []
@@ -0,0 +1,105 @@
+import pytest
+
+import services.result_cache as result_cache
+from services.recipe_intelligence import RecipeIntelligence
+from services.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(result_cache.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def ri(monkeypatch):
+    monkeypatch.setenv("SMARTPANTRY_CATALOG_POLL_SECS", "0")
+    monkeypatch.setenv("SMARTPANTRY_RESULT_CACHE_SIZE", "64")
+    service = RecipeIntelligence()
+    yield service
+    service.stop_catalog_watcher()
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResultCache(max_size=4, ttl_seconds=10)
+    cache.put("a", 1)
+    clock.now += 9.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_values_are_copied_unless_immutable():
+    cache = ResultCache()
+    value = [{"name": "Pancakes"}]
+    cache.put("k", value)
+    value[0]["name"] = "changed"
+    cache.get("k")[0]["name"] = "changed again"
+    assert cache.get("k") == [{"name": "Pancakes"}]
+
+    shared = ResultCache(copy_values=False)
+    shared.put("k", value)
+    assert shared.get("k") is value
+
+
+def test_size_zero_disables_the_cache():
+    cache = ResultCache(max_size=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_canonical_key_ignores_order_case_and_duplicates():
+    key = RecipeIntelligence._canonical_key
+    assert key(["Milk", "eggs"]) == key(["EGGS ", "milk", "milk"])
+    assert key(["milk"]) != key(["milk", "eggs"])
+    assert key(None) == key([]) == key(["", "  "])
+
+
+def test_equivalent_queries_share_one_cache_entry(ri):
+    first = ri.get_top_recipes(["milk", "eggs", "flour"], k=3)
+    hits = ri.cache_stats()["hits"]
+    assert ri.get_top_recipes(["Flour", "EGGS", "milk"], k=3) == first
+    assert ri.cache_stats()["hits"] == hits + 1
+
+
+def test_recipe_pages_go_through_the_result_cache(ri):
+    first = ri.get_recipe_page(["milk", "eggs"], limit=2)
+    hits = ri.cache_stats()["hits"]
+    assert ri.get_recipe_page(["eggs", "Milk"], limit=2) == first
+    assert ri.cache_stats()["hits"] == hits + 1
+    second = ri.get_recipe_page(["milk", "eggs"], limit=2, cursor=first[1])
+    assert [r["name"] for r in second[0]] != [r["name"] for r in first[0]]
+
+
+def test_catalog_reload_invalidates_cached_results(ri):
+    ri.get_top_recipes(["milk", "eggs"], k=3)
+    ri.get_top_recipes(["milk", "eggs"], k=3)
+    before = ri.cache_stats()
+    ri.reload_catalog()
+    after_reload = ri.cache_stats()
+    assert after_reload["size"] == 0
+    assert after_reload["invalidations"] == before["invalidations"] + 1
+    ri.get_top_recipes(["milk", "eggs"], k=3)
+    assert ri.cache_stats()["misses"] == after_reload["misses"] + 1
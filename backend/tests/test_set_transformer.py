@@ -0,0 +1,95 @@
+import math
+
+import pytest
+import torch
+import torch.nn.functional as F
+
+from models.length_bucketing import LengthBucketSampler, collate_index_sets, length_buckets, pad_index_sets
+from models.set_transformer import MAB, SetTransformerWithEmbedding
+from services.recipe_intelligence import RecipeIntelligence
+
+
+def reference_mab(mab, Q, K):
+    # The unmasked bmm formulation the SDPA version replaced.
+    Q = mab.fc_q(Q)
+    K, V = mab.fc_k(K), mab.fc_v(K)
+    dim_split = mab.dim_V // mab.num_heads
+    Q_ = torch.cat(Q.split(dim_split, 2), 0)
+    K_ = torch.cat(K.split(dim_split, 2), 0)
+    V_ = torch.cat(V.split(dim_split, 2), 0)
+    A = torch.softmax(Q_.bmm(K_.transpose(1, 2)) / math.sqrt(mab.dim_V), 2)
+    O = torch.cat((Q_ + A.bmm(V_)).split(Q.size(0), 0), 2)
+    O = O if getattr(mab, "ln0", None) is None else mab.ln0(O)
+    O = O + F.relu(mab.fc_o(O))
+    return O if getattr(mab, "ln1", None) is None else mab.ln1(O)
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    return SetTransformerWithEmbedding(vocab_size=50, embed_dim=16, hidden_dim=32, output_dim=24, num_heads=4, num_inds=8).eval()
+
+
+@pytest.mark.parametrize("ln", [False, True])
+def test_mab_matches_the_original_attention(ln):
+    torch.manual_seed(1)
+    mab = MAB(16, 12, 32, num_heads=4, ln=ln)
+    Q, K = torch.randn(3, 5, 16), torch.randn(3, 7, 12)
+    with torch.no_grad():
+        assert torch.allclose(mab(Q, K), reference_mab(mab, Q, K), atol=1e-6)
+
+
+def test_embedding_does_not_depend_on_padding(model):
+    indices = [4, 17, 9, 33]
+    with torch.no_grad():
+        rows = [model(pad_index_sets([indices + [0] * extra])) for extra in (0, 3, 16)]
+    for row in rows[1:]:
+        assert torch.allclose(row, rows[0], atol=1e-6)
+
+
+def test_embedding_does_not_depend_on_batch_mates(model):
+    sets = [[4, 17], [9, 33, 12, 8, 41, 2, 7], [5]]
+    with torch.no_grad():
+        batched = model(pad_index_sets(sets))
+        alone = torch.cat([model(pad_index_sets([s])) for s in sets])
+    assert torch.allclose(batched, alone, atol=1e-6)
+
+
+def test_all_padding_row_stays_finite(model):
+    with torch.no_grad():
+        assert torch.isfinite(model(torch.zeros((2, 5), dtype=torch.long))).all()
+
+
+def test_length_buckets_cover_every_index_once():
+    lengths = [5, 1, 9, 3, 3, 7, 2, 8, 4, 6, 1]
+    batches = length_buckets(lengths, 4)
+    assert [len(b) for b in batches] == [4, 4, 3]
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    flat = [lengths[i] for b in batches for i in b]
+    assert flat == sorted(flat)
+
+    shuffled = length_buckets(lengths, 4, shuffle=True, pool_batches=1, seed=3)
+    assert shuffled == length_buckets(lengths, 4, shuffle=True, pool_batches=1, seed=3)
+    assert sorted(i for b in shuffled for i in b) == list(range(len(lengths)))
+    sampler = LengthBucketSampler(lengths, 4, seed=3)
+    assert len(sampler) == 3 and len(list(sampler)) == 3
+
+
+def test_collate_pads_to_the_longest_set_in_the_batch():
+    batch = [(torch.tensor([3, 4]), 2), (torch.tensor([5, 6, 7]), 3)]
+    x, lengths = collate_index_sets(batch)
+    assert x.tolist() == [[3, 4, 0], [5, 6, 7]]
+    assert lengths.tolist() == [2, 3]
+    assert pad_index_sets([[], []]).shape == (2, 1)
+
+
+def test_bucketed_encoding_keeps_the_input_order(model):
+    service = RecipeIntelligence.__new__(RecipeIntelligence)
+    service._set_transformer = model
+    service._set_transformer_fn = model
+    rng = torch.Generator().manual_seed(2)
+    sets = [torch.randint(1, 50, (int(n),), generator=rng).tolist() for n in torch.randint(1, 15, (23,), generator=rng)]
+    unbucketed = service._encode_index_sets(sets)
+    bucketed = service._encode_index_sets(sets, bucket_size=4)
+    assert bucketed.shape == (23, 24)
+    assert abs(bucketed - unbucketed).max() < 1e-5
@@ -0,0 +1,157 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from services.recipe_catalog import RecipeCatalogBuilder
+from services.recipe_scoring import heuristic_scores, rank_top_k
+from services.shard_pool import ShardPool, _merge
+
+INGREDIENTS = [f"ingredient {i}" for i in range(30)]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(0)
+    builder = RecipeCatalogBuilder()
+    for r in range(300):
+        # Coarse ratings and prep times, so plenty of recipes tie on score.
+        builder.add(
+            f"recipe {r}",
+            list(rng.choice(INGREDIENTS, 5, replace=False)),
+            rating=float(rng.integers(3, 6)),
+            prep_time_mins=int(rng.choice([10, 30, 60])),
+            n_steps=int(rng.integers(1, 4)),
+        )
+    return builder.build()
+
+
+@pytest.fixture(scope="module")
+def pool(catalog):
+    pool = ShardPool(catalog, 3, timeout=10)
+    yield pool
+    pool.close()
+
+
+def reference_top_k(catalog, query_ids, k):
+    ids, counts = catalog.match_counts(query_ids)
+    return rank_top_k(ids, counts, heuristic_scores(catalog, ids, counts), k)
+
+
+def assert_same_hits(got, expected):
+    assert got is not None
+    for a, b in zip(got, expected):
+        np.testing.assert_array_equal(a, b)
+
+
+def queries(catalog, n, seed=1):
+    rng = np.random.default_rng(seed)
+    return [catalog.encode(list(rng.choice(INGREDIENTS, int(rng.integers(1, 5)), replace=False))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("k", [1, 5, 50, 1000])
+def test_sharded_top_k_matches_single_process(catalog, pool, k):
+    for query_ids in queries(catalog, 20):
+        assert_same_hits(pool.top_k(query_ids, k), reference_top_k(catalog, query_ids, k))
+
+
+def test_merge_breaks_ties_by_recipe_id():
+    parts = [
+        (np.array([3, 1]), np.array([2, 1]), np.array([0.9, 0.5])),
+        (np.array([10, 12]), np.array([1, 1]), np.array([0.9, 0.5])),
+        (np.array([20]), np.array([3]), np.array([0.7])),
+    ]
+    ids, counts, scores = _merge(parts, 4)
+    assert ids.tolist() == [3, 10, 20, 1]
+    assert counts.tolist() == [2, 1, 3, 1]
+    assert scores.tolist() == [0.9, 0.9, 0.7, 0.5]
+    assert len(_merge(parts, 0)[0]) == 0
+
+
+def test_failed_shard_does_not_leak_into_next_query(catalog, pool, monkeypatch):
+    first, second = queries(catalog, 2, seed=2)
+    recv = pool._recv
+    failures = [2]
+
+    def flaky_recv(i, seq):
+        # Shard 0 misses its reply twice, so the query is abandoned while
+        # shards 1 and 2 still have answers in flight.
+        if i == 0 and failures[0]:
+            failures[0] -= 1
+            return None
+        return recv(i, seq)
+
+    monkeypatch.setattr(pool, "_recv", flaky_recv)
+    assert pool.top_k(first, 5) is None
+    monkeypatch.setattr(pool, "_recv", recv)
+    assert_same_hits(pool.top_k(second, 5), reference_top_k(catalog, second, 5))
+
+
+def test_concurrent_queries_get_their_own_results(catalog, pool):
+    batch = queries(catalog, 120, seed=3)
+    mismatches = []
+
+    def run(sub):
+        for query_ids in sub:
+            got = pool.top_k(query_ids, 10)
+            expected = reference_top_k(catalog, query_ids, 10)
+            if got is None or not np.array_equal(got[0], expected[0]):
+                mismatches.append(query_ids)
+
+    threads = [threading.Thread(target=run, args=(batch[i::6],)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert mismatches == []
+
+
+SERVER_SCRIPT = """
+import json, os, sys
+sys.path.insert(0, {backend!r})
+
+import app  # as in `python app.py`, which every spawned shard re-imports
+
+if __name__ == "__mp_main__":
+    # Runs inside the shard, right after it re-imported the main script.
+    loaded = [m for m in ("services.recipe_intelligence", "torch") if m in sys.modules]
+    with open(os.environ["SHARD_REPORT"], "w") as f:
+        json.dump({{"loaded": loaded}}, f)
+
+if __name__ == "__main__":
+    from services.recipe_catalog import RecipeCatalogBuilder
+    from services.shard_pool import ShardPool
+
+    builder = RecipeCatalogBuilder()
+    builder.add("toast", ["bread", "butter"], rating=4.0)
+    builder.add("omelette", ["eggs", "butter"], rating=4.5)
+    catalog = builder.build()
+    pool = ShardPool(catalog, 1, timeout=60)
+    ids, _, _ = pool.top_k(catalog.encode(["butter"]), 2)
+    pool.close()
+    loaded = [m for m in ("services.recipe_intelligence", "torch") if m in sys.modules]
+    print(json.dumps({{"ids": ids.tolist(), "loaded": loaded}}))
+"""
+
+
+def test_shard_child_does_not_build_the_app_services(tmp_path):
+    pytest.importorskip("flask")
+    pytest.importorskip("flask_cors")
+    backend = str(Path(__file__).resolve().parent.parent)
+    script = tmp_path / "server.py"
+    script.write_text(textwrap.dedent(SERVER_SCRIPT.format(backend=backend)))
+    report = tmp_path / "shard.json"
+    env = dict(os.environ, SHARD_REPORT=str(report), SMARTPANTRY_CATALOG_POLL_SECS="0")
+    out = subprocess.run([sys.executable, str(script)], env=env, capture_output=True, text=True, timeout=300)
+    assert out.returncode == 0, out.stderr
+    parent = json.loads(out.stdout.strip().splitlines()[-1])
+    assert sorted(parent["ids"]) == [0, 1]
+    # Neither the server process nor its shard built RecipeIntelligence.
+    assert parent["loaded"] == []
+    assert json.loads(report.read_text())["loaded"] == []
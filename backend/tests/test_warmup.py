@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from services.warmup import ServiceWarmup, default_factories
+
+PIPELINES = {"asr_pipeline", "text2text_pipeline", "ner_pipeline"}
+
+
+def test_pipelines_are_left_out_of_the_warm_up_by_default(monkeypatch):
+    monkeypatch.delenv("SMARTPANTRY_WARMUP_PIPELINES", raising=False)
+    assert not PIPELINES & set(default_factories())
+    monkeypatch.setenv("SMARTPANTRY_WARMUP_PIPELINES", "1")
+    assert PIPELINES <= set(default_factories())
+
+
+def test_get_waits_for_dependencies_and_status_reports_ready():
+    warmup = ServiceWarmup({"a": lambda w: 1, "b": lambda w: w.get("a") + 1}).start()
+    assert warmup.get("b", timeout=5) == 2
+    assert dict(warmup.services()) == {"a": 1, "b": 2}
+    assert warmup.ready
+    status = warmup.status()
+    assert status["ready"] and status["services"]["b"]["state"] == "ready"
+
+
+def test_failed_service_is_not_ready():
+    def fail(w):
+        raise RuntimeError("no checkpoint")
+
+    warmup = ServiceWarmup({"ok": lambda w: "x", "broken": fail}).start()
+    with pytest.raises(RuntimeError):
+        warmup.get("broken", timeout=5)
+    assert warmup.ready_service("broken") is None
+    assert warmup.ready_service("ok") == "x"
+    assert not warmup.status()["ready"]
+    assert warmup.status()["services"]["broken"]["error"] == "no checkpoint"
+
+
+def test_ready_service_is_none_for_a_service_cancelled_by_shutdown():
+    release = threading.Event()
+    warmup = ServiceWarmup({"slow": lambda w: release.wait(5), "queued": lambda w: "never built"}, max_workers=1).start()
+    warmup.shutdown()
+    assert warmup.ready_service("queued") is None
+    release.set()
+    assert warmup.get("slow", timeout=5) is True
+    assert warmup.ready_service("slow") is True